@@ -0,0 +1,307 @@
+"""
+Offline job: precomputed answers for the most frequent question clusters
+
+Mining reads the last answer_index_window_days of query_logs and feedback,
+merges phrasings by normalized text, embeds them and groups them into
+clusters (cosine similarity to the cluster's leading phrasing of at least
+answer_index_cluster_similarity). Support counts query_logs rows only; a
+rated answer was already logged as a query, so feedback only adds votes.
+Clusters with enough support, and not rated unhelpful more often than
+helpful, are upserted into precomputed_answers with their centroid
+embedding.
+
+Refreshing (re)generates answers through the RAG graph, without the answer
+index lookup: new clusters, answers marked stale by the documents triggers
+(a source chunk was replaced or deleted by ingestion) and answers older than
+answer_index_max_age_hours. Each answer stores the chunk IDs it was built
+from, so the next change to any of them marks it stale again.
+
+Usage (from backend/, e.g. from cron):
+    python -m analytics.answer_index            # mine, then refresh
+    python -m analytics.answer_index --refresh  # only regenerate stale answers
+"""
+import argparse
+from typing import Any, Dict, List, Optional
+import numpy as np
+import psycopg2
+from psycopg2.extras import Json
+from config import settings
+from ingestion.embedder import Embedder
+from utils.logger import logger
+from utils.metrics import metrics
+from utils.text import cache_key, normalize_question
+
+PHRASINGS_PER_ANSWER = 20  # most frequent phrasings read per answer slot
+
+QUERY_COUNTS = """
+    SELECT query, COUNT(*) FROM query_logs
+    WHERE created_at > (NOW() AT TIME ZONE 'UTC') - make_interval(days => %s)
+    GROUP BY query
+    ORDER BY COUNT(*) DESC
+    LIMIT %s
+"""
+
+FEEDBACK_COUNTS = """
+    SELECT query, COUNT(*) FILTER (WHERE helpful), COUNT(*) FILTER (WHERE NOT helpful)
+    FROM feedback
+    WHERE created_at > (NOW() AT TIME ZONE 'UTC') - make_interval(days => %s)
+    GROUP BY query
+"""
+
+UPSERT_CLUSTER = """
+    INSERT INTO precomputed_answers (question_key, question, embedding, support, mined_at)
+    VALUES (%s, %s, %s::vector, %s, NOW())
+    ON CONFLICT (question_key) DO UPDATE SET
+        question = EXCLUDED.question,
+        embedding = EXCLUDED.embedding,
+        support = EXCLUDED.support,
+        mined_at = NOW()
+"""
+
+# New clusters, stale answers and answers past their max age
+DUE_ANSWERS = """
+    SELECT id, question, answer IS NOT NULL FROM precomputed_answers
+    WHERE generated_at IS NULL
+       OR stale_since IS NOT NULL
+       OR generated_at < NOW() - make_interval(hours => %(max_age)s)
+    ORDER BY support DESC
+    LIMIT %(limit)s
+"""
+
+# Chunks deleted while the answer was being generated leave it stale straight away
+STORE_ANSWER = """
+    UPDATE precomputed_answers SET
+        answer = %(answer)s,
+        sources = %(sources)s,
+        source_chunk_ids = %(chunk_ids)s,
+        generated_at = NOW(),
+        regenerations = regenerations + %(regenerated)s,
+        stale_since = CASE
+            WHEN (SELECT COUNT(*) FROM documents WHERE id = ANY(%(chunk_ids)s)) < cardinality(%(chunk_ids)s::int[])
+            THEN NOW()
+        END
+    WHERE id = %(id)s
+"""
+
+
+def mine_clusters(connection, embedder: Embedder) -> List[Dict[str, Any]]:
+    """
+    Group recent questions into clusters of paraphrases
+
+    Args:
+        connection: psycopg2 connection
+        embedder: Embedder for the phrasings
+
+    Returns:
+        Clusters (question, embedding, support), most frequent first
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(QUERY_COUNTS, (
+            settings.answer_index_window_days,
+            settings.answer_index_max_answers * PHRASINGS_PER_ANSWER
+        ))
+        query_counts = cursor.fetchall()
+        cursor.execute(FEEDBACK_COUNTS, (settings.answer_index_window_days,))
+        feedback_counts = cursor.fetchall()
+    connection.commit()
+
+    # Merge phrasings that differ only in case, spacing or trailing punctuation
+    phrasings: Dict[str, Dict[str, Any]] = {}
+    for query, count in query_counts:
+        entry = phrasings.setdefault(normalize_question(query), {"question": query, "count": 0, "votes": 0})
+        entry["count"] += count
+    for query, helpful, unhelpful in feedback_counts:
+        entry = phrasings.get(normalize_question(query))
+        if entry is not None:
+            entry["votes"] += helpful - unhelpful
+
+    ranked = sorted(phrasings.values(), key=lambda entry: entry["count"], reverse=True)
+    if not ranked:
+        return []
+
+    vectors = np.asarray(embedder.embed_texts([entry["question"] for entry in ranked]), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    # Leader clustering: each phrasing joins the closest leader above the threshold
+    clusters: List[Dict[str, Any]] = []
+    leaders = np.zeros((0, vectors.shape[1]), dtype=np.float32)
+    for entry, vector in zip(ranked, vectors):
+        if len(leaders):
+            scores = leaders @ vector
+            best = int(np.argmax(scores))
+            if scores[best] >= settings.answer_index_cluster_similarity:
+                cluster = clusters[best]
+                cluster["support"] += entry["count"]
+                cluster["votes"] += entry["votes"]
+                cluster["centroid"] += entry["count"] * vector
+                continue
+        clusters.append({
+            "question": entry["question"],
+            "support": entry["count"],
+            "votes": entry["votes"],
+            "centroid": entry["count"] * vector
+        })
+        leaders = np.vstack([leaders, vector])
+
+    kept = [
+        cluster for cluster in clusters
+        if cluster["support"] >= settings.answer_index_min_support and cluster["votes"] >= 0
+    ]
+    kept.sort(key=lambda cluster: cluster["support"], reverse=True)
+    for cluster in kept:
+        cluster["embedding"] = (cluster["centroid"] / np.linalg.norm(cluster["centroid"])).tolist()
+
+    logger.info(f"Mined {len(kept)} frequent question clusters from {len(ranked)} phrasings")
+    return kept[:settings.answer_index_max_answers]
+
+
+class AnswerIndexer:
+    """Mine frequent question clusters and keep their precomputed answers fresh"""
+
+    def __init__(self):
+        # Imported here so the analytics scheduler only loads LangGraph when enabled
+        from graph.workflow import RAGWorkflow
+
+        self.embedder = Embedder()
+        self.workflow = RAGWorkflow()
+        self.graph = self.workflow._build_graph(answer_index=False)
+
+    def mine(self, connection) -> int:
+        """
+        Upsert the current clusters and drop ones no longer frequent
+
+        Returns:
+            Number of clusters upserted
+        """
+        try:
+            clusters = mine_clusters(connection, self.embedder)
+            with connection.cursor() as cursor:
+                for cluster in clusters:
+                    cursor.execute(UPSERT_CLUSTER, (
+                        cache_key(normalize_question(cluster["question"])),
+                        cluster["question"],
+                        cluster["embedding"],
+                        cluster["support"]
+                    ))
+                cursor.execute(
+                    "DELETE FROM precomputed_answers WHERE mined_at < NOW() - make_interval(days => %s)",
+                    (settings.answer_index_window_days,)
+                )
+                dropped = cursor.rowcount
+            connection.commit()
+
+            logger.info(f"Answer index: {len(clusters)} clusters upserted, {dropped} dropped")
+            return len(clusters)
+
+        except Exception as e:
+            logger.error(f"Failed to mine question clusters: {e}")
+            connection.rollback()
+            raise
+
+    def refresh(self, connection, limit: Optional[int] = None) -> int:
+        """
+        (Re)generate due answers, most frequent clusters first
+
+        Args:
+            connection: psycopg2 connection (committed after each answer)
+            limit: Most answers to generate (defaults to answer_index_refresh_batch)
+
+        Returns:
+            Number of answers stored
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(DUE_ANSWERS, {
+                "max_age": settings.answer_index_max_age_hours,
+                "limit": limit or settings.answer_index_refresh_batch
+            })
+            due = cursor.fetchall()
+        connection.commit()
+
+        stored = 0
+        for answer_id, question, had_answer in due:
+            try:
+                final_state = self.graph.invoke(self.workflow._initial_state(question, None))
+                if final_state.get("failed"):
+                    # LLM error: keep whatever is stored and retry on the next run
+                    metrics.increment("answer_index.errors")
+                    logger.warning(f"Answer generation failed for '{question[:60]}'")
+                    continue
+                chunk_ids = [chunk.id for chunk in final_state["retrieved_docs"]]
+
+                with connection.cursor() as cursor:
+                    if chunk_ids:
+                        cursor.execute(STORE_ANSWER, {
+                            "id": answer_id,
+                            "answer": final_state["answer"],
+                            "sources": Json(final_state["sources"]),
+                            "chunk_ids": chunk_ids,
+                            "regenerated": int(had_answer)
+                        })
+                    else:
+                        # Nothing retrieved: not worth serving, try again after max age
+                        cursor.execute(
+                            "UPDATE precomputed_answers SET answer = NULL, generated_at = NOW(), "
+                            "stale_since = NULL WHERE id = %s",
+                            (answer_id,)
+                        )
+                connection.commit()
+
+                if chunk_ids:
+                    stored += 1
+                    metrics.increment("answer_index.regenerated" if had_answer else "answer_index.generated")
+                else:
+                    logger.warning(f"Nothing retrieved for '{question[:60]}', no answer precomputed")
+
+            except Exception as e:
+                connection.rollback()
+                metrics.increment("answer_index.errors")
+                logger.error(f"Failed to precompute answer {answer_id}: {e}")
+
+        if due:
+            logger.info(f"Answer index: {stored}/{len(due)} answers generated")
+        return stored
+
+
+def answer_index_status(connection) -> Dict[str, Any]:
+    """Fresh, stale and pending answers and the oldest fresh answer, for the metrics endpoint"""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT
+                    COUNT(*) FILTER (WHERE answer IS NOT NULL AND stale_since IS NULL),
+                    COUNT(*) FILTER (WHERE stale_since IS NOT NULL),
+                    COUNT(*) FILTER (WHERE answer IS NULL),
+                    EXTRACT(EPOCH FROM NOW() - MIN(generated_at) FILTER (WHERE stale_since IS NULL))
+                FROM precomputed_answers
+                """
+            )
+            fresh, stale, pending, oldest = cursor.fetchone()
+        connection.commit()
+    except Exception as e:
+        connection.rollback()
+        logger.error(f"Failed to read answer index status: {e}")
+        return {}
+
+    return {
+        "fresh": fresh,
+        "stale": stale,
+        "pending": pending,
+        "oldest_fresh_hours": round(float(oldest) / 3600, 1) if oldest is not None else None
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mine frequent questions and precompute their answers")
+    parser.add_argument("--refresh", action="store_true", help="Only regenerate due answers, without mining")
+    parser.add_argument("--limit", type=int, default=None, help="Most answers to generate")
+    args = parser.parse_args()
+
+    indexer = AnswerIndexer()
+    connection = psycopg2.connect(settings.database_url)
+    try:
+        if not args.refresh:
+            indexer.mine(connection)
+        indexer.refresh(connection, limit=args.limit or settings.answer_index_max_answers)
+    finally:
+        connection.close()
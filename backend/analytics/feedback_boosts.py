@@ -0,0 +1,120 @@
+"""
+Offline job: aggregate feedback ratings into per-chunk retrieval boosts
+
+Each feedback row carries the sources (source, chunk_index, type) that were shown
+with the rated answer. The job folds new ratings into retrieval_boosts, one
+row per chunk plus one per source (chunk_index -1), with a smoothed boost:
+
+    boost = weight * (helpful - unhelpful) / (helpful + unhelpful + prior)
+
+PgVectorStore.similarity_search joins this table to re-order candidates.
+Runs are incremental: each rating is folded in once, by the run that first
+sees it committed, and marked with boosted_at in the same transaction. Rows
+still in a worker's write buffer, or committed out of id order, are simply
+picked up by a later run.
+
+Usage (from backend/, e.g. from cron every few minutes):
+    python -m analytics.feedback_boosts
+    python -m analytics.feedback_boosts --full   # rebuild after changing weight/prior
+"""
+import argparse
+import psycopg2
+from config import settings
+from utils.logger import logger
+
+# Claims unfolded ratings (row locks keep concurrent runs from counting one twice)
+# and folds them into the boosts in one statement
+REFRESH_QUERY = """
+    WITH batch AS (
+        UPDATE feedback SET boosted_at = NOW() AT TIME ZONE 'UTC'
+        WHERE boosted_at IS NULL AND helpful IS NOT NULL
+        RETURNING id, helpful, sources
+    ),
+    votes AS (
+        SELECT
+            b.id,
+            s->>'source' as source,
+            COALESCE((s->>'chunk_index')::int, -1) as chunk_index,
+            b.helpful
+        FROM batch b, jsonb_array_elements(b.sources) s
+        WHERE s->>'source' IS NOT NULL
+    ),
+    expanded AS (
+        SELECT source, chunk_index, helpful FROM votes WHERE chunk_index >= 0
+        UNION ALL
+        -- One source-level vote per feedback row, however many of its chunks were shown
+        SELECT source, -1, helpful FROM (SELECT DISTINCT id, source, helpful FROM votes) per_source
+    ),
+    aggregated AS (
+        SELECT
+            source,
+            chunk_index,
+            COUNT(*) FILTER (WHERE helpful) as helpful,
+            COUNT(*) FILTER (WHERE NOT helpful) as unhelpful
+        FROM expanded
+        GROUP BY source, chunk_index
+    )
+    INSERT INTO retrieval_boosts (source, chunk_index, helpful, unhelpful, boost, updated_at)
+    SELECT
+        source,
+        chunk_index,
+        helpful,
+        unhelpful,
+        %(weight)s * (helpful - unhelpful)::real / (helpful + unhelpful + %(prior)s),
+        NOW()
+    FROM aggregated
+    ON CONFLICT (source, chunk_index) DO UPDATE SET
+        helpful = retrieval_boosts.helpful + EXCLUDED.helpful,
+        unhelpful = retrieval_boosts.unhelpful + EXCLUDED.unhelpful,
+        boost = %(weight)s
+            * ((retrieval_boosts.helpful + EXCLUDED.helpful) - (retrieval_boosts.unhelpful + EXCLUDED.unhelpful))::real
+            / (retrieval_boosts.helpful + EXCLUDED.helpful
+               + retrieval_boosts.unhelpful + EXCLUDED.unhelpful + %(prior)s),
+        updated_at = NOW()
+"""
+
+
+def refresh_boosts(connection, full: bool = False) -> int:
+    """
+    Fold new feedback into retrieval_boosts
+
+    Args:
+        connection: psycopg2 connection (committed on success)
+        full: Drop all boosts and rebuild from every feedback row
+
+    Returns:
+        Number of boost rows inserted or updated
+    """
+    try:
+        with connection.cursor() as cursor:
+            if full:
+                cursor.execute("TRUNCATE retrieval_boosts")
+                cursor.execute("UPDATE feedback SET boosted_at = NULL WHERE boosted_at IS NOT NULL")
+
+            cursor.execute(REFRESH_QUERY, {
+                "weight": settings.feedback_boost_weight,
+                "prior": settings.feedback_boost_prior
+            })
+            updated = cursor.rowcount
+        connection.commit()
+
+        if updated:
+            logger.info(f"Refreshed {updated} retrieval boosts from new feedback")
+        return updated
+
+    except Exception as e:
+        logger.error(f"Failed to refresh retrieval boosts: {e}")
+        connection.rollback()
+        raise
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aggregate feedback into retrieval boosts")
+    parser.add_argument("--full", action="store_true", help="Rebuild all boosts from scratch")
+    args = parser.parse_args()
+
+    connection = psycopg2.connect(settings.database_url)
+    try:
+        refresh_boosts(connection, full=args.full)
+    finally:
+        connection.close()
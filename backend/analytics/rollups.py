@@ -0,0 +1,255 @@
+"""
+Hourly analytics rollups over query_logs and feedback, and log partition retention
+
+Rollups are plain tables refreshed incrementally: each run recomputes only
+the hours from the latest rolled-up bucket (minus a lookback for rows that
+reached the write buffer late) onwards, so the cost does not grow with the
+size of the raw log tables. Percentiles are computed per hour by Postgres.
+
+Usage (from backend/):
+    python -m analytics.rollups
+"""
+import argparse
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+import psycopg2
+from config import settings
+from utils.logger import logger
+
+PARTITIONED_TABLES = ("query_logs", "feedback")
+
+QUERY_ROLLUP = """
+    INSERT INTO query_rollups_hourly (
+        bucket, doc_type, queries, retrieval_hits,
+        latency_p50_ms, latency_p95_ms, latency_p99_ms, tokens
+    )
+    SELECT
+        date_trunc('hour', created_at) as bucket,
+        doc_type,
+        COUNT(*),
+        COUNT(*) FILTER (WHERE retrieved_docs > 0),
+        percentile_cont(0.50) WITHIN GROUP (ORDER BY response_time_ms),
+        percentile_cont(0.95) WITHIN GROUP (ORDER BY response_time_ms),
+        percentile_cont(0.99) WITHIN GROUP (ORDER BY response_time_ms),
+        COALESCE(SUM(llm_tokens_used), 0)
+    FROM (
+        SELECT created_at, retrieved_docs, response_time_ms, llm_tokens_used, 'all' as doc_type
+        FROM query_logs
+        WHERE created_at >= %(since)s
+        UNION ALL
+        SELECT created_at, retrieved_docs, response_time_ms, llm_tokens_used, unnest(doc_types)
+        FROM query_logs
+        WHERE created_at >= %(since)s
+    ) q
+    GROUP BY 1, 2
+"""
+
+FEEDBACK_ROLLUP = """
+    INSERT INTO feedback_rollups_hourly (bucket, doc_type, helpful, unhelpful)
+    SELECT
+        date_trunc('hour', created_at) as bucket,
+        doc_type,
+        COUNT(*) FILTER (WHERE helpful),
+        COUNT(*) FILTER (WHERE NOT helpful)
+    FROM (
+        SELECT id, created_at, helpful, 'all' as doc_type
+        FROM feedback
+        WHERE created_at >= %(since)s AND helpful IS NOT NULL
+        UNION
+        -- One vote per feedback row and document type among its sources
+        SELECT f.id, f.created_at, f.helpful, s->>'type'
+        FROM feedback f, jsonb_array_elements(f.sources) s
+        WHERE f.created_at >= %(since)s AND f.helpful IS NOT NULL AND s->>'type' IS NOT NULL
+    ) v
+    GROUP BY 1, 2
+"""
+
+
+def _refresh_table(cursor, rollup_table: str, insert_query: str) -> int:
+    """Recompute the recent hours of one rollup table; returns rows written"""
+    cursor.execute(
+        f"""
+        SELECT COALESCE(
+            MAX(bucket) - make_interval(hours => %s),
+            date_trunc('hour', NOW() AT TIME ZONE 'UTC') - make_interval(days => %s)
+        )
+        FROM {rollup_table}
+        """,
+        (settings.analytics_rollup_lookback_hours, settings.analytics_retention_days)
+    )
+    since = cursor.fetchone()[0]
+
+    cursor.execute(f"DELETE FROM {rollup_table} WHERE bucket >= %s", (since,))
+    cursor.execute(insert_query, {"since": since})
+    return cursor.rowcount
+
+
+def refresh_rollups(connection) -> int:
+    """
+    Incrementally refresh the hourly query and feedback rollups
+
+    Args:
+        connection: psycopg2 connection (committed on success)
+
+    Returns:
+        Number of rollup rows written
+    """
+    try:
+        with connection.cursor() as cursor:
+            written = _refresh_table(cursor, "query_rollups_hourly", QUERY_ROLLUP)
+            written += _refresh_table(cursor, "feedback_rollups_hourly", FEEDBACK_ROLLUP)
+        connection.commit()
+        logger.info(f"Refreshed {written} hourly rollup rows")
+        return written
+    except Exception as e:
+        logger.error(f"Failed to refresh rollups: {e}")
+        connection.rollback()
+        raise
+
+
+def maintain_partitions(connection) -> List[str]:
+    """
+    Create upcoming monthly partitions and drop those past retention
+
+    Args:
+        connection: psycopg2 connection (committed on success)
+
+    Returns:
+        Names of the dropped partitions
+    """
+    # Log timestamps are naive UTC; a month is dropped once it ends before the cutoff
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.analytics_retention_days)
+    cutoff_months = cutoff.year * 12 + cutoff.month - 1
+    dropped = []
+
+    try:
+        with connection.cursor() as cursor:
+            for table in PARTITIONED_TABLES:
+                cursor.execute("SELECT ensure_monthly_partitions(%s)", (table,))
+                cursor.execute(
+                    """
+                    SELECT c.relname
+                    FROM pg_inherits i
+                    JOIN pg_class c ON c.oid = i.inhrelid
+                    JOIN pg_class p ON p.oid = i.inhparent
+                    WHERE p.relname = %s
+                    """,
+                    (table,)
+                )
+                for (partition,) in cursor.fetchall():
+                    suffix = partition.rsplit("_p", 1)[-1]
+                    if not suffix.isdigit() or len(suffix) != 6:
+                        continue  # the default partition
+                    partition_months = int(suffix[:4]) * 12 + int(suffix[4:]) - 1
+                    if partition_months < cutoff_months:
+                        cursor.execute(f'DROP TABLE IF EXISTS "{partition}"')
+                        dropped.append(partition)
+        connection.commit()
+    except Exception as e:
+        logger.error(f"Partition maintenance failed: {e}")
+        connection.rollback()
+        raise
+
+    if dropped:
+        logger.info(f"Dropped expired partitions: {', '.join(dropped)}")
+    return dropped
+
+
+def get_analytics(connection, hours: int = 24, doc_type: str = "all") -> Dict[str, Any]:
+    """
+    Read the hourly rollups for a time window
+
+    Args:
+        connection: psycopg2 connection
+        hours: Window size in hours, ending now
+        doc_type: Document type, or 'all'
+
+    Returns:
+        Dict with 'buckets' (one per hour), 'summary' totals and 'doc_types'
+    """
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT
+                    COALESCE(q.bucket, f.bucket) as bucket,
+                    COALESCE(q.queries, 0),
+                    COALESCE(q.retrieval_hits, 0),
+                    q.latency_p50_ms,
+                    q.latency_p95_ms,
+                    q.latency_p99_ms,
+                    COALESCE(q.tokens, 0),
+                    COALESCE(f.helpful, 0),
+                    COALESCE(f.unhelpful, 0)
+                FROM (
+                    SELECT * FROM query_rollups_hourly
+                    WHERE doc_type = %(doc_type)s
+                      AND bucket >= date_trunc('hour', NOW() AT TIME ZONE 'UTC') - make_interval(hours => %(hours)s)
+                ) q
+                FULL OUTER JOIN (
+                    SELECT * FROM feedback_rollups_hourly
+                    WHERE doc_type = %(doc_type)s
+                      AND bucket >= date_trunc('hour', NOW() AT TIME ZONE 'UTC') - make_interval(hours => %(hours)s)
+                ) f ON f.bucket = q.bucket
+                ORDER BY bucket
+                """,
+                {"doc_type": doc_type, "hours": hours}
+            )
+            rows = cursor.fetchall()
+
+            cursor.execute(
+                """
+                SELECT DISTINCT doc_type FROM query_rollups_hourly
+                WHERE bucket >= date_trunc('hour', NOW() AT TIME ZONE 'UTC') - make_interval(hours => %s)
+                ORDER BY doc_type
+                """,
+                (hours,)
+            )
+            doc_types = [row[0] for row in cursor.fetchall()]
+        connection.commit()
+    except Exception as e:
+        logger.error(f"Failed to read analytics rollups: {e}")
+        connection.rollback()
+        raise
+
+    buckets = [
+        {
+            "bucket": bucket.isoformat(),
+            "queries": queries,
+            "retrieval_hits": hits,
+            "latency_p50_ms": p50,
+            "latency_p95_ms": p95,
+            "latency_p99_ms": p99,
+            "tokens": tokens,
+            "helpful": helpful,
+            "unhelpful": unhelpful
+        }
+        for bucket, queries, hits, p50, p95, p99, tokens, helpful, unhelpful in rows
+    ]
+
+    queries = sum(b["queries"] for b in buckets)
+    votes = sum(b["helpful"] + b["unhelpful"] for b in buckets)
+    summary = {
+        "queries": queries,
+        "tokens": sum(b["tokens"] for b in buckets),
+        "retrieval_hit_rate": sum(b["retrieval_hits"] for b in buckets) / queries if queries else None,
+        "helpful_rate": sum(b["helpful"] for b in buckets) / votes if votes else None,
+        # Hourly p95s cannot be merged exactly; report the worst hour
+        "worst_hour_p95_ms": max((b["latency_p95_ms"] for b in buckets if b["latency_p95_ms"] is not None), default=None)
+    }
+
+    return {"hours": hours, "doc_type": doc_type, "buckets": buckets, "summary": summary, "doc_types": doc_types}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh hourly analytics rollups")
+    parser.add_argument("--skip-partitions", action="store_true", help="Do not create or drop partitions")
+    args = parser.parse_args()
+
+    connection = psycopg2.connect(settings.database_url)
+    try:
+        if not args.skip_partitions:
+            maintain_partitions(connection)
+        refresh_rollups(connection)
+    finally:
+        connection.close()
@@ -0,0 +1,92 @@
+"""
+Periodic analytics maintenance inside the API server
+"""
+import threading
+import time
+from typing import Optional
+from analytics.feedback_boosts import refresh_boosts
+from analytics.rollups import maintain_partitions, refresh_rollups
+from vector_store.pgvector_store import PgVectorStore, ANALYTICS_LOCK_KEY
+from config import settings
+from utils.logger import logger
+from utils.metrics import metrics
+
+
+class AnalyticsScheduler:
+    """
+    Run partition maintenance, feedback boosts and rollups on an interval
+
+    With several worker processes only the one holding the analytics
+    advisory lock runs the jobs. Each job is incremental, so a run costs
+    roughly the number of rows logged since the previous one. With the
+    answer index enabled, stale answers are regenerated on every run and
+    question clusters are re-mined every answer_index_mine_interval_seconds.
+    """
+
+    def __init__(self, vector_store: Optional[PgVectorStore] = None):
+        self.vector_store = vector_store or PgVectorStore()
+        self.interval = settings.analytics_refresh_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._answer_indexer = None
+        self._last_mined: Optional[float] = None
+
+    def _answer_index(self, connection):
+        """Mine question clusters when due, then regenerate due answers"""
+        if self._answer_indexer is None:
+            from analytics.answer_index import AnswerIndexer
+            self._answer_indexer = AnswerIndexer()
+        if (
+            self._last_mined is None
+            or time.monotonic() - self._last_mined >= settings.answer_index_mine_interval_seconds
+        ):
+            self._answer_indexer.mine(connection)
+            self._last_mined = time.monotonic()
+        self._answer_indexer.refresh(connection)
+
+    def run_once(self):
+        """Run every maintenance job once; failures are logged and do not stop the others"""
+        connection = self.vector_store.connection
+        jobs = [
+            ("partitions", maintain_partitions),
+            ("feedback_boosts", refresh_boosts),
+            ("rollups", refresh_rollups),
+        ]
+        if settings.answer_index_enabled:
+            jobs.append(("answer_index", self._answer_index))
+        for name, job in jobs:
+            try:
+                with metrics.timer(f"analytics.{name}_ms"):
+                    job(connection)
+            except Exception as e:
+                metrics.increment(f"analytics.{name}.errors")
+                logger.error(f"Analytics job {name} failed: {e}")
+
+    def run_forever(self):
+        """Run the jobs until stop() is called"""
+        logger.info(f"Refreshing analytics every {self.interval}s")
+        while True:
+            self.run_once()
+            if self._stop.wait(self.interval):
+                return
+
+    def start(self) -> bool:
+        """
+        Run the scheduler on a daemon thread
+
+        Returns:
+            True if this process runs the analytics jobs
+        """
+        if not self.vector_store.acquire_lock(ANALYTICS_LOCK_KEY, wait=False):
+            logger.info("Another worker is running the analytics jobs")
+            return False
+
+        self._thread = threading.Thread(target=self.run_forever, name="analytics", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """Stop the scheduler thread"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=30)
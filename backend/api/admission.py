@@ -0,0 +1,278 @@
+"""
+Admission control for the query API: per-client token buckets and a bounded
+concurrency limiter on in-flight workflow runs
+"""
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Tuple
+import psycopg2
+from fastapi.concurrency import run_in_threadpool
+from config import settings
+from utils.logger import logger
+from utils.metrics import metrics
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed; carries the suggested Retry-After in seconds"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def _refill(tokens: float, elapsed: float, rate: float, capacity: float) -> Tuple[float, float]:
+    """
+    Refill a bucket and try to take one token
+
+    Returns:
+        (tokens left, seconds until a token is available; 0 if one was taken)
+    """
+    tokens = min(capacity, tokens + elapsed * rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate
+
+
+class RateLimiter:
+    """
+    Token-bucket rate limiter keyed by client (API key or address)
+
+    Buckets live in an in-process LRU by default. With rate_limit_shared the
+    buckets are rows in the rate_limit_buckets table, refilled and consumed
+    under a row lock so all workers enforce one limit; database errors fall
+    back to the local buckets rather than failing the request. Shared checks
+    block on the database, so async handlers use check_async(), which runs
+    them on the threadpool (each thread on its own connection).
+    """
+
+    def __init__(self):
+        self.enabled = settings.rate_limit_enabled
+        self.shared = settings.rate_limit_shared
+        self.rate = settings.rate_limit_per_minute / 60
+        self.capacity = float(max(1, settings.rate_limit_burst))
+        self.max_clients = settings.rate_limit_max_clients
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._connections = threading.local()
+
+    def _get_connection(self):
+        """This thread's connection for the shared buckets"""
+        connection = getattr(self._connections, "connection", None)
+        if connection is None or connection.closed:
+            connection = psycopg2.connect(settings.database_url)
+            self._connections.connection = connection
+        return connection
+
+    def check(self, client: str):
+        """
+        Take one token for a client
+
+        Args:
+            client: Client identity (hashed API key or remote address)
+
+        Raises:
+            AdmissionRejected: If the client's bucket is empty
+        """
+        if not self.enabled:
+            return
+
+        retry_after = None
+        if self.shared:
+            retry_after = self._check_shared(client)
+        if retry_after is None:
+            retry_after = self._check_local(client)
+
+        if retry_after > 0:
+            metrics.increment("admission.rate_limited")
+            raise AdmissionRejected("Rate limit exceeded", math.ceil(retry_after))
+
+    async def check_async(self, client: str):
+        """check() without blocking the event loop on the shared buckets' database round trips"""
+        if self.enabled and self.shared:
+            await run_in_threadpool(self.check, client)
+        else:
+            self.check(client)
+
+    def _check_local(self, client: str) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(client, (self.capacity, now))
+            tokens, retry_after = _refill(tokens, now - updated, self.rate, self.capacity)
+            self._buckets[client] = (tokens, now)
+            self._buckets.move_to_end(client)
+            # An evicted bucket comes back full, so only the least recent clients are dropped
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+    def _check_shared(self, client: str):
+        try:
+            connection = self._get_connection()
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        """
+                        INSERT INTO rate_limit_buckets (client, tokens, updated_at)
+                        VALUES (%s, %s, NOW())
+                        ON CONFLICT (client) DO NOTHING
+                        """,
+                        (client, self.capacity)
+                    )
+                    cursor.execute(
+                        """
+                        SELECT tokens, EXTRACT(EPOCH FROM NOW() - updated_at)
+                        FROM rate_limit_buckets
+                        WHERE client = %s
+                        FOR UPDATE
+                        """,
+                        (client,)
+                    )
+                    tokens, elapsed = cursor.fetchone()
+                    tokens, retry_after = _refill(
+                        float(tokens), max(0.0, float(elapsed)), self.rate, self.capacity
+                    )
+                    cursor.execute(
+                        "UPDATE rate_limit_buckets SET tokens = %s, updated_at = NOW() WHERE client = %s",
+                        (tokens, client)
+                    )
+                connection.commit()
+                return retry_after
+            except Exception:
+                connection.rollback()
+                raise
+        except Exception as e:
+            logger.warning(f"Shared rate limit check failed, using local bucket: {e}")
+            metrics.increment("admission.shared_fallbacks")
+            return None
+
+    def purge_idle(self) -> int:
+        """Delete shared buckets idle long enough to be full again; returns the number deleted"""
+        if not (self.enabled and self.shared):
+            return 0
+
+        connection = None
+        try:
+            connection = self._get_connection()
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "DELETE FROM rate_limit_buckets WHERE updated_at < NOW() - make_interval(secs => %s)",
+                    (self.capacity / self.rate,)
+                )
+                deleted = cursor.rowcount
+            connection.commit()
+            return deleted
+        except Exception as e:
+            logger.warning(f"Rate limit bucket purge failed: {e}")
+            if connection is not None and not connection.closed:
+                connection.rollback()
+            return 0
+
+
+class ConcurrencyLimiter:
+    """
+    Cap in-flight workflow runs per worker with a bounded wait queue
+
+    Requests beyond max_in_flight wait for a slot; once max_queued requests
+    are already waiting, or a slot does not free up within the queue
+    timeout, the request is shed immediately instead of piling up behind
+    slow LLM calls.
+    """
+
+    def __init__(self):
+        self.max_in_flight = max(1, settings.max_in_flight_queries)
+        self.max_queued = max(0, settings.max_queued_queries)
+        self.queue_timeout = settings.queue_timeout_seconds
+        self.in_flight = 0
+        self.waiting = 0
+        # Moving average of run time, used for Retry-After without sorting metrics
+        self.avg_run_seconds = 1.0
+        self._semaphore = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the server's event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._semaphore
+
+    def _retry_after(self) -> int:
+        """Suggest a retry delay from recent query latency"""
+        return max(1, math.ceil(self.avg_run_seconds))
+
+    async def acquire(self) -> float:
+        """
+        Take one in-flight slot, waiting in the bounded queue if necessary
+
+        Returns:
+            Start time to pass to release()
+
+        Raises:
+            AdmissionRejected: If the wait queue is full or the wait timed out
+        """
+        semaphore = self._get_semaphore()
+
+        if semaphore.locked():
+            if self.waiting >= self.max_queued:
+                metrics.increment("admission.shed_queue_full")
+                raise AdmissionRejected("Server busy", self._retry_after())
+
+            self.waiting += 1
+            start = time.perf_counter()
+            try:
+                await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                metrics.increment("admission.shed_timeout")
+                raise AdmissionRejected("Server busy", self._retry_after())
+            finally:
+                self.waiting -= 1
+            metrics.observe("admission.queue_wait_ms", (time.perf_counter() - start) * 1000)
+        else:
+            await semaphore.acquire()
+
+        self.in_flight += 1
+        metrics.increment("admission.admitted")
+        return time.perf_counter()
+
+    def release(self, started: float):
+        """Return a slot taken by acquire(); call on the event loop (asyncio primitives are not thread-safe)"""
+        self.in_flight -= 1
+        self._get_semaphore().release()
+        elapsed = time.perf_counter() - started
+        self.avg_run_seconds = 0.9 * self.avg_run_seconds + 0.1 * elapsed
+        metrics.observe("admission.run_ms", elapsed * 1000)
+
+    async def release_async(self, started: float):
+        """
+        Coroutine form of release() for callbacks such as a BackgroundTask
+
+        Starlette awaits coroutines on the event loop but runs plain
+        functions on the threadpool, where release() must not run.
+        """
+        self.release(started)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one in-flight slot for the duration of the block (see acquire)"""
+        started = await self.acquire()
+        try:
+            yield
+        finally:
+            self.release(started)
+
+    def status(self) -> Dict[str, Any]:
+        """Current in-flight and queued requests for this worker"""
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_in_flight": self.max_in_flight,
+            "max_queued": self.max_queued
+        }
+
+
+# Process-wide limiters
+rate_limiter = RateLimiter()
+concurrency_limiter = ConcurrencyLimiter()
@@ -8,6 +8,7 @@ from typing import List, Optional, Dict, Any
 class QueryRequest(BaseModel):
     """Request model for asking questions"""
     question: str = Field(..., min_length=1, max_length=1000, description="User's question")
+    session_id: Optional[str] = Field(None, description="Conversation session for follow-up questions")
 
 
 class Source(BaseModel):
@@ -15,6 +16,7 @@ class Source(BaseModel):
     source: str
     type: str
     relevance: str
+    chunk_index: Optional[int] = None
 
 
 class QueryResponse(BaseModel):
@@ -22,6 +24,13 @@ class QueryResponse(BaseModel):
     question: str
     answer: str
     sources: List[Source]
+    session_id: Optional[str] = None
+
+
+class SessionResponse(BaseModel):
+    """Conversation session with its message history"""
+    session_id: str
+    messages: List[Dict[str, Any]] = []
 
 
 class FeedbackRequest(BaseModel):
@@ -30,6 +39,29 @@ class FeedbackRequest(BaseModel):
     answer: str
     helpful: bool
     comment: Optional[str] = None
+    sources: List[Source] = Field(default_factory=list, description="Sources shown with the answer")
+
+
+class AnalyticsBucket(BaseModel):
+    """One hour of rolled-up query and feedback analytics"""
+    bucket: str
+    queries: int
+    retrieval_hits: int
+    latency_p50_ms: Optional[float] = None
+    latency_p95_ms: Optional[float] = None
+    latency_p99_ms: Optional[float] = None
+    tokens: int
+    helpful: int
+    unhelpful: int
+
+
+class AnalyticsResponse(BaseModel):
+    """Hourly analytics for a time window"""
+    hours: int
+    doc_type: str
+    buckets: List[AnalyticsBucket]
+    summary: Dict[str, Any]
+    doc_types: List[str]
 
 
 class DocumentTypeStats(BaseModel):
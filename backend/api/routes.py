@@ -1,44 +1,151 @@
 """
 FastAPI routes for the knowledge assistant API
 """
-from fastapi import APIRouter, HTTPException
+import json
+import time
+from itertools import chain
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from api.admission import AdmissionRejected, rate_limiter, concurrency_limiter
 from api.models import (
+    AnalyticsResponse,
     QueryRequest,
     QueryResponse,
     FeedbackRequest,
     HealthResponse,
     DocumentTypeStats,
+    SessionResponse,
     Source
 )
-from graph.workflow import RAGWorkflow
+from conversation.session_store import SessionStore
+from graph.extractive import extractive_status
 from vector_store.pgvector_store import PgVectorStore
 from utils.logger import logger
+from utils.metrics import metrics
+from utils.openai_client import CircuitOpenError, transport_status
+from utils.shared_cache import shared_cache
+from utils.text import cache_key
+from utils.write_buffer import utc_now, write_buffer
+from config import settings
 import psycopg2
+from psycopg2.extras import Json
 
 router = APIRouter()
 
 # Global instances
 rag_workflow = None
 vector_store = None
+session_store = None
+# Set once this worker has finished warm-up
+ready = False
+# (expires_at, stats) for /health, so probes do not query the database each time
+_stats_cache = (0.0, None)
 
 
 def initialize_workflow():
     """Initialize RAG workflow (called on startup)"""
-    global rag_workflow, vector_store
+    global rag_workflow, vector_store, session_store
     if rag_workflow is None:
+        # Imported here so importing the app does not pull in LangGraph
+        from graph.workflow import RAGWorkflow
         rag_workflow = RAGWorkflow()
         vector_store = PgVectorStore()
+        session_store = SessionStore(vector_store.pooled_connection)
         logger.info("RAG workflow initialized")
 
 
+def warm_up():
+    """Load the vector indexes into shared_buffers, then report this worker ready"""
+    global ready
+    if settings.prewarm_on_startup:
+        vector_store.prewarm()
+    purged = shared_cache.purge_expired()
+    if purged:
+        logger.info(f"Purged {purged} expired shared cache entries")
+    rate_limiter.purge_idle()
+    ready = True
+
+
+def client_identity(http_request: Request) -> str:
+    """Rate-limit key: hashed X-API-Key header, else the remote address"""
+    api_key = http_request.headers.get("x-api-key")
+    if api_key:
+        return f"key:{cache_key(api_key)}"
+    host = http_request.client.host if http_request.client else "unknown"
+    return f"addr:{host}"
+
+
+def log_query(question: str, sources: list, started: float, tokens_used: int, client: str):
+    """Queue a query_logs row; written in the background by the write buffer"""
+    write_buffer.enqueue("query_logs", {
+        "query": question,
+        "retrieved_docs": len(sources),
+        "doc_types": sorted({src["type"] for src in sources if src.get("type")}),
+        "response_time_ms": int((time.perf_counter() - started) * 1000),
+        "llm_tokens_used": tokens_used,
+        "user_id": client,
+        "created_at": utc_now()
+    })
+
+
+def _reject(rejection: AdmissionRejected):
+    """Shed a request with 429 and a Retry-After hint"""
+    raise HTTPException(
+        status_code=429,
+        detail=rejection.reason,
+        headers={"Retry-After": str(rejection.retry_after)}
+    )
+
+
+def _unavailable(error: CircuitOpenError):
+    """Fail fast with 503 and a Retry-After hint while every LLM provider is down"""
+    raise HTTPException(
+        status_code=503,
+        detail="The language model provider is unavailable, please retry shortly",
+        headers={"Retry-After": str(int(error.retry_after))}
+    )
+
+
+def _on_pooled_connection(fn, *args, **kwargs):
+    """Run fn(connection, ...) on a pooled read connection (call on the threadpool)"""
+    with vector_store.pooled_connection() as connection:
+        return fn(connection, *args, **kwargs)
+
+
+@router.get("/live")
+async def liveness_check():
+    """Liveness probe: the process is up and serving requests (no dependencies checked)"""
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+async def readiness_check():
+    """Readiness probe: 503 until ingestion and warm-up have finished"""
+    if not ready:
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    return {"status": "ready"}
+
+
+def cached_stats() -> dict:
+    """Corpus statistics, re-read from source_stats at most once per TTL"""
+    global _stats_cache
+    expires_at, stats = _stats_cache
+    if stats is None or time.monotonic() >= expires_at:
+        stats = vector_store.get_stats()
+        _stats_cache = (time.monotonic() + settings.health_stats_ttl_seconds, stats)
+    return stats
+
+
 @router.get("/health", response_model=HealthResponse)
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint with corpus statistics (cached for health_stats_ttl_seconds)"""
     try:
         if vector_store is None:
             initialize_workflow()
 
-        stats = vector_store.get_stats()
+        stats = cached_stats()
 
         # Format document_types as DocumentTypeStats objects
         doc_types_formatted = {}
@@ -67,12 +174,17 @@ async def health_check():
 
 
 @router.post("/api/v1/query", response_model=QueryResponse)
-async def query_knowledge(request: QueryRequest):
+async def query_knowledge(request: QueryRequest, http_request: Request):
     """
     Query the knowledge base with a question
 
+    Requests pass admission control first: a per-client token bucket, then a
+    bounded number of in-flight workflow runs. Rejected requests get 429
+    with Retry-After instead of queueing behind slow LLM calls.
+
     Args:
         request: Query request with question
+        http_request: Raw request (client identity for rate limiting)
 
     Returns:
         Answer with sources
@@ -80,9 +192,35 @@ async def query_knowledge(request: QueryRequest):
     if rag_workflow is None:
         initialize_workflow()
 
+    started = time.perf_counter()
+    client = client_identity(http_request)
     try:
-        # Run the RAG workflow
-        result = rag_workflow.query(request.question)
+        await rate_limiter.check_async(client)
+    except AdmissionRejected as rejection:
+        _reject(rejection)
+
+    session = None
+    if request.session_id:
+        session = await run_in_threadpool(session_store.get, request.session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Session not found")
+
+    try:
+        # Run the blocking workflow off the event loop so waiting requests can be shed
+        async with concurrency_limiter.slot():
+            result = await run_in_threadpool(rag_workflow.query, request.question, session=session)
+
+        if session is not None:
+            await run_in_threadpool(
+                session_store.record_turn,
+                session,
+                request.question,
+                result["answer"],
+                result["sources"],
+                result["last_retrieval"]
+            )
+
+        log_query(request.question, result["sources"], started, result["tokens_used"], client)
 
         # Convert sources to Pydantic models
         sources = [Source(**src) for src in result["sources"]]
@@ -90,46 +228,216 @@ async def query_knowledge(request: QueryRequest):
         return QueryResponse(
             question=result["question"],
             answer=result["answer"],
-            sources=sources
+            sources=sources,
+            session_id=request.session_id
         )
 
+    except AdmissionRejected as rejection:
+        _reject(rejection)
+    except CircuitOpenError as e:
+        _unavailable(e)
     except Exception as e:
         logger.error(f"Query failed: {e}")
         raise HTTPException(status_code=500, detail=f"Query processing failed: {str(e)}")
 
 
+@router.post("/api/v1/query/stream")
+async def query_knowledge_stream(request: QueryRequest, http_request: Request):
+    """
+    Query the knowledge base and stream the answer as NDJSON
+
+    Each line is a JSON event: {"type": "sources", "sources": [...]}, then
+    {"type": "token", "content": "..."} deltas, then {"type": "done"}.
+    Admission control is the same as for /api/v1/query; the in-flight slot
+    is held until the stream ends or the client disconnects. The first event
+    is produced before the response starts, so a query that cannot reach
+    any LLM provider gets 503 with Retry-After; if the providers fail after
+    that, the stream ends with {"type": "error", "message": "..."}.
+
+    Args:
+        request: Query request with question
+        http_request: Raw request (client identity for rate limiting)
+
+    Returns:
+        Streaming NDJSON response
+    """
+    if rag_workflow is None:
+        initialize_workflow()
+
+    session = None
+    if request.session_id:
+        session = await run_in_threadpool(session_store.get, request.session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Session not found")
+
+    started = time.perf_counter()
+    client = client_identity(http_request)
+    try:
+        await rate_limiter.check_async(client)
+        slot = await concurrency_limiter.acquire()
+    except AdmissionRejected as rejection:
+        _reject(rejection)
+
+    stream = rag_workflow.stream(request.question, session=session)
+    try:
+        first = await run_in_threadpool(next, stream, None)
+    except CircuitOpenError as e:
+        concurrency_limiter.release(slot)
+        _unavailable(e)
+    except Exception as e:
+        concurrency_limiter.release(slot)
+        logger.error(f"Streaming query failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Query processing failed: {str(e)}")
+
+    def events():
+        sources = first["sources"] if first and first["type"] == "sources" else []
+        try:
+            for event in chain([first] if first else [], stream):
+                if event["type"] == "done":
+                    if session is not None:
+                        session_store.record_turn(
+                            session,
+                            request.question,
+                            event["answer"],
+                            sources,
+                            event["last_retrieval"]
+                        )
+                    log_query(request.question, sources, started, event["tokens_used"], client)
+                    yield json.dumps({"type": "done", "session_id": request.session_id}) + "\n"
+                    continue
+                if event["type"] == "sources":
+                    sources = event["sources"]
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            logger.error(f"Streaming query failed: {e}")
+            yield json.dumps({"type": "error", "message": f"Error generating answer: {str(e)}"}) + "\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="application/x-ndjson",
+        background=BackgroundTask(concurrency_limiter.release_async, slot)
+    )
+
+
+@router.post("/api/v1/sessions", response_model=SessionResponse)
+async def create_session():
+    """Start a new conversation session"""
+    if session_store is None:
+        initialize_workflow()
+
+    try:
+        session = await run_in_threadpool(session_store.create)
+        return SessionResponse(session_id=session.session_id)
+    except Exception as e:
+        logger.error(f"Failed to create session: {e}")
+        raise HTTPException(status_code=500, detail="Failed to create session")
+
+
+@router.get("/api/v1/sessions/{session_id}", response_model=SessionResponse)
+async def get_session(session_id: str):
+    """Get a conversation session and its history"""
+    if session_store is None:
+        initialize_workflow()
+
+    session = await run_in_threadpool(session_store.get, session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    return SessionResponse(session_id=session.session_id, messages=session.turns)
+
+
+@router.delete("/api/v1/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """Delete a conversation session"""
+    if session_store is None:
+        initialize_workflow()
+
+    if not await run_in_threadpool(session_store.delete, session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    return {"status": "success", "message": "Session deleted"}
+
+
 @router.post("/api/v1/feedback")
-async def submit_feedback(request: FeedbackRequest):
+async def submit_feedback(request: FeedbackRequest, http_request: Request):
     """
     Submit feedback for an answer
 
+    The row is buffered and inserted in the background with other feedback
+    and query logs, so the request never waits on the database.
+
     Args:
         request: Feedback data
+        http_request: Raw request (client identity)
 
     Returns:
         Success message
     """
-    try:
-        if vector_store is None:
-            initialize_workflow()
+    accepted = write_buffer.enqueue("feedback", {
+        "query": request.query,
+        "answer": request.answer,
+        "helpful": request.helpful,
+        "comment": request.comment,
+        "sources": Json([
+            {"source": src.source, "chunk_index": src.chunk_index, "type": src.type}
+            for src in request.sources
+        ]),
+        "user_id": client_identity(http_request),
+        "created_at": utc_now()
+    })
 
-        # Store feedback in database
-        query = """
-            INSERT INTO feedback (query, answer, helpful, comment)
-            VALUES (%s, %s, %s, %s)
-        """
+    if not accepted:
+        logger.error("Feedback buffer full, dropping feedback")
+        raise HTTPException(status_code=503, detail="Failed to record feedback")
 
-        with vector_store.connection.cursor() as cursor:
-            cursor.execute(
-                query,
-                (request.query, request.answer, request.helpful, request.comment)
-            )
-            vector_store.connection.commit()
+    logger.info(f"Feedback recorded: helpful={request.helpful}")
+    return {"status": "success", "message": "Feedback recorded"}
 
-        logger.info(f"Feedback recorded: helpful={request.helpful}")
 
-        return {"status": "success", "message": "Feedback recorded"}
+@router.get("/api/v1/analytics", response_model=AnalyticsResponse)
+async def get_analytics(
+    hours: int = Query(24, ge=1, le=24 * 90),
+    doc_type: str = Query("all", max_length=64)
+):
+    """
+    Hourly latency percentiles, token usage, retrieval hits and helpful rate
 
-    except Exception as e:
-        logger.error(f"Failed to record feedback: {e}")
-        raise HTTPException(status_code=500, detail="Failed to record feedback")
+    Served from the hourly rollup tables maintained by the analytics jobs,
+    never from the raw query_logs/feedback rows.
+
+    Args:
+        hours: Window size in hours, ending now
+        doc_type: Document type, or 'all'
+
+    Returns:
+        Hourly buckets and window totals
+    """
+    if vector_store is None:
+        initialize_workflow()
+
+    # Imported here so the analytics jobs are only loaded when used
+    from analytics.rollups import get_analytics as read_rollups
+    try:
+        return await run_in_threadpool(_on_pooled_connection, read_rollups, hours=hours, doc_type=doc_type)
+    except Exception:
+        raise HTTPException(status_code=500, detail="Failed to load analytics")
+
+
+@router.get("/api/v1/metrics")
+async def get_metrics():
+    """In-process counters and latency percentiles"""
+    answer_index = None
+    if settings.answer_index_enabled and vector_store is not None:
+        # Imported here so the answer index job is only loaded when enabled
+        from analytics.answer_index import answer_index_status
+        answer_index = await run_in_threadpool(_on_pooled_connection, answer_index_status)
+
+    return {
+        **metrics.snapshot(),
+        "admission": concurrency_limiter.status(),
+        "write_buffer": write_buffer.status(),
+        "openai": transport_status(),
+        "extractive": extractive_status(),
+        "answer_index": answer_index,
+        "llm_router": rag_workflow.nodes.router.status() if rag_workflow is not None else None
+    }
@@ -0,0 +1,104 @@
+"""
+Compare format-aware token chunking with the previous character splitter
+
+Reports chunk count and token totals (a proxy for index size and embedding
+cost). With --retrieval, both chunk sets are embedded and scored on the
+benchmark question set (hit@k of the expected source and MRR).
+
+Usage (from backend/):
+    python -m benchmarks.chunking_benchmark --documents ../data/documents --retrieval
+"""
+import argparse
+import json
+import math
+from typing import List, Dict, Any
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from benchmarks.questions import BENCHMARK_QUESTIONS
+from ingestion.document_loader import DocumentLoader
+from ingestion.chunker import DocumentChunker
+from ingestion.embedder import Embedder
+from utils.tokens import count_tokens
+from config import settings
+
+
+def legacy_chunks(documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Previous behaviour: pretty-printed JSON, 1200/300 character splitting"""
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1200,
+        chunk_overlap=300,
+        length_function=len,
+        separators=["\n\n", "\n", ". ", " ", ""]
+    )
+    chunks = []
+    for doc in documents:
+        content = doc["content"]
+        if doc["metadata"]["format"] == "json":
+            content = json.dumps(json.loads(content), indent=2)
+        for text in splitter.split_text(content):
+            chunks.append({"content": text, "metadata": doc["metadata"]})
+    return chunks
+
+
+def score_retrieval(embedder: Embedder, chunks: List[Dict[str, Any]], top_k: int) -> Dict[str, float]:
+    """Embed chunks in memory and score hit@k / MRR of the expected source"""
+    chunk_vectors = embedder.embed_texts([chunk["content"] for chunk in chunks])
+    question_vectors = embedder.embed_texts([question for question, _ in BENCHMARK_QUESTIONS])
+
+    def cosine(a, b):
+        dot = sum(x * y for x, y in zip(a, b))
+        return dot / (math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b)))
+
+    hits = 0
+    reciprocal_ranks = []
+    for (question, expected), q_vec in zip(BENCHMARK_QUESTIONS, question_vectors):
+        ranked = sorted(
+            range(len(chunks)),
+            key=lambda i: cosine(q_vec, chunk_vectors[i]),
+            reverse=True
+        )[:top_k]
+        sources = [chunks[i]["metadata"]["source"] for i in ranked]
+        if expected in sources:
+            hits += 1
+            reciprocal_ranks.append(1 / (sources.index(expected) + 1))
+        else:
+            reciprocal_ranks.append(0.0)
+
+    return {
+        "hit_rate": hits / len(BENCHMARK_QUESTIONS),
+        "mrr": sum(reciprocal_ranks) / len(reciprocal_ranks)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--documents", default="/app/data/documents")
+    parser.add_argument("--top-k", type=int, default=settings.retrieval_top_k)
+    parser.add_argument("--retrieval", action="store_true", help="Embed chunks and score retrieval (uses the OpenAI API)")
+    args = parser.parse_args()
+
+    documents = DocumentLoader(args.documents).load_all_documents()
+    # Both chunkers read every document, so materialize lazy PDF/large-file segments
+    for doc in documents:
+        if "segments" in doc:
+            doc["content"] = "\n\n".join(doc.pop("segments"))
+    results = {
+        "character (1200/300)": legacy_chunks(documents),
+        f"format-aware ({settings.chunk_size_tokens}/{settings.chunk_overlap_tokens} tokens)":
+            DocumentChunker().chunk_documents(documents),
+    }
+
+    embedder = Embedder() if args.retrieval else None
+
+    print(f"\n{len(documents)} documents\n")
+    print(f"{'chunker':<36} {'chunks':>7} {'tokens':>8} {'avg':>6} {'hit@k':>6} {'mrr':>6}")
+    for name, chunks in results.items():
+        tokens = [count_tokens(chunk["content"], settings.embedding_model) for chunk in chunks]
+        line = f"{name:<36} {len(chunks):>7} {sum(tokens):>8} {sum(tokens) / max(1, len(tokens)):>6.0f}"
+        if embedder:
+            scores = score_retrieval(embedder, chunks, args.top_k)
+            line += f" {scores['hit_rate']:>6.2f} {scores['mrr']:>6.2f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
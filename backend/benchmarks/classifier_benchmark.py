@@ -0,0 +1,163 @@
+"""
+Compare classifier-routed answers with the single-model baseline
+
+Each benchmark question is retrieved once; the answer is then generated
+twice from the same chunks: baseline (default model, llm_max_tokens, all
+chunks) and routed by the query classifier (tier, max_tokens and context
+size per query). Reports generation latency, tokens and estimated cost per
+variant, and answer quality as the share of answers whose context still
+holds the expected source plus, with --judge, a 1-5 grade of the routed
+answer against the baseline answer.
+
+Usage (from backend/):
+    python -m benchmarks.classifier_benchmark --judge
+"""
+import argparse
+import re
+import time
+from typing import Any, Dict, List
+from benchmarks.questions import BENCHMARK_QUESTIONS
+from graph.nodes import RAGNodes
+from vector_store.pgvector_store import RetrievedChunk
+from utils.tokens import count_tokens
+from config import settings
+
+# USD per 1M (input, output) tokens, list prices
+PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "claude-3-5-sonnet-20241022": (3.00, 15.00),
+    "claude-3-5-haiku-20241022": (0.80, 4.00),
+}
+
+JUDGE_PROMPT = (
+    "You grade answers from an internal documentation assistant. Given a question, a "
+    "reference answer and a candidate answer, rate from 1 to 5 how completely and "
+    "accurately the candidate conveys the facts of the reference that answer the "
+    "question (5 = nothing important missing or wrong). Reply with the number only."
+)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct * len(ordered)))]
+
+
+def initial_state(question: str) -> Dict[str, Any]:
+    return {
+        "query": question,
+        "retrieved_docs": [],
+        "answer": "",
+        "sources": [],
+        "should_regenerate": False,
+        "context_confidence": 0.0,
+        "answer_route": None,
+        "retry_count": 0,
+        "started_at": time.perf_counter(),
+        "history": [],
+        "retrieval_query": question,
+        "query_embedding": [],
+        "last_retrieval": None,
+        "failed": False,
+        "tokens_used": 0
+    }
+
+
+def answer(nodes: RAGNodes, retrieved: Dict[str, Any], routed: bool) -> Dict[str, Any]:
+    """Format context and generate one answer from (a copy of) the retrieved state"""
+    state = {
+        **retrieved,
+        # Parent expansion rewrites chunk content in place, so each variant gets its own chunks
+        "retrieved_docs": [RetrievedChunk.from_dict(chunk.to_dict()) for chunk in retrieved["retrieved_docs"]],
+        "answer_route": None
+    }
+    if routed:
+        nodes.classify_query(state)
+    nodes.format_context(state)
+
+    messages = nodes._answer_messages(state)
+    start = time.perf_counter()
+    result = nodes.router.complete(messages, **nodes._answer_options(state))
+    latency_ms = (time.perf_counter() - start) * 1000
+
+    prompt_tokens = sum(count_tokens(m["content"], result.model) for m in messages)
+    completion_tokens = max(0, result.tokens - prompt_tokens)
+    input_price, output_price = PRICES.get(result.model, PRICES[settings.llm_model])
+    return {
+        "label": state["answer_route"].label if state["answer_route"] else "baseline",
+        "model": result.model,
+        "answer": result.text,
+        "sources": [src["source"] for src in state["sources"]],
+        "latency_ms": latency_ms,
+        "tokens": result.tokens,
+        "cost": (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+    }
+
+
+def judge(nodes: RAGNodes, question: str, reference: str, candidate: str) -> int:
+    result = nodes.router.complete(
+        [
+            {"role": "system", "content": JUDGE_PROMPT},
+            {"role": "user", "content": f"Question: {question}\n\nReference:\n{reference}\n\nCandidate:\n{candidate}"}
+        ],
+        max_tokens=5,
+        temperature=0
+    )
+    match = re.search(r"[1-5]", result.text)
+    return int(match.group()) if match else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--judge", action="store_true", help="Grade routed answers against the baseline with the LLM")
+    args = parser.parse_args()
+
+    nodes = RAGNodes()
+    rows = []
+    for question, expected in BENCHMARK_QUESTIONS:
+        state = initial_state(question)
+        nodes.retrieve_documents(state)
+        if nodes.reranker:
+            nodes.rerank_documents(state)
+        nodes.evaluate_context(state)
+
+        baseline = answer(nodes, state, routed=False)
+        routed = answer(nodes, state, routed=True)
+        grade = judge(nodes, question, baseline["answer"], routed["answer"]) if args.judge else None
+        rows.append((question, expected, baseline, routed, grade))
+
+    print(f"\n{'question':<52} {'route':<9} {'model':<18} {'ms':>7} {'base ms':>7} {'tokens':>7} {'base':>6} {'grade':>5}")
+    for question, _, baseline, routed, grade in rows:
+        print(
+            f"{question[:51]:<52} {routed['label']:<9} {routed['model'][:17]:<18} "
+            f"{routed['latency_ms']:>7.0f} {baseline['latency_ms']:>7.0f} "
+            f"{routed['tokens']:>7} {baseline['tokens']:>6} {grade if grade is not None else '-':>5}"
+        )
+
+    print(f"\n{'variant':<10} {'p50 ms':>8} {'p95 ms':>8} {'tokens':>8} {'cost $':>9} {'source in context':>18}")
+    totals = {}
+    for name, index in (("baseline", 2), ("routed", 3)):
+        results = [row[index] for row in rows]
+        latencies = [r["latency_ms"] for r in results]
+        totals[name] = (sum(latencies), sum(r["cost"] for r in results))
+        found = sum(1 for row, r in zip(rows, results) if row[1] in r["sources"]) / len(rows)
+        print(
+            f"{name:<10} {percentile(latencies, 0.5):>8.0f} {percentile(latencies, 0.95):>8.0f} "
+            f"{sum(r['tokens'] for r in results):>8} {totals[name][1]:>9.4f} {found:>18.0%}"
+        )
+
+    labels = {}
+    for row in rows:
+        labels[row[3]["label"]] = labels.get(row[3]["label"], 0) + 1
+    print(f"\nRoutes: {', '.join(f'{label} {count}' for label, count in sorted(labels.items()))}")
+    print(
+        f"Generation latency -{1 - totals['routed'][0] / totals['baseline'][0]:.0%}, "
+        f"cost -{1 - totals['routed'][1] / max(totals['baseline'][1], 1e-9):.0%}"
+    )
+    if args.judge:
+        grades = [row[4] for row in rows]
+        print(f"Mean grade vs baseline: {sum(grades) / len(grades):.2f} / 5 (min {min(grades)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Measure how many benchmark questions the extractive fast path answers
+
+Each question is retrieved and evaluated as in the graph, then passed to
+extract_answer twice: cold (sentence embeddings computed) and warm (served
+from the sentence cache). Reports the fraction served extractively, warm
+extraction latency and how often the cited source is the expected one.
+
+Usage (from backend/):
+    python -m benchmarks.extractive_benchmark
+"""
+import argparse
+import time
+from benchmarks.questions import BENCHMARK_QUESTIONS
+from graph.extractive import build_scorer
+from graph.nodes import RAGNodes
+from config import settings
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--min-similarity", type=float, default=settings.extractive_min_similarity)
+    parser.add_argument("--min-sentence-score", type=float, default=settings.extractive_min_sentence_score)
+    args = parser.parse_args()
+
+    settings.extractive_min_similarity = args.min_similarity
+    settings.extractive_min_sentence_score = args.min_sentence_score
+
+    nodes = RAGNodes()
+    nodes.sentence_scorer = nodes.sentence_scorer or build_scorer(nodes.embedder)
+
+    served, correct, latencies = 0, 0, []
+    print(f"\n{'question':<60} {'top sim':>7} {'served':>6} {'cold ms':>8} {'warm ms':>8}  cited")
+    for question, expected in BENCHMARK_QUESTIONS:
+        state = {
+            "query": question,
+            "retrieval_query": question,
+            "retrieved_docs": [],
+            "answer": "",
+            "sources": [],
+            "last_retrieval": None
+        }
+        nodes.retrieve_documents(state)
+        if nodes.reranker:
+            nodes.rerank_documents(state)
+        nodes.evaluate_context(state)
+
+        timings = []
+        for _ in range(2):
+            state["answer"], state["sources"] = "", []
+            start = time.perf_counter()
+            nodes.extract_answer(state)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        top = state["retrieved_docs"][0].similarity if state["retrieved_docs"] else 0.0
+        cited = [src["source"] for src in state["sources"]]
+        if state["answer"]:
+            served += 1
+            latencies.append(timings[1])
+            correct += expected in cited
+        print(
+            f"{question[:59]:<60} {top:>7.2f} {'yes' if state['answer'] else 'no':>6} "
+            f"{timings[0]:>8.1f} {timings[1]:>8.1f}  {', '.join(cited)}"
+        )
+
+    total = len(BENCHMARK_QUESTIONS)
+    print(f"\nServed extractively: {served}/{total} ({served / total:.0%})")
+    if latencies:
+        print(f"Warm extraction: p50 {percentile(latencies, 0.5):.1f} ms, p95 {percentile(latencies, 0.95):.1f} ms")
+        print(f"Expected source cited: {correct}/{served}")
+
+
+if __name__ == "__main__":
+    main()
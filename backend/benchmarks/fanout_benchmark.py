@@ -0,0 +1,77 @@
+"""
+Compare per-collection fan-out retrieval with the single shared-index search
+
+Embeds the benchmark question set once, then runs both retrieval paths on
+every question. Reports latency (p50/p95), hit@k of the expected source,
+the average number of collections represented in the top-k, and how many
+collection searches were dropped at the deadline.
+
+Usage (from backend/):
+    python -m benchmarks.fanout_benchmark --rounds 5 --deadline-ms 250
+"""
+import argparse
+import statistics
+import time
+from benchmarks.questions import BENCHMARK_QUESTIONS
+from benchmarks.quantization_benchmark import percentile
+from config import settings
+from graph.nodes import merge_with_quotas
+from ingestion.embedder import Embedder
+from vector_store.pgvector_store import PgVectorStore, configured_collections
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=5, help="Passes over the question set")
+    parser.add_argument("--top-k", type=int, default=settings.retrieval_top_k)
+    parser.add_argument("--deadline-ms", type=float, default=settings.retrieval_fanout_deadline_ms)
+    args = parser.parse_args()
+
+    # The fan-out pool is only created when fan-out is enabled
+    settings.retrieval_fanout_enabled = True
+    store = PgVectorStore()
+    collections = configured_collections()
+    store.ensure_collection_indexes(collections)
+
+    questions = [question for question, _ in BENCHMARK_QUESTIONS]
+    embeddings = Embedder().embed_texts(questions)
+    threshold = settings.retrieval_similarity_threshold
+    max_per_collection = max(1, int(args.top_k * settings.retrieval_collection_max_share))
+
+    single = {"latencies": [], "hits": 0, "collections": []}
+    fanout = {"latencies": [], "hits": 0, "collections": [], "dropped": 0}
+
+    for _ in range(args.rounds):
+        for (_, expected), embedding in zip(BENCHMARK_QUESTIONS, embeddings):
+            start = time.perf_counter()
+            chunks = store.similarity_search(embedding, top_k=args.top_k, similarity_threshold=threshold)
+            single["latencies"].append((time.perf_counter() - start) * 1000)
+            single["hits"] += any(chunk.source == expected for chunk in chunks)
+            single["collections"].append(len({chunk.doc_type for chunk in chunks}))
+
+            start = time.perf_counter()
+            results = store.fanout_similarity_search(
+                embedding, collections, args.top_k, threshold, args.deadline_ms
+            )
+            chunks = merge_with_quotas(results, args.top_k, settings.retrieval_collection_min, max_per_collection)
+            fanout["latencies"].append((time.perf_counter() - start) * 1000)
+            fanout["hits"] += any(chunk.source == expected for chunk in chunks)
+            fanout["collections"].append(len({chunk.doc_type for chunk in chunks}))
+            fanout["dropped"] += len(collections) - len(results)
+
+    total = args.rounds * len(BENCHMARK_QUESTIONS)
+    print(f"\n{len(BENCHMARK_QUESTIONS)} questions x {args.rounds} rounds, top {args.top_k}, "
+          f"collections: {', '.join(collections)}\n")
+    print(f"{'search':<22} {'p50 ms':>8} {'p95 ms':>8} {'hit@k':>6} {'collections':>12} {'dropped':>8}")
+    for name, result in (("single index", single), (f"fan-out ({args.deadline_ms:.0f}ms)", fanout)):
+        print(
+            f"{name:<22} {percentile(result['latencies'], 0.5):>8.1f} {percentile(result['latencies'], 0.95):>8.1f} "
+            f"{result['hits'] / total:>6.2f} {statistics.mean(result['collections']):>12.2f} "
+            f"{result.get('dropped', 0):>8}"
+        )
+
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Benchmark reduced-precision first-pass search against full precision
+
+Reports, per mode: HNSW index size, index build time, query latency
+(p50/p95) and recall@k against the full-precision vector index.
+
+Usage (from backend/):
+    python -m benchmarks.quantization_benchmark --queries 50 --top-k 5 \
+        --modes halfvec:1536 binary:1536 halfvec:512 binary:512
+"""
+import argparse
+import json
+import statistics
+import time
+from typing import List, Tuple
+from config import settings
+from vector_store.pgvector_store import PgVectorStore
+
+
+def parse_mode(value: str) -> Tuple[str, int]:
+    """Parse a 'quantization:dimensions' CLI argument"""
+    quantization, _, dims = value.partition(":")
+    return quantization, int(dims or settings.embedding_dimension)
+
+
+def sample_query_embeddings(store: PgVectorStore, count: int) -> List[List[float]]:
+    """Use stored chunk embeddings as queries so no API calls are needed"""
+    with store.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT embedding::text FROM documents ORDER BY random() LIMIT %s",
+            (count,)
+        )
+        return [json.loads(row[0]) for row in cursor.fetchall()]
+
+
+def index_size_bytes(store: PgVectorStore, index_name: str) -> int:
+    """On-disk size of an index"""
+    with store.connection.cursor() as cursor:
+        cursor.execute("SELECT pg_relation_size(%s::regclass)", (index_name,))
+        return cursor.fetchone()[0]
+
+
+def run_queries(
+    store: PgVectorStore,
+    queries: List[List[float]],
+    top_k: int
+) -> Tuple[List[List[int]], List[float]]:
+    """Run every query and return (result ids, latencies in ms)"""
+    all_ids = []
+    latencies = []
+    for embedding in queries:
+        start = time.perf_counter()
+        docs = store.similarity_search(embedding, top_k=top_k, similarity_threshold=-1.0)
+        latencies.append((time.perf_counter() - start) * 1000)
+        all_ids.append([doc.id for doc in docs])
+    return all_ids, latencies
+
+
+def recall(expected: List[List[int]], actual: List[List[int]]) -> float:
+    """Mean recall@k of actual results against the full-precision results"""
+    scores = []
+    for truth, found in zip(expected, actual):
+        if truth:
+            scores.append(len(set(truth) & set(found)) / len(truth))
+    return statistics.mean(scores) if scores else 0.0
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=settings.retrieval_top_k)
+    parser.add_argument("--multiplier", type=int, default=settings.quantization_rerank_multiplier)
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        default=["halfvec:1536", "binary:1536", "halfvec:512", "binary:512"],
+        help="quantization:dimensions pairs (quantization in none/halfvec/binary)"
+    )
+    parser.add_argument("--rebuild", action="store_true", help="Drop and rebuild indexes to time the build")
+    args = parser.parse_args()
+
+    store = PgVectorStore()
+    store.quantization = "none"
+    store.search_dimensions = None
+    store.rerank_multiplier = args.multiplier
+
+    queries = sample_query_embeddings(store, args.queries)
+    if not queries:
+        print("No documents in the database; run ingestion first")
+        return
+
+    baseline_ids, baseline_latencies = run_queries(store, queries, args.top_k)
+    rows = [(
+        "full",
+        settings.embedding_dimension,
+        index_size_bytes(store, "documents_embedding_idx"),
+        None,
+        percentile(baseline_latencies, 0.5),
+        percentile(baseline_latencies, 0.95),
+        1.0
+    )]
+
+    for mode in args.modes:
+        quantization, dims = parse_mode(mode)
+        store.quantization = quantization
+        store.search_dimensions = dims if dims < settings.embedding_dimension else None
+
+        index_name = store.quantized_index_name()
+        if args.rebuild:
+            with store.connection.cursor() as cursor:
+                cursor.execute(f"DROP INDEX IF EXISTS {index_name}")
+                store.connection.commit()
+
+        start = time.perf_counter()
+        store.ensure_quantized_index()
+        build_seconds = time.perf_counter() - start
+
+        ids, latencies = run_queries(store, queries, args.top_k)
+        rows.append((
+            quantization,
+            dims,
+            index_size_bytes(store, index_name),
+            build_seconds if args.rebuild else None,
+            percentile(latencies, 0.5),
+            percentile(latencies, 0.95),
+            recall(baseline_ids, ids)
+        ))
+
+    print(f"\n{len(queries)} queries, top_k={args.top_k}, rerank multiplier={args.multiplier}\n")
+    print(f"{'mode':<8} {'dims':>5} {'index KB':>10} {'build s':>8} {'p50 ms':>8} {'p95 ms':>8} {'recall':>7}")
+    for name, dims, size, build, p50, p95, rec in rows:
+        build_str = f"{build:.2f}" if build is not None else "-"
+        print(f"{name:<8} {dims:>5} {size / 1024:>10.0f} {build_str:>8} {p50:>8.2f} {p95:>8.2f} {rec:>7.3f}")
+
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+"""
+Benchmark question set with the source document expected to answer each question
+"""
+
+BENCHMARK_QUESTIONS = [
+    ("What are the API rate limits for the premium tier?", "confluence/api-rate-limiting-policy.md"),
+    ("How does our fraud detection system work?", "confluence/fraud-detection-system.md"),
+    ("What are our Q1 2024 OKRs?", "confluence/q1-2024-okrs-growth.md"),
+    ("Tell me about the customer onboarding flow", "confluence/customer-onboarding-v2.md"),
+    ("What payment gateways do we support?", "confluence/payment-gateway-integration.md"),
+    ("How do we run A/B tests?", "confluence/experimentation-framework.md"),
+    ("Which database do we use in production?", "confluence/infrastructure-architecture.md"),
+    ("What is the path of the get account endpoint?", "product_specs/api-endpoints.json"),
+    ("What does error code 429 mean in the public API?", "product_specs/api-endpoints.json"),
+    ("What information is required for tier 1 KYC verification?", "product_specs/compliance-kyc-aml.txt"),
+    ("How long do we retain customer personal data?", "product_specs/data-privacy-gdpr-policy.txt"),
+    ("Does the mobile app support biometric login?", "product_specs/mobile-app-features.md"),
+    ("What was the root cause of the API key exposure incident?", "meetings/2024-02-01-security-incident-postmortem.md"),
+    ("What was decided in the payment gateway review meeting?", "meetings/2024-01-15-payment-gateway-review.md"),
+    ("Which features are planned for Q2 2024?", "meetings/2024-02-20-product-roadmap-q2.md"),
+]
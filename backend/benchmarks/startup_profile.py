@@ -0,0 +1,76 @@
+"""
+Profile backend import time to guard cold-start regressions
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter and
+reports the total import time and the slowest modules (cumulative). Heavy
+dependencies (openai, langgraph, pypdf, tiktoken, sentence-transformers)
+should not show up here: they are imported lazily on first use. With
+--max-ms the script exits non-zero when the total exceeds the budget, so it
+can run in CI.
+
+Usage (from backend/):
+    python -m benchmarks.startup_profile --top 15 --max-ms 1500
+"""
+import argparse
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import List, Tuple
+
+# "import time: self [us] | cumulative | imported package"
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S.*)$")
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def profile_imports(module: str) -> List[Tuple[str, int, int]]:
+    """
+    Import a module in a subprocess with -X importtime
+
+    Args:
+        module: Module to import (e.g. 'main')
+
+    Returns:
+        List of (module name, nesting depth, cumulative microseconds)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            _, cumulative, indent, name = match.groups()
+            entries.append((name.strip(), (len(indent) - 1) // 2, int(cumulative)))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to show")
+    parser.add_argument("--max-ms", type=float, default=None, help="Fail if total import time exceeds this")
+    args = parser.parse_args()
+
+    entries = profile_imports(args.module)
+    # Top-level imports (depth 0) add up to the interpreter's total import time
+    total_ms = sum(cumulative for _, depth, cumulative in entries if depth == 0) / 1000
+
+    print(f"\nimport {args.module}: {total_ms:.0f}ms total\n")
+    print(f"{'module':<50} {'cumulative ms':>14}")
+    for name, depth, cumulative in sorted(entries, key=lambda e: e[2], reverse=True)[:args.top]:
+        print(f"{'  ' * depth + name:<50} {cumulative / 1000:>14.1f}")
+
+    if args.max_ms is not None and total_ms > args.max_ms:
+        print(f"\nStartup import budget exceeded: {total_ms:.0f}ms > {args.max_ms:.0f}ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Measure per-query allocations and CPU time of the retrieval state path
+
+Replays the work the graph does on each query's search results - row
+conversion, re-rank, context evaluation and formatting - over synthetic
+rows shaped like real chunks. The previous path (Document objects with the
+whole metadata JSONB, converted to dicts, copied on re-rank and formatted
+eagerly) is compared with RetrievedChunk objects passed through unchanged,
+with the context text built once, directly for the prompt. --no-prompt
+measures retrieval-only runs (the streaming endpoint's retrieval graph),
+where the previous path still formatted the context.
+
+Usage (from backend/):
+    python -m benchmarks.state_benchmark --queries 2000 --candidates 20
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+from graph.nodes import build_context, format_sources
+from vector_store.pgvector_store import Document, RetrievedChunk
+
+
+def synthetic_rows(count: int, with_metadata: bool) -> List[tuple]:
+    """Search result rows; with_metadata adds the full JSONB column the old query returned"""
+    rows = []
+    for i in range(count):
+        source = f"confluence/page_{i % 37}.md"
+        metadata = {
+            "source": source,
+            "type": "confluence",
+            "format": "markdown",
+            "chunk_index": i,
+            "total_chunks": 40,
+            "title": f"Page {i % 37}",
+            "section": "Overview > Details",
+            "token_count": 480,
+            "file_hash": "f" * 64,
+        }
+        content = ("Skyro internal documentation sentence. " * 60)[:1800]
+        similarity = random.uniform(0.6, 0.95)
+        if with_metadata:
+            rows.append((i, content, metadata, similarity))
+        else:
+            rows.append((i, content, source, "confluence", i, similarity, 0.0))
+    return rows
+
+
+def legacy_query(rows: List[tuple], top_k: int, build_prompt: bool) -> Dict[str, Any]:
+    """Previous behaviour: Documents -> dicts -> re-rank copies -> eager context and sources"""
+    documents = []
+    for doc_id, content, metadata, similarity in rows:
+        metadata = dict(metadata)
+        metadata["similarity"] = float(similarity)
+        metadata["document_id"] = doc_id
+        documents.append(Document(content=content, metadata=metadata, id=doc_id))
+
+    docs = [
+        {"content": doc.content, "metadata": doc.metadata, "similarity": doc.metadata.get("similarity", 0.0)}
+        for doc in documents
+    ]
+    docs = sorted(
+        ({**doc, "rerank_score": doc["similarity"]} for doc in docs),
+        key=lambda doc: doc["rerank_score"],
+        reverse=True
+    )[:top_k]
+    sum(doc["similarity"] for doc in docs) / len(docs)
+
+    context_parts = []
+    sources = []
+    for i, doc in enumerate(docs, 1):
+        metadata = doc["metadata"]
+        context_parts.append(
+            f"[Document {i}] (Relevance: {doc['similarity']:.2f})\n"
+            f"Source: {metadata.get('source', 'Unknown')}\n"
+            f"Type: {metadata.get('type', 'Unknown')}\n"
+            f"Content:\n{doc['content']}\n"
+        )
+        sources.append({
+            "source": metadata.get("source", "Unknown"),
+            "type": metadata.get("type", "Unknown"),
+            "relevance": f"{doc['similarity']:.2f}",
+            "chunk_index": metadata.get("chunk_index")
+        })
+    # The context was always built, and copied into the prompt when one was sent
+    context = "\n---\n".join(context_parts)
+    prompt = f"Context from internal documents:\n{context}" if build_prompt else None
+    return {"sources": sources, "prompt": prompt}
+
+
+def current_query(rows: List[tuple], top_k: int, build_prompt: bool) -> Dict[str, Any]:
+    """Current behaviour: RetrievedChunks re-ranked in place, context built only for the prompt"""
+    chunks = [
+        RetrievedChunk(row[0], row[1], row[2], row[3], row[4], float(row[5]), float(row[6]))
+        for row in rows
+    ]
+    for chunk in chunks:
+        chunk.rerank_score = chunk.similarity
+    chunks = sorted(chunks, key=lambda chunk: chunk.rerank_score, reverse=True)[:top_k]
+    sum(chunk.similarity for chunk in chunks) / len(chunks)
+
+    sources = format_sources(chunks)
+    prompt = f"Context from internal documents:\n{build_context(chunks)}" if build_prompt else None
+    return {"sources": sources, "prompt": prompt}
+
+
+def measure(fn: Callable, rows: List[tuple], queries: int, top_k: int, build_prompt: bool) -> Dict[str, float]:
+    """Per-query CPU time, allocated blocks and peak bytes"""
+    fn(rows, top_k, build_prompt)  # warm up
+
+    start = time.process_time()
+    for _ in range(queries):
+        fn(rows, top_k, build_prompt)
+    cpu_us = (time.process_time() - start) / queries * 1e6
+
+    tracemalloc.start()
+    before = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    result = fn(rows, top_k, build_prompt)
+    after = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    return {"cpu_us": cpu_us, "live_blocks": after - before, "peak_kb": peak / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--candidates", type=int, default=20, help="Rows returned by the search (rerank_candidates)")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--no-prompt", action="store_true", help="Stop after the sources (retrieval-only runs)")
+    args = parser.parse_args()
+
+    random.seed(0)
+    build_prompt = not args.no_prompt
+    results = {
+        "before (Document + dicts)": measure(
+            legacy_query, synthetic_rows(args.candidates, True), args.queries, args.top_k, build_prompt
+        ),
+        "after (RetrievedChunk)": measure(
+            current_query, synthetic_rows(args.candidates, False), args.queries, args.top_k, build_prompt
+        ),
+    }
+
+    print(f"\n{args.queries} queries, {args.candidates} candidates, top {args.top_k}\n")
+    print(f"{'path':<28} {'cpu us/query':>13} {'live blocks':>12} {'peak KB':>9}")
+    for name, result in results.items():
+        print(f"{name:<28} {result['cpu_us']:>13.1f} {result['live_blocks']:>12} {result['peak_kb']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Server-side conversation sessions: Postgres persistence with an in-process LRU
+"""
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, ContextManager, Dict, List, Optional
+from psycopg2.extras import Json
+from config import settings
+from utils.logger import logger
+from utils.tokens import count_tokens
+
+
+@dataclass
+class Session:
+    """Conversation state for one chat session"""
+    session_id: str
+    turns: List[Dict[str, Any]] = field(default_factory=list)
+    # Query embedding and retrieved docs from the previous turn (for reuse)
+    last_retrieval: Optional[Dict[str, Any]] = None
+
+    def history_window(self, max_tokens: int) -> List[Dict[str, str]]:
+        """
+        Most recent turns that fit in a token budget
+
+        Args:
+            max_tokens: Token budget for the returned history
+
+        Returns:
+            List of {'role', 'content'} messages, oldest first
+        """
+        window = []
+        used = 0
+        for turn in reversed(self.turns):
+            tokens = count_tokens(turn["content"])
+            if used + tokens > max_tokens:
+                break
+            window.append({"role": turn["role"], "content": turn["content"]})
+            used += tokens
+        return list(reversed(window))
+
+
+class SessionStore:
+    """
+    Load and save sessions, keeping hot sessions in an LRU cache
+
+    Methods block on Postgres, so async handlers call them on the threadpool;
+    each call borrows its own connection from connection_factory.
+    """
+
+    def __init__(self, connection_factory: Callable[[], ContextManager], capacity: Optional[int] = None):
+        self._connection = connection_factory
+        self.capacity = capacity or settings.session_cache_size
+        self._cache: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self) -> Session:
+        """Create and persist a new empty session"""
+        session = Session(session_id=str(uuid.uuid4()))
+        self.save(session)
+        return session
+
+    def get(self, session_id: str) -> Optional[Session]:
+        """
+        Get a session from the LRU, falling back to Postgres
+
+        Args:
+            session_id: Session UUID
+
+        Returns:
+            Session, or None if it does not exist
+        """
+        with self._lock:
+            session = self._cache.get(session_id)
+            if session is not None:
+                self._cache.move_to_end(session_id)
+                return session
+
+        query = """
+            SELECT turns, last_retrieval
+            FROM conversation_sessions
+            WHERE session_id = %s
+        """
+
+        try:
+            with self._connection() as connection, connection.cursor() as cursor:
+                cursor.execute(query, (session_id,))
+                row = cursor.fetchone()
+        except Exception as e:
+            logger.error(f"Failed to load session {session_id}: {e}")
+            return None
+
+        if row is None:
+            return None
+
+        session = Session(session_id=session_id, turns=row[0] or [], last_retrieval=row[1])
+        self._remember(session)
+        return session
+
+    def record_turn(
+        self,
+        session: Session,
+        question: str,
+        answer: str,
+        sources: List[Dict[str, str]],
+        last_retrieval: Optional[Dict[str, Any]] = None
+    ):
+        """Append a question/answer exchange to the session and persist it"""
+        session.turns.append({"role": "user", "content": question})
+        session.turns.append({"role": "assistant", "content": answer, "sources": sources})
+        # Keep the stored history bounded; generation only sees a token window anyway
+        session.turns = session.turns[-settings.session_max_turns * 2:]
+        if last_retrieval is not None:
+            session.last_retrieval = last_retrieval
+        self.save(session)
+
+    def save(self, session: Session):
+        """Upsert a session into Postgres and the LRU"""
+        query = """
+            INSERT INTO conversation_sessions (session_id, turns, last_retrieval, updated_at)
+            VALUES (%s, %s, %s, NOW())
+            ON CONFLICT (session_id) DO UPDATE
+            SET turns = EXCLUDED.turns,
+                last_retrieval = EXCLUDED.last_retrieval,
+                updated_at = NOW()
+        """
+
+        try:
+            with self._connection() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        query,
+                        (session.session_id, Json(session.turns), Json(session.last_retrieval))
+                    )
+                connection.commit()
+        except Exception as e:
+            logger.error(f"Failed to save session {session.session_id}: {e}")
+            raise
+
+        self._remember(session)
+
+    def delete(self, session_id: str) -> bool:
+        """Delete a session; returns True if it existed"""
+        with self._lock:
+            self._cache.pop(session_id, None)
+
+        try:
+            with self._connection() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "DELETE FROM conversation_sessions WHERE session_id = %s",
+                        (session_id,)
+                    )
+                    deleted = cursor.rowcount > 0
+                connection.commit()
+                return deleted
+        except Exception as e:
+            logger.error(f"Failed to delete session {session_id}: {e}")
+            raise
+
+    def _remember(self, session: Session):
+        with self._lock:
+            self._cache[session.session_id] = session
+            self._cache.move_to_end(session.session_id)
+            while len(self._cache) > self.capacity:
+                self._cache.popitem(last=False)
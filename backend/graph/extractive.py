@@ -0,0 +1,166 @@
+"""
+Extractive fast answers: the best-matching sentences of the retrieved chunks, with citations
+"""
+import importlib.util
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from config import settings
+from ingestion.embedder import Embedder
+from utils.logger import logger
+from utils.metrics import metrics
+from utils.shared_cache import shared_cache
+from utils.text import cache_key
+from vector_store.pgvector_store import RetrievedChunk
+
+# numpy comes with pgvector; without it the extractive path stays off
+NUMPY_AVAILABLE = importlib.util.find_spec("numpy") is not None
+
+# Sentence ends, or line breaks (list items, table rows, JSON lines)
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(\[])|\n+")
+MIN_SENTENCE_WORDS = 4
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split chunk text into sentences worth quoting on their own"""
+    sentences = []
+    for part in SENTENCE_BOUNDARY.split(text):
+        sentence = part.strip(" \t-*#>•")
+        if len(sentence.split()) >= MIN_SENTENCE_WORDS:
+            sentences.append(sentence)
+    return sentences
+
+
+class SentenceScorer:
+    """
+    Score every sentence of the retrieved chunks against the query in one matrix product
+
+    Sentence embeddings are cached per chunk text (content-addressed, so
+    re-ingested text gets new embeddings): an in-process LRU of normalized
+    float32 matrices in front of the shared cache. Sentences of chunks seen
+    for the first time are embedded in a single batched call.
+    """
+
+    def __init__(self, embedder: Embedder):
+        self.embedder = embedder
+        self.capacity = settings.extractive_cache_chunks
+        self._local: "OrderedDict[str, Tuple[List[str], object]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _sentences(self, chunks: List[RetrievedChunk]) -> List[Tuple[List[str], object]]:
+        """(sentences, normalized embedding matrix) per chunk"""
+        import numpy as np
+
+        keys = [cache_key(self.embedder.model, chunk.content) for chunk in chunks]
+        entries: List[Optional[Tuple[List[str], object]]] = []
+        with self._lock:
+            for key in keys:
+                entry = self._local.get(key)
+                if entry is not None:
+                    self._local.move_to_end(key)
+                entries.append(entry)
+
+        missing = []
+        for i, (chunk, key) in enumerate(zip(chunks, keys)):
+            if entries[i] is not None:
+                continue
+            cached = shared_cache.get("sentences", key)
+            if cached is not None:
+                entries[i] = (cached["sentences"], np.asarray(cached["embeddings"], dtype=np.float32))
+            else:
+                missing.append(i)
+
+        texts = [(i, sentence) for i in missing for sentence in split_sentences(chunks[i].content)]
+        vectors = self.embedder.embed_texts([sentence for _, sentence in texts]) if texts else []
+        for i in missing:
+            rows = [(sentence, vector) for (j, sentence), vector in zip(texts, vectors) if j == i]
+            if rows:
+                embeddings = np.asarray([vector for _, vector in rows], dtype=np.float32)
+                embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+            else:
+                embeddings = np.zeros((0, settings.embedding_dimension), dtype=np.float32)
+            entries[i] = ([sentence for sentence, _ in rows], embeddings)
+            shared_cache.set(
+                "sentences",
+                keys[i],
+                {"sentences": entries[i][0], "embeddings": embeddings.tolist()},
+                settings.extractive_cache_ttl_seconds
+            )
+        if missing:
+            metrics.increment("extractive.chunks_embedded", len(missing))
+
+        with self._lock:
+            for key, entry in zip(keys, entries):
+                self._local[key] = entry
+                self._local.move_to_end(key)
+            while len(self._local) > self.capacity:
+                self._local.popitem(last=False)
+        return entries
+
+    def best_sentences(
+        self,
+        query_embedding: List[float],
+        chunks: List[RetrievedChunk]
+    ) -> List[Tuple[float, RetrievedChunk, str]]:
+        """
+        Find the sentences that answer the query
+
+        Args:
+            query_embedding: Embedding of the retrieval query
+            chunks: Retrieved chunks, best first
+
+        Returns:
+            Up to extractive_max_sentences (score, chunk, sentence) tuples in
+            reading order, or [] when no sentence scores at least
+            extractive_min_sentence_score
+        """
+        import numpy as np
+
+        entries = self._sentences(chunks)
+        owners = [(c, s) for c, (sentences, _) in enumerate(entries) for s in range(len(sentences))]
+        if not owners:
+            return []
+
+        matrix = np.vstack([embeddings for _, embeddings in entries if len(embeddings)])
+        query = np.asarray(query_embedding, dtype=np.float32)
+        scores = matrix @ (query / np.linalg.norm(query))
+
+        best = float(scores.max())
+        if best < settings.extractive_min_sentence_score:
+            return []
+
+        picked = np.argsort(-scores)[:settings.extractive_max_sentences]
+        picked = [i for i in picked if scores[i] >= best - settings.extractive_sentence_margin]
+        return [
+            (float(scores[i]), chunks[owners[i][0]], entries[owners[i][0]][0][owners[i][1]])
+            for i in sorted(picked, key=lambda i: owners[i])
+        ]
+
+
+def format_extractive_answer(picked: List[Tuple[float, RetrievedChunk, str]]) -> str:
+    """Quote the sentences, each followed by its citation"""
+    return "\n".join(f"{sentence} [{chunk.source or 'Unknown'}]" for _, chunk, sentence in picked)
+
+
+def build_scorer(embedder: Embedder) -> Optional[SentenceScorer]:
+    """The sentence scorer, or None when numpy is not installed"""
+    if not NUMPY_AVAILABLE:
+        logger.warning("numpy not installed, extractive answers disabled")
+        return None
+    return SentenceScorer(embedder)
+
+
+def extractive_status() -> Dict[str, Any]:
+    """Share of answered queries served by the extractive path, for the metrics endpoint"""
+    counters = metrics.snapshot()["counters"]
+    served = counters.get("extractive.served", 0)
+    fallbacks = counters.get("extractive.fallbacks", 0)
+    skipped = counters.get("extractive.skipped", 0)
+    total = served + fallbacks + skipped
+    return {
+        "served": served,
+        "fallbacks": fallbacks,
+        "skipped": skipped,
+        "served_fraction": round(served / total, 3) if total else None
+    }
@@ -1,42 +1,323 @@
-from typing import Dict, Any
+import math
+import time
+from typing import Dict, Any, Iterator, List
 from graph.state import GraphState
-from vector_store.pgvector_store import PgVectorStore
+from vector_store.pgvector_store import PgVectorStore, RetrievedChunk, configured_collections
 from ingestion.embedder import Embedder
-from openai import OpenAI
+from graph.reranker import CrossEncoderReranker
+from graph.query_classifier import classify, dominant_doc_type
+from graph.extractive import build_scorer, format_extractive_answer
+from llm.router import LLMRouter
 from config import settings
 from utils.logger import logger
+from utils.metrics import metrics
+from utils.openai_client import CircuitOpenError, get_openai_client, guarded, with_deadline
+
+
+REWRITE_PROMPTS = {
+    "rewrite": (
+        "Rewrite the user's question as a standalone search query for Skyro's "
+        "internal documentation (Confluence pages, meeting notes, product specs). "
+        "Expand abbreviations and add likely synonyms. Return only the query."
+    ),
+    "hyde": (
+        "Write a short passage (3-4 sentences) from Skyro's internal documentation "
+        "that would answer the user's question. Return only the passage."
+    ),
+}
+
+CONDENSE_PROMPT = (
+    "Given a conversation and a follow-up question, rewrite the follow-up as a "
+    "standalone question that can be understood without the conversation. "
+    "Keep names, systems and dates from earlier turns. Return only the question."
+)
+
+
+def _cosine_similarity(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+def merge_with_quotas(
+    results: Dict[str, List[RetrievedChunk]],
+    top_k: int,
+    min_per_collection: int,
+    max_per_collection: int
+) -> List[RetrievedChunk]:
+    """
+    Merge per-collection results into one top-k list
+
+    Each collection with hits first gets up to min_per_collection of its best
+    chunks; remaining slots go to the best chunks overall (similarity plus
+    feedback boost), with no collection exceeding max_per_collection.
+
+    Args:
+        results: Collection -> chunks, best first
+        top_k: Number of chunks to keep
+        min_per_collection: Slots reserved per collection
+        max_per_collection: Most chunks kept from one collection
+
+    Returns:
+        Merged chunks, best first
+    """
+    def score(chunk: RetrievedChunk) -> float:
+        return chunk.similarity + (chunk.boost or 0.0)
+
+    max_per_collection = max(max_per_collection, min_per_collection, 1)
+    kept: List[RetrievedChunk] = []
+    counts = {collection: 0 for collection in results}
+
+    for collection, chunks in results.items():
+        for chunk in chunks[:min_per_collection]:
+            kept.append(chunk)
+            counts[collection] += 1
+
+    remaining = sorted(
+        (
+            (collection, chunk)
+            for collection, chunks in results.items()
+            for chunk in chunks[min_per_collection:]
+        ),
+        key=lambda item: score(item[1]),
+        reverse=True
+    )
+    for collection, chunk in remaining:
+        if len(kept) >= top_k:
+            break
+        if counts[collection] < max_per_collection:
+            kept.append(chunk)
+            counts[collection] += 1
+
+    # Reserved slots can overshoot top_k when there are many collections
+    return sorted(kept, key=score, reverse=True)[:top_k]
+
+
+def format_sources(chunks: List[RetrievedChunk]) -> List[Dict[str, Any]]:
+    """API source entries for the retrieved chunks"""
+    return [
+        {
+            "source": chunk.source or "Unknown",
+            "type": chunk.doc_type or "Unknown",
+            "relevance": f"{chunk.similarity:.2f}",
+            "chunk_index": chunk.chunk_index
+        }
+        for chunk in chunks
+    ]
+
+
+def build_context(chunks: List[RetrievedChunk]) -> str:
+    """LLM context text for the retrieved chunks, built only when a prompt needs it"""
+    if not chunks:
+        return "No relevant information found."
+
+    return "\n---\n".join(
+        f"[Document {i}] (Relevance: {chunk.similarity:.2f})\n"
+        f"Source: {chunk.source or 'Unknown'}\n"
+        f"Type: {chunk.doc_type or 'Unknown'}\n"
+        f"Content:\n{chunk.content}\n"
+        for i, chunk in enumerate(chunks, 1)
+    )
 
 
 class RAGNodes:
     def __init__(self):
         self.vector_store = PgVectorStore()
         self.embedder = Embedder()
-        self.llm_client = OpenAI(api_key=settings.openai_api_key)
+        self.llm_client = get_openai_client()
+        self.router = LLMRouter()
+        self.reranker = CrossEncoderReranker() if settings.rerank_enabled else None
+        self.collections = configured_collections() if settings.retrieval_fanout_enabled else []
+        self.sentence_scorer = build_scorer(self.embedder) if settings.extractive_answers_enabled else None
         logger.info("Initialized RAG nodes")
 
-    def retrieve_documents(self, state: GraphState) -> GraphState:
+    def _chat(self, state: GraphState, **kwargs):
+        """OpenAI chat completion for query rewriting, bounded by the query's remaining budget"""
+        client = with_deadline(self.llm_client, state.get("started_at"))
+        return guarded(
+            "chat_stream" if kwargs.get("stream") else "chat",
+            lambda: client.chat.completions.create(**kwargs)
+        )
+
+    def condense_question(self, state: GraphState) -> GraphState:
+        """Turn a follow-up question into a standalone retrieval query"""
         query = state["query"]
+        history = state.get("history") or []
+
+        if not history:
+            state["retrieval_query"] = query
+            return state
+
+        transcript = "\n".join(f"{turn['role']}: {turn['content']}" for turn in history)
+
+        try:
+            response = self._chat(
+                state,
+                model=settings.query_rewrite_model,
+                messages=[
+                    {"role": "system", "content": CONDENSE_PROMPT},
+                    {"role": "user", "content": f"Conversation:\n{transcript}\n\nFollow-up question: {query}"}
+                ],
+                temperature=0,
+                max_tokens=100
+            )
+            state["retrieval_query"] = response.choices[0].message.content.strip()
+            logger.info(f"Condensed follow-up to: {state['retrieval_query'][:100]}...")
+        except Exception as e:
+            logger.error(f"Failed to condense question: {e}")
+            state["retrieval_query"] = query
+
+        return state
+
+    def lookup_precomputed_answer(self, state: GraphState) -> GraphState:
+        """Serve a pre-generated answer when the question matches a frequent question cluster"""
+        query = state.get("retrieval_query") or state["query"]
+        start = time.perf_counter()
+        try:
+            # Cached, so retrieve_documents gets the same embedding for free on a miss
+            query_embedding = self.embedder.embed_query(query)
+            hit = self.vector_store.find_precomputed_answer(query_embedding, settings.answer_index_min_similarity)
+        except Exception as e:
+            logger.error(f"Precomputed answer lookup failed: {e}")
+            hit = None
+        metrics.observe("answer_index.lookup_ms", (time.perf_counter() - start) * 1000)
+
+        if hit is None:
+            metrics.increment("answer_index.misses")
+            return state
+
+        state["query_embedding"] = query_embedding
+        state["answer"] = hit["answer"]
+        state["sources"] = hit["sources"]
+
+        metrics.increment("answer_index.hits")
+        metrics.increment("llm_calls_avoided.answer_index")
+        logger.info(
+            f"Served precomputed answer {hit['id']} for '{hit['question'][:60]}' "
+            f"(similarity {hit['similarity']:.3f}, generated {hit['age_seconds'] / 3600:.1f}h ago)"
+        )
+        return state
+
+    def retrieve_documents(self, state: GraphState) -> GraphState:
+        query = state.get("retrieval_query") or state["query"]
         logger.info(f"Retrieving documents for query: {query[:100]}...")
 
+        # Over-fetch candidates in the same query when a cross-encoder will re-rank them
+        reranking = self.reranker is not None and self.reranker.available
+        top_k = settings.rerank_candidates if reranking else settings.retrieval_top_k
+
         query_embedding = self.embedder.embed_query(query)
-        similar_docs = self.vector_store.similarity_search(
+        state["query_embedding"] = query_embedding
+
+        # Follow-ups about the same topic reuse the previous turn's chunks
+        previous = state.get("last_retrieval")
+        if (
+            previous
+            and previous.get("docs")
+            and _cosine_similarity(query_embedding, previous["embedding"]) >= settings.session_reuse_similarity
+        ):
+            logger.info("Reusing documents retrieved in the previous turn")
+            metrics.increment("session.retrieval_reused")
+            state["retrieved_docs"] = [RetrievedChunk.from_dict(doc) for doc in previous["docs"]]
+            return state
+
+        retrieved_docs = self._search(query_embedding, top_k)
+
+        logger.info(f"Retrieved {len(retrieved_docs)} documents")
+
+        state["retrieved_docs"] = retrieved_docs
+        return state
+
+    def _search(self, query_embedding: List[float], top_k: int) -> List[RetrievedChunk]:
+        if self.collections:
+            results = self.vector_store.fanout_similarity_search(
+                query_embedding,
+                self.collections,
+                top_k=top_k,
+                similarity_threshold=settings.retrieval_similarity_threshold,
+                deadline_ms=settings.retrieval_fanout_deadline_ms
+            )
+            return merge_with_quotas(
+                results,
+                top_k,
+                settings.retrieval_collection_min,
+                max(1, int(top_k * settings.retrieval_collection_max_share))
+            )
+
+        return self.vector_store.similarity_search(
             query_embedding=query_embedding,
-            top_k=settings.retrieval_top_k,
+            top_k=top_k,
             similarity_threshold=settings.retrieval_similarity_threshold
         )
 
-        retrieved_docs = [
-            {
-                "content": doc.content,
-                "metadata": doc.metadata,
-                "similarity": doc.metadata.get("similarity", 0.0)
-            }
-            for doc in similar_docs
-        ]
+    def rewrite_query(self, state: GraphState) -> GraphState:
+        """Rewrite the question (or write a HyDE passage) and merge a second retrieval"""
+        start = time.perf_counter()
+        query = state.get("retrieval_query") or state["query"]
+        strategy = settings.query_rewrite_strategy
+        state["retry_count"] = state.get("retry_count", 0) + 1
 
-        logger.info(f"Retrieved {len(retrieved_docs)} documents")
+        try:
+            response = self._chat(
+                state,
+                model=settings.query_rewrite_model,
+                messages=[
+                    {"role": "system", "content": REWRITE_PROMPTS.get(strategy, REWRITE_PROMPTS["rewrite"])},
+                    {"role": "user", "content": query}
+                ],
+                temperature=0,
+                max_tokens=200 if strategy == "hyde" else 100
+            )
+            rewritten = response.choices[0].message.content.strip()
+            logger.info(f"Retrying retrieval with {strategy}: {rewritten[:100]}...")
+
+            reranking = self.reranker is not None and self.reranker.available
+            fetch_k = settings.rerank_candidates if reranking else settings.retrieval_top_k
+            previous = state["retrieved_docs"]
+            seen = {chunk.id for chunk in previous}
+
+            added = [
+                chunk for chunk in self._search(self.embedder.embed_query(rewritten), fetch_k)
+                if chunk.id not in seen
+            ]
+            # New hits were scored against the rewrite (HyDE passages score higher);
+            # rescore them against the question so the merged set ranks on one scale
+            scores = self.vector_store.score_chunks(state["query_embedding"], [chunk.id for chunk in added])
+            for chunk in added:
+                chunk.similarity = scores.get(chunk.id, 0.0)
+
+            merged = sorted(
+                previous + [chunk for chunk in added if chunk.id in scores],
+                key=lambda chunk: chunk.similarity + chunk.boost,
+                reverse=True
+            )
+            # With a cross-encoder, rerank_documents (next node) picks the kept set
+            state["retrieved_docs"] = merged if reranking else merged[:settings.retrieval_top_k]
 
-        state["retrieved_docs"] = retrieved_docs
+            new_docs = sum(1 for chunk in state["retrieved_docs"] if chunk.id not in seen)
+            metrics.increment("query_rewrite.hits" if new_docs else "query_rewrite.misses")
+            logger.info(f"Query rewrite added {new_docs} new documents")
+
+        except Exception as e:
+            logger.error(f"Query rewrite failed: {e}")
+            metrics.increment("query_rewrite.errors")
+
+        metrics.observe("query_rewrite.latency_ms", (time.perf_counter() - start) * 1000)
+        return state
+
+    def rerank_documents(self, state: GraphState) -> GraphState:
+        retrieved_docs = state["retrieved_docs"]
+        top_k = settings.rerank_top_k
+
+        if self.reranker.is_decisive(retrieved_docs, top_k):
+            logger.info("Similarity scores are decisive, skipping re-rank")
+            state["retrieved_docs"] = retrieved_docs[:top_k]
+            return state
+
+        # Score against the standalone question retrieval used, not a raw follow-up
+        query = state.get("retrieval_query") or state["query"]
+        reranked = self.reranker.rerank(query, retrieved_docs, top_k)
+        state["retrieved_docs"] = reranked if reranked is not None else retrieved_docs[:top_k]
         return state
 
     def evaluate_context(self, state: GraphState) -> GraphState:
@@ -47,9 +328,10 @@ class RAGNodes:
             state["should_regenerate"] = True
             return state
 
-        avg_similarity = sum(doc["similarity"] for doc in retrieved_docs) / len(retrieved_docs)
+        avg_similarity = sum(chunk.similarity for chunk in retrieved_docs) / len(retrieved_docs)
+        state["context_confidence"] = avg_similarity
 
-        if avg_similarity < 0.75:
+        if avg_similarity < settings.context_similarity_threshold:
             logger.info(f"Low average similarity: {avg_similarity:.2f}")
             state["should_regenerate"] = True
         else:
@@ -58,46 +340,170 @@ class RAGNodes:
 
         return state
 
-    def format_context(self, state: GraphState) -> GraphState:
+    def extract_answer(self, state: GraphState) -> GraphState:
+        """Answer with the best-matching retrieved sentences when retrieval is confident"""
         retrieved_docs = state["retrieved_docs"]
+        if (
+            self.sentence_scorer is None
+            or not retrieved_docs
+            or not state.get("query_embedding")
+            or retrieved_docs[0].similarity < settings.extractive_min_similarity
+        ):
+            metrics.increment("extractive.skipped")
+            return state
 
-        if not retrieved_docs:
-            state["context"] = "No relevant information found."
-            state["sources"] = []
+        start = time.perf_counter()
+        try:
+            picked = self.sentence_scorer.best_sentences(
+                state["query_embedding"],
+                retrieved_docs[:settings.extractive_max_chunks]
+            )
+        except Exception as e:
+            logger.error(f"Extractive answer failed: {e}")
+            picked = []
+        metrics.observe("extractive.latency_ms", (time.perf_counter() - start) * 1000)
+
+        if not picked:
+            logger.info("No sentence answers the query on its own, generating with the LLM")
+            metrics.increment("extractive.fallbacks")
             return state
 
-        context_parts = []
-        sources = []
+        cited = list({id(chunk): chunk for _, chunk, _ in picked}.values())
+        state["sources"] = format_sources(cited)
+        state["answer"] = format_extractive_answer(picked)
 
-        for i, doc in enumerate(retrieved_docs, 1):
-            content = doc["content"]
-            metadata = doc["metadata"]
-            similarity = doc["similarity"]
+        metrics.increment("extractive.served")
+        metrics.increment("llm_calls_avoided.extractive")
+        logger.info(f"Answered extractively with {len(picked)} sentences (best {picked[0][0]:.2f})")
+        return state
 
-            context_parts.append(
-                f"[Document {i}] (Relevance: {similarity:.2f})\n"
-                f"Source: {metadata.get('source', 'Unknown')}\n"
-                f"Type: {metadata.get('type', 'Unknown')}\n"
-                f"Content:\n{content}\n"
-            )
+    def classify_query(self, state: GraphState) -> GraphState:
+        """Pick the model tier, max_tokens and context size for this query"""
+        query = state.get("retrieval_query") or state["query"]
+        route = classify(
+            query,
+            state["retrieved_docs"],
+            state.get("context_confidence"),
+            state.get("history"),
+            state.get("retry_count", 0)
+        )
+        state["answer_route"] = route
+
+        metrics.increment(f"classifier.{route.label}")
+        logger.info(
+            f"Query classified as {route.label} "
+            f"(words={len(query.split())}, confidence={state.get('context_confidence') or 0.0:.2f}, "
+            f"doc_type={dominant_doc_type(state['retrieved_docs'])}, history={bool(state.get('history'))}, "
+            f"retries={state.get('retry_count', 0)}): tier={route.tier}, max_tokens={route.max_tokens}, "
+            f"context_docs={route.context_docs}"
+        )
+        return state
+
+    def format_context(self, state: GraphState) -> GraphState:
+        """Attach the API sources; the context text is built when the prompt is"""
+        route = state.get("answer_route")
+        if route is not None:
+            state["retrieved_docs"] = state["retrieved_docs"][:route.context_docs]
+        retrieved_docs = state["retrieved_docs"]
+        if settings.parent_retrieval_mode in ("section", "window"):
+            retrieved_docs = state["retrieved_docs"] = self._expand_to_parents(retrieved_docs)
+        state["sources"] = format_sources(retrieved_docs)
 
-            sources.append({
-                "source": metadata.get("source", "Unknown"),
-                "type": metadata.get("type", "Unknown"),
-                "relevance": f"{similarity:.2f}"
-            })
+        logger.info(f"Formatted sources for {len(retrieved_docs)} documents")
+        return state
+
+    def _expand_to_parents(self, chunks: List[RetrievedChunk]) -> List[RetrievedChunk]:
+        """
+        Replace small-to-big child hits with their larger surrounding text
+
+        "section" swaps each hit's content for its parent section; hits that
+        share a parent collapse into the best-ranked one. "window" joins the
+        parent_window_chunks neighbours on each side; overlapping windows of
+        one source are merged into the best-ranked hit. Either way the text
+        is fetched in one batched query and expanded hits are new chunks, so
+        the retrieved child hits (e.g. cached or stored with a session) keep
+        their own content, as do hits without a parent.
+        """
+        if not chunks:
+            return chunks
+
+        start = time.perf_counter()
+        expanded: List[RetrievedChunk] = []
+
+        if settings.parent_retrieval_mode == "section":
+            parents = self.vector_store.get_parent_sections([chunk.id for chunk in chunks])
+            seen = set()
+            for chunk in chunks:
+                if chunk.id in parents:
+                    parent_key, text = parents[chunk.id]
+                    if parent_key in seen:
+                        continue
+                    seen.add(parent_key)
+                    chunk = chunk.with_content(text)
+                expanded.append(chunk)
+        else:
+            width = settings.parent_window_chunks
+            windows: Dict[int, List[int]] = {}  # kept hit id -> [first, last] chunk_index
+            for chunk in chunks:
+                if chunk.chunk_index is None:
+                    expanded.append(chunk)
+                    continue
+                first, last = chunk.chunk_index - width, chunk.chunk_index + width
+                owner = next(
+                    (
+                        kept for kept in expanded
+                        if kept.id in windows
+                        and kept.source == chunk.source
+                        and windows[kept.id][0] <= last + 1
+                        and first <= windows[kept.id][1] + 1
+                    ),
+                    None
+                )
+                if owner is not None:
+                    window = windows[owner.id]
+                    window[0], window[1] = min(window[0], first), max(window[1], last)
+                    continue
+                windows[chunk.id] = [first, last]
+                expanded.append(chunk)
+
+            texts = self.vector_store.get_chunk_windows([
+                (chunk.id, chunk.source, *windows[chunk.id]) for chunk in expanded if chunk.id in windows
+            ])
+            expanded = [
+                chunk.with_content(texts[chunk.id]) if chunk.id in texts else chunk
+                for chunk in expanded
+            ]
+
+        metrics.observe("retrieval.parent_expansion_ms", (time.perf_counter() - start) * 1000)
+        logger.info(f"Expanded {len(chunks)} hits to {len(expanded)} {settings.parent_retrieval_mode} contexts")
+        return expanded
+
+    def no_answer(self, state: GraphState) -> GraphState:
+        """Answer from a template with keyword-search suggestions, without the LLM"""
+        suggestions = self.vector_store.keyword_search(
+            state.get("retrieval_query") or state["query"],
+            limit=settings.no_answer_suggestions
+        )
+
+        answer = settings.no_answer_message
+        if suggestions:
+            answer += "\n\nThese documents may be related:\n" + "\n".join(
+                f"- {doc['source']} ({doc['type']})" for doc in suggestions
+            )
+        else:
+            answer += "\n\nTry rephrasing your question or naming a specific team, system or policy."
 
-        state["context"] = "\n---\n".join(context_parts)
-        state["sources"] = sources
+        state["sources"] = suggestions
+        state["answer"] = answer
 
-        logger.info(f"Formatted context with {len(retrieved_docs)} documents")
+        metrics.increment("llm_calls_avoided.no_answer")
+        logger.info(f"No documents retrieved, answered from template with {len(suggestions)} suggestions")
         return state
 
-    def generate_answer(self, state: GraphState) -> GraphState:
+    def _answer_messages(self, state: GraphState) -> List[Dict[str, str]]:
+        """Build the chat messages for answer generation"""
         query = state["query"]
-        context = state["context"]
-
-        logger.info("Generating answer with LLM...")
+        context = build_context(state["retrieved_docs"])
 
         system_prompt = """ 
         You are Skyro's AI Knowledge Assistant, an expert internal documentation system designed to provide comprehensive, accurate information to Skyro employees.
@@ -161,31 +567,118 @@ Question of user: {query}
 
 Please provide a clear and helpful answer based on the context above."""
 
+        route = state.get("answer_route")
+        if route is not None and route.label == "lookup":
+            # Keep short factual answers within the lookup max_tokens
+            user_prompt += "\nThis is a quick factual lookup: answer in 2-4 sentences."
+
+        return [
+            {"role": "system", "content": system_prompt},
+            *state.get("history", []),
+            {"role": "user", "content": user_prompt}
+        ]
+
+    def _answer_options(self, state: GraphState) -> Dict[str, Any]:
+        """Tier and max_tokens from classify_query, else the router's length-based tier"""
+        route = state.get("answer_route")
+        if route is not None:
+            return {"tier": route.tier, "max_tokens": route.max_tokens}
+        return {"tier": self.router.tier_for(state.get("retrieval_query") or state["query"], state.get("history"))}
+
+    def generate_answer(self, state: GraphState) -> GraphState:
+        logger.info("Generating answer with LLM...")
+
         try:
-            response = self.llm_client.chat.completions.create(
-                model=settings.llm_model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=settings.llm_temperature,
-                max_tokens=settings.llm_max_tokens
+            result = self.router.complete(
+                self._answer_messages(state),
+                **self._answer_options(state),
+                started_at=state.get("started_at")
             )
 
-            answer = response.choices[0].message.content
-            state["answer"] = answer
+            state["answer"] = result.text
+            state["tokens_used"] = state.get("tokens_used", 0) + result.tokens
 
-            logger.info("Answer generated successfully")
+            logger.info(f"Answer generated successfully by {result.provider} ({result.model})")
 
+        except CircuitOpenError:
+            # Every provider is down: the API fails the query fast with 503
+            raise
         except Exception as e:
             logger.error(f"Failed to generate answer: {e}")
             state["answer"] = f"Error generating answer: {str(e)}"
+            state["failed"] = True
 
         return state
 
+    def stream_answer(self, state: GraphState) -> Iterator[str]:
+        """
+        Generate the answer as a stream of text deltas
 
-def should_regenerate(state: GraphState) -> str:
+        Used instead of the generate_answer node for streaming responses.
+        The full answer is also written to state["answer"]; on an LLM error
+        the error text is yielded and state["failed"] is set. CircuitOpenError
+        (every provider down) is raised instead.
+        """
+        logger.info("Streaming answer from LLM...")
+        parts = []
+
+        try:
+            stream = self.router.stream(
+                self._answer_messages(state),
+                **self._answer_options(state),
+                started_at=state.get("started_at")
+            )
+            for chunk in stream:
+                if chunk.tokens:
+                    state["tokens_used"] = state.get("tokens_used", 0) + chunk.tokens
+                if chunk.text:
+                    parts.append(chunk.text)
+                    yield parts[-1]
+
+            logger.info("Answer streamed successfully")
+
+        except CircuitOpenError:
+            state["failed"] = True
+            raise
+        except Exception as e:
+            logger.error(f"Failed to stream answer: {e}")
+            parts.append(f"Error generating answer: {str(e)}")
+            state["failed"] = True
+            yield parts[-1]
+
+        state["answer"] = "".join(parts)
 
-    if state.get("should_regenerate", False):
-        logger.info("Context insufficient, continuing to format")
+
+def answered_extractively(state: GraphState) -> str:
+    return "done" if state.get("answer") else "generate"
+
+
+def answered_from_index(state: GraphState) -> str:
+    return "done" if state.get("answer") else "retrieve"
+
+
+def should_regenerate(state: GraphState) -> str:
+    elapsed_ms = (time.perf_counter() - state.get("started_at", time.perf_counter())) * 1000
+    retry_count = state.get("retry_count", 0)
+    weak = state.get("should_regenerate", False)
+    # Nothing retrieved: answer from the template rather than paying for a rewrite
+    empty = not state["retrieved_docs"] and settings.no_answer_policy == "template"
+
+    if weak and not empty and retry_count < settings.context_retry_max and elapsed_ms < settings.context_retry_budget_ms:
+        logger.info("Context insufficient, rewriting query and retrieving again")
+        return "rewrite_query"
+
+    if retry_count:
+        branch = "retried"
+    elif weak:
+        logger.info("Context insufficient but retry budget exhausted, continuing to format")
+        branch = "weak"
+    else:
+        branch = "fast"
+
+    metrics.increment(f"context_branch.{branch}")
+    metrics.observe(f"context_branch.{branch}.latency_ms", elapsed_ms)
+
+    if empty:
+        return "no_answer"
     return "format_context"
@@ -0,0 +1,90 @@
+"""
+Per-query answer routing: model tier, output limit and context size from cheap features
+"""
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from config import settings
+from vector_store.pgvector_store import RetrievedChunk
+
+# Questions asking for explanations, comparisons or procedures need long answers
+EXPLANATORY = re.compile(
+    r"\b(why|explain|compare|comparison|difference|differences|walk me|steps|step by step|"
+    r"how does|how do|how should|pros|cons|trade-?offs?|summari[sz]e|overview|describe)\b",
+    re.IGNORECASE
+)
+
+# Document types whose answers are summaries rather than single facts
+LONG_FORM_TYPES = {"meetings"}
+
+
+@dataclass
+class AnswerRoute:
+    """How to answer one query"""
+    label: str  # "lookup", "standard" or "complex"
+    tier: str  # LLM router tier: "fast" or "default"
+    max_tokens: int
+    context_docs: int  # chunks passed to the LLM
+
+
+def classify(
+    query: str,
+    docs: List[RetrievedChunk],
+    confidence: Optional[float],
+    history: Optional[List[Dict[str, str]]] = None,
+    retry_count: int = 0
+) -> AnswerRoute:
+    """
+    Pick the model tier, max_tokens and context size for a query
+
+    - complex: follow-ups, explanatory wording, long questions, weak context
+      or a rewritten query -> default model, full output limit, all chunks
+    - lookup: short questions with confident retrieval outside long-form
+      document types -> fast model, small output limit, fewest chunks
+    - standard: everything else -> default model, medium output limit
+
+    Args:
+        query: Standalone (retrieval) question
+        docs: Retrieved chunks, best first
+        confidence: Average similarity computed by evaluate_context
+        history: Prior conversation turns
+        retry_count: Query rewrites performed
+
+    Returns:
+        AnswerRoute
+    """
+    words = len(query.split())
+    confidence = confidence or 0.0
+    doc_type = dominant_doc_type(docs)
+
+    if (
+        history
+        or retry_count
+        or EXPLANATORY.search(query)
+        or words > 2 * settings.llm_fast_query_max_words
+        or confidence < settings.context_similarity_threshold
+    ):
+        return AnswerRoute("complex", "default", settings.llm_max_tokens, len(docs))
+
+    if (
+        words <= settings.llm_fast_query_max_words
+        and confidence >= settings.classifier_lookup_confidence
+        and doc_type not in LONG_FORM_TYPES
+    ):
+        return AnswerRoute(
+            "lookup", "fast", settings.classifier_lookup_max_tokens, settings.classifier_lookup_context_docs
+        )
+
+    return AnswerRoute(
+        "standard", "default", settings.classifier_standard_max_tokens, settings.classifier_standard_context_docs
+    )
+
+
+def dominant_doc_type(docs: List[RetrievedChunk]) -> Optional[str]:
+    """Most common document type among the chunks (ties go to the better-ranked one)"""
+    counts = Counter(chunk.doc_type for chunk in docs if chunk.doc_type)
+    if not counts:
+        return None
+    best = max(counts.values())
+    return next(chunk.doc_type for chunk in docs if counts.get(chunk.doc_type) == best)
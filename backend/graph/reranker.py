@@ -0,0 +1,125 @@
+"""
+Cross-encoder re-ranking of over-fetched retrieval candidates
+"""
+import importlib.util
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List, Optional, Tuple
+from config import settings
+from utils.logger import logger
+from vector_store.pgvector_store import RetrievedChunk
+
+# sentence-transformers (and torch) are only imported when re-ranking is enabled
+CROSS_ENCODER_AVAILABLE = importlib.util.find_spec("sentence_transformers") is not None
+
+# Pairs scored per model call inside a batch; the deadline is checked between calls
+DEADLINE_CHECK_PAIRS = 8
+
+
+class CrossEncoderReranker:
+    """Score (query, chunk) pairs with a local CPU cross-encoder"""
+
+    def __init__(self):
+        self.model_name = settings.rerank_model
+        self.batch_size = max(1, settings.rerank_batch_size)
+        self.latency_budget = settings.rerank_latency_budget_ms / 1000
+        self.bypass_margin = settings.rerank_bypass_margin
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.rerank_workers),
+            thread_name_prefix="rerank"
+        )
+        self.model = None
+
+        if CROSS_ENCODER_AVAILABLE:
+            from sentence_transformers import CrossEncoder
+            self.model = CrossEncoder(self.model_name, device="cpu")
+            logger.info(f"Initialized cross-encoder reranker: {self.model_name}")
+        else:
+            logger.warning("sentence-transformers not installed, re-ranking disabled")
+
+    @property
+    def available(self) -> bool:
+        """Whether a cross-encoder model is loaded"""
+        return self.model is not None
+
+    def is_decisive(self, docs: List[RetrievedChunk], top_k: int) -> bool:
+        """
+        Check whether vector similarity already separates the top-k cleanly
+
+        Args:
+            docs: Candidates sorted by descending similarity
+            top_k: Number of documents that will be kept
+
+        Returns:
+            True if re-ranking cannot meaningfully change the kept set
+        """
+        if len(docs) <= top_k:
+            return True
+
+        gap = docs[top_k - 1].similarity - docs[top_k].similarity
+        return gap >= self.bypass_margin
+
+    def rerank(
+        self,
+        query: str,
+        docs: List[RetrievedChunk],
+        top_k: int
+    ) -> Optional[List[RetrievedChunk]]:
+        """
+        Re-rank candidates and keep the best top_k
+
+        Batches are scored concurrently on the thread pool. If they do not all
+        finish within the latency budget, None is returned so the caller keeps
+        vector order: queued batches are cancelled, and running batches stop
+        at their next deadline check (a model call already in progress, at
+        most DEADLINE_CHECK_PAIRS pairs, still runs to completion).
+
+        Args:
+            query: User's question
+            docs: Retrieved candidates
+            top_k: Number of documents to keep
+
+        Returns:
+            Top-k chunks with rerank_score set, or None if the budget was exceeded
+        """
+        if self.model is None:
+            return None
+
+        start = time.perf_counter()
+        deadline = start + self.latency_budget
+        futures = []
+        for i in range(0, len(docs), self.batch_size):
+            batch = docs[i:i + self.batch_size]
+            pairs = [(query, doc.content) for doc in batch]
+            futures.append(self.executor.submit(self._score_batch, pairs, deadline))
+
+        done, not_done = wait(futures, timeout=self.latency_budget)
+        if not_done or any(future.result() is None for future in done):
+            for future in not_done:
+                future.cancel()
+            logger.warning(
+                f"Re-ranking exceeded {self.latency_budget * 1000:.0f}ms budget "
+                f"({len(futures) - len(done)}/{len(futures)} batches pending), keeping vector order"
+            )
+            return None
+
+        scores = []
+        for future in futures:
+            scores.extend(future.result())
+
+        for doc, score in zip(docs, scores):
+            doc.rerank_score = score
+        ranked = sorted(docs, key=lambda doc: doc.rerank_score, reverse=True)
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        logger.info(f"Re-ranked {len(docs)} candidates in {elapsed_ms:.0f}ms")
+        return ranked[:top_k]
+
+    def _score_batch(self, pairs: List[Tuple[str, str]], deadline: float) -> Optional[List[float]]:
+        """Score one batch in small model calls, giving up once the deadline has passed"""
+        scores: List[float] = []
+        for i in range(0, len(pairs), DEADLINE_CHECK_PAIRS):
+            if time.perf_counter() > deadline:
+                return None
+            scores.extend(float(score) for score in self.model.predict(pairs[i:i + DEADLINE_CHECK_PAIRS]))
+        return scores
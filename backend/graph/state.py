@@ -2,6 +2,8 @@
 State definition for LangGraph workflow
 """
 from typing import TypedDict, List, Dict, Any, Optional
+from vector_store.pgvector_store import RetrievedChunk
+from graph.query_classifier import AnswerRoute
 
 
 class GraphState(TypedDict):
@@ -10,15 +12,33 @@ class GraphState(TypedDict):
 
     Attributes:
         query: User's original question
-        retrieved_docs: Documents retrieved from vector store
-        context: Formatted context for LLM
+        retrieved_docs: Chunks retrieved from vector store (shared, never copied)
         answer: Generated answer
         sources: Source documents for citation
         should_regenerate: Flag to trigger query reformulation
+        context_confidence: Average similarity of the retrieved chunks
+        answer_route: Model tier, max_tokens and context size chosen by classify_query
+        retry_count: Number of query rewrites performed so far
+        started_at: time.perf_counter() when the query started (latency budget)
+        history: Prior conversation turns within the token window
+        retrieval_query: Standalone question used for retrieval
+        query_embedding: Embedding of retrieval_query
+        last_retrieval: Previous turn's query embedding and docs (for reuse)
+        failed: True if answer generation failed (the result must not be cached)
+        tokens_used: LLM tokens consumed by answer generation
     """
     query: str
-    retrieved_docs: List[Dict[str, Any]]
-    context: str
+    retrieved_docs: List[RetrievedChunk]
     answer: str
     sources: List[Dict[str, str]]
     should_regenerate: bool
+    context_confidence: float
+    answer_route: Optional[AnswerRoute]
+    retry_count: int
+    started_at: float
+    history: List[Dict[str, str]]
+    retrieval_query: str
+    query_embedding: List[float]
+    last_retrieval: Optional[Dict[str, Any]]
+    failed: bool
+    tokens_used: int
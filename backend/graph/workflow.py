@@ -1,10 +1,19 @@
 """
 LangGraph workflow for RAG
 """
+import time
+from typing import Any, Dict, Iterator, Optional
 from langgraph.graph import StateGraph, END
 from graph.state import GraphState
-from graph.nodes import RAGNodes, should_regenerate
+from graph.nodes import RAGNodes, answered_extractively, answered_from_index, should_regenerate
+from conversation.session_store import Session
+from config import settings
 from utils.logger import logger
+from utils.metrics import metrics
+from utils.openai_client import CircuitOpenError
+from utils.shared_cache import shared_cache
+from utils.single_flight import SingleFlight, StreamFlight
+from utils.text import normalize_question, cache_key
 
 
 class RAGWorkflow:
@@ -13,73 +22,295 @@ class RAGWorkflow:
     def __init__(self):
         self.nodes = RAGNodes()
         self.graph = self._build_graph()
+        # Same graph ending at format_context; the answer is streamed separately
+        self.retrieval_graph = self._build_graph(generate=False)
+        # Concurrent identical stateless questions share one run
+        self.single_flight = SingleFlight("query")
+        self.stream_flight = StreamFlight("query_stream")
         logger.info("Initialized RAG workflow")
 
-    def _build_graph(self) -> StateGraph:
+    def _build_graph(self, generate: bool = True, answer_index: bool = True) -> StateGraph:
         """
         Build the LangGraph workflow
 
         Graph flow:
-        START -> retrieve_documents -> evaluate_context -> format_context -> generate_answer -> END
+        START -> condense_question -> [lookup_precomputed_answer] -> retrieve_documents
+              -> [rerank_documents] -> evaluate_context
+              -> [extract_answer] -> [classify_query] -> format_context -> generate_answer -> END
+
+        rerank_documents is only added when settings.rerank_enabled is set,
+        classify_query (model tier, max_tokens and context size per query)
+        when settings.query_classifier_enabled is set. extract_answer
+        (settings.extractive_answers_enabled) ends the run when the best
+        retrieved sentences answer the question on their own.
+        lookup_precomputed_answer (settings.answer_index_enabled) ends the
+        run with a pre-generated answer when the question is close to a
+        frequent question cluster.
+        When evaluate_context finds the context weak, should_regenerate routes
+        to rewrite_query, which retrieves again and loops back to
+        [rerank_documents ->] evaluate_context (bounded by retry count and
+        latency budget).
+        If nothing was retrieved, no_answer replies from a template and ends
+        the run without an LLM call.
+
+        Args:
+            generate: Include generate_answer; without it the graph ends at
+                format_context (used for streaming responses)
+            answer_index: Include lookup_precomputed_answer (off when the
+                answer index job generates its answers)
         """
         workflow = StateGraph(GraphState)
+        answer_index = answer_index and settings.answer_index_enabled
 
         # Add nodes
+        workflow.add_node("condense_question", self.nodes.condense_question)
+        if answer_index:
+            workflow.add_node("lookup_precomputed_answer", self.nodes.lookup_precomputed_answer)
         workflow.add_node("retrieve_documents", self.nodes.retrieve_documents)
+        if settings.rerank_enabled:
+            workflow.add_node("rerank_documents", self.nodes.rerank_documents)
         workflow.add_node("evaluate_context", self.nodes.evaluate_context)
+        workflow.add_node("rewrite_query", self.nodes.rewrite_query)
+        workflow.add_node("no_answer", self.nodes.no_answer)
+        if settings.extractive_answers_enabled:
+            workflow.add_node("extract_answer", self.nodes.extract_answer)
+        if settings.query_classifier_enabled:
+            workflow.add_node("classify_query", self.nodes.classify_query)
         workflow.add_node("format_context", self.nodes.format_context)
-        workflow.add_node("generate_answer", self.nodes.generate_answer)
+        if generate:
+            workflow.add_node("generate_answer", self.nodes.generate_answer)
 
         # Set entry point
-        workflow.set_entry_point("retrieve_documents")
+        workflow.set_entry_point("condense_question")
 
         # Add edges
-        workflow.add_edge("retrieve_documents", "evaluate_context")
-        workflow.add_edge("evaluate_context", "format_context") 
-        workflow.add_edge("format_context", "generate_answer")
-        workflow.add_edge("generate_answer", END)
+        if answer_index:
+            workflow.add_edge("condense_question", "lookup_precomputed_answer")
+            workflow.add_conditional_edges(
+                "lookup_precomputed_answer",
+                answered_from_index,
+                {"done": END, "retrieve": "retrieve_documents"}
+            )
+        else:
+            workflow.add_edge("condense_question", "retrieve_documents")
+        if settings.rerank_enabled:
+            workflow.add_edge("retrieve_documents", "rerank_documents")
+            workflow.add_edge("rerank_documents", "evaluate_context")
+        else:
+            workflow.add_edge("retrieve_documents", "evaluate_context")
+        # Strong context goes to the extractive path first, then to the LLM path
+        llm_path = "classify_query" if settings.query_classifier_enabled else "format_context"
+        workflow.add_conditional_edges(
+            "evaluate_context",
+            should_regenerate,
+            {
+                "rewrite_query": "rewrite_query",
+                "no_answer": "no_answer",
+                "format_context": "extract_answer" if settings.extractive_answers_enabled else llm_path
+            }
+        )
+        # Merged rewrite results are re-ranked like the first retrieval
+        workflow.add_edge("rewrite_query", "rerank_documents" if settings.rerank_enabled else "evaluate_context")
+        if settings.extractive_answers_enabled:
+            workflow.add_conditional_edges(
+                "extract_answer",
+                answered_extractively,
+                {"done": END, "generate": llm_path}
+            )
+        if settings.query_classifier_enabled:
+            workflow.add_edge("classify_query", "format_context")
+        workflow.add_edge("no_answer", END)
+        if generate:
+            workflow.add_edge("format_context", "generate_answer")
+            workflow.add_edge("generate_answer", END)
+        else:
+            workflow.add_edge("format_context", END)
 
         return workflow.compile()
 
-    def query(self, question: str) -> dict:
+    def query(self, question: str, session: Optional[Session] = None) -> dict:
         """
         Run the RAG workflow for a question
 
+        Stateless questions are answered from the shared cache when possible;
+        concurrent identical ones are coalesced into a single run.
+
         Args:
             question: User's question
+            session: Optional conversation session supplying history and
+                the previous turn's retrieval
 
         Returns:
             Dict with answer and sources
         """
         logger.info(f"Processing query: {question[:100]}...")
 
-        # Initialize state
-        initial_state: GraphState = {
+        if session is not None:
+            return self._run(question, session, None)
+
+        # Stateless questions are answered from the cache shared by all workers
+        answer_key = cache_key(settings.llm_model, normalize_question(question))
+        cached = shared_cache.get("answer", answer_key)
+        if cached is not None:
+            logger.info("Answer served from cache")
+            metrics.increment("llm_calls_avoided.answer_cache")
+            return {"question": question, **cached, "last_retrieval": None, "tokens_used": 0}
+
+        result, shared = self.single_flight.do(
+            answer_key, lambda: self._run(question, None, answer_key)
+        )
+        if shared:
+            metrics.increment("llm_calls_avoided.coalesced")
+            # Echo this caller's wording of the question; the tokens were spent once
+            result = {**result, "question": question, "tokens_used": 0}
+        return result
+
+    def stream(self, question: str, session: Optional[Session] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Run the RAG workflow and stream the answer
+
+        Events are dicts with a 'type': 'sources' (once, before the answer),
+        'token' (answer text deltas) and 'done' (full answer and the
+        retrieval to remember for the session). Concurrent identical
+        stateless questions follow one shared stream; only the caller that
+        started it reports its tokens_used.
+
+        Args:
+            question: User's question
+            session: Optional conversation session
+
+        Returns:
+            Iterator over events
+        """
+        logger.info(f"Streaming query: {question[:100]}...")
+
+        if session is not None:
+            yield from self._stream(question, session, None)
+            return
+
+        answer_key = cache_key(settings.llm_model, normalize_question(question))
+        cached = shared_cache.get("answer", answer_key)
+        if cached is not None:
+            logger.info("Answer served from cache")
+            metrics.increment("llm_calls_avoided.answer_cache")
+            yield {"type": "sources", "sources": cached["sources"]}
+            yield {"type": "token", "content": cached["answer"]}
+            yield {"type": "done", "answer": cached["answer"], "last_retrieval": None, "tokens_used": 0}
+            return
+
+        events, shared = self.stream_flight.subscribe(
+            answer_key, lambda: self._stream(question, None, answer_key)
+        )
+        if shared:
+            metrics.increment("llm_calls_avoided.coalesced")
+        for event in events:
+            if shared and event["type"] == "done":
+                # The tokens were spent once, by the stream's leader
+                event = {**event, "tokens_used": 0}
+            yield event
+
+    def _initial_state(self, question: str, session: Optional[Session]) -> GraphState:
+        return {
             "query": question,
             "retrieved_docs": [],
-            "context": "",
             "answer": "",
             "sources": [],
-            "should_regenerate": False
+            "should_regenerate": False,
+            "context_confidence": 0.0,
+            "answer_route": None,
+            "retry_count": 0,
+            "started_at": time.perf_counter(),
+            "history": session.history_window(settings.history_max_tokens) if session else [],
+            "retrieval_query": question,
+            "query_embedding": [],
+            "last_retrieval": session.last_retrieval if session else None,
+            "failed": False,
+            "tokens_used": 0
         }
 
-        # Run the graph
+    @staticmethod
+    def _last_retrieval(final_state: GraphState) -> Optional[dict]:
+        if not final_state.get("query_embedding"):
+            return None
+        return {
+            "embedding": final_state["query_embedding"],
+            "docs": [chunk.to_dict() for chunk in final_state["retrieved_docs"]]
+        }
+
+    def _cache_answer(self, answer_key: Optional[str], final_state: GraphState):
+        if answer_key is not None and not final_state.get("failed"):
+            shared_cache.set(
+                "answer",
+                answer_key,
+                {"answer": final_state["answer"], "sources": final_state["sources"]},
+                settings.answer_cache_ttl_seconds
+            )
+
+    def _run(self, question: str, session: Optional[Session], answer_key: Optional[str]) -> dict:
+        """Run the full graph; answer_key is set for cacheable (stateless) questions"""
         try:
-            final_state = self.graph.invoke(initial_state)
+            final_state = self.graph.invoke(self._initial_state(question, session))
 
             result = {
                 "question": question,
                 "answer": final_state["answer"],
-                "sources": final_state["sources"]
+                "sources": final_state["sources"],
+                "last_retrieval": self._last_retrieval(final_state),
+                "tokens_used": final_state.get("tokens_used", 0)
             }
+            self._cache_answer(answer_key, final_state)
 
             logger.info("Query processed successfully")
             return result
 
+        except CircuitOpenError:
+            # Surfaced as 503 with Retry-After instead of an error answer
+            raise
         except Exception as e:
             logger.error(f"Error processing query: {e}")
             return {
                 "question": question,
                 "answer": f"Error processing query: {str(e)}",
-                "sources": []
+                "sources": [],
+                "last_retrieval": None,
+                "tokens_used": 0
             }
+
+    def _stream(
+        self,
+        question: str,
+        session: Optional[Session],
+        answer_key: Optional[str]
+    ) -> Iterator[Dict[str, Any]]:
+        """Run retrieval through the graph, then stream generation (CircuitOpenError propagates)"""
+        try:
+            final_state = self.retrieval_graph.invoke(self._initial_state(question, session))
+        except Exception as e:
+            logger.error(f"Error processing query: {e}")
+            answer = f"Error processing query: {str(e)}"
+            yield {"type": "sources", "sources": []}
+            yield {"type": "token", "content": answer}
+            yield {"type": "done", "answer": answer, "last_retrieval": None, "tokens_used": 0}
+            return
+
+        if not final_state["answer"]:
+            # Raise CircuitOpenError before the first event, while a 503 can still be sent
+            self.nodes.router.check_available()
+
+        yield {"type": "sources", "sources": final_state["sources"]}
+
+        if final_state["answer"]:
+            # no_answer, extract_answer or the answer index already replied without the LLM
+            yield {"type": "token", "content": final_state["answer"]}
+        else:
+            for delta in self.nodes.stream_answer(final_state):
+                yield {"type": "token", "content": delta}
+
+        self._cache_answer(answer_key, final_state)
+        logger.info("Query streamed successfully")
+        yield {
+            "type": "done",
+            "answer": final_state["answer"],
+            "last_retrieval": self._last_retrieval(final_state),
+            "tokens_used": final_state.get("tokens_used", 0)
+        }
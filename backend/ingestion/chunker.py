@@ -1,9 +1,25 @@
 """
-Document chunking with LangChain's text splitters
+Format-aware document chunking with token-based sizes
+
+Markdown is split on headings (heading paths become chunk metadata), JSON is
+split per object with compact serialization, and other text is packed by
+paragraph. Each document is encoded once; chunk boundaries are computed
+from section and paragraph token counts read off that encoding rather than
+by re-measuring candidate chunks.
 """
-from typing import List, Dict, Any
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import json
+import re
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+from config import settings
 from utils.logger import logger
+from utils.tokens import DocumentTokens, count_tokens
+
+
+MARKDOWN_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+# Plain-text banner headings: a title line between two rules of '=' characters
+BANNER_RULE = re.compile(r"^={5,}\s*$")
+HEADING_SEPARATOR = " > "
 
 
 class DocumentChunker:
@@ -11,16 +27,15 @@ class DocumentChunker:
 
     def __init__(
         self,
-        chunk_size: int = 1200,
-        chunk_overlap: int = 300
+        chunk_size: Optional[int] = None,
+        chunk_overlap: Optional[int] = None
     ):
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=len,
-            separators=["\n\n", "\n", ". ", " ", ""]
-        )
-        logger.info(f"Initialized chunker: size={chunk_size}, overlap={chunk_overlap}")
+        # Sizes are in tokens of the embedding model's tokenizer
+        self.chunk_size = chunk_size or settings.chunk_size_tokens
+        self.chunk_overlap = chunk_overlap if chunk_overlap is not None else settings.chunk_overlap_tokens
+        self.token_model = settings.embedding_model
+        self._tokens: Optional[DocumentTokens] = None
+        logger.info(f"Initialized chunker: size={self.chunk_size} tokens, overlap={self.chunk_overlap} tokens")
 
     def chunk_documents(
         self,
@@ -38,14 +53,21 @@ class DocumentChunker:
         all_chunks = []
 
         for doc in documents:
-            content = doc["content"]
             metadata = doc["metadata"]
-            chunks = self.text_splitter.split_text(content)
+            if "segments" in doc:
+                # Lazy pages/blocks are packed as they are produced
+                chunks = self._pack_sections(([], segment) for segment in doc["segments"])
+            else:
+                chunks = self.split_document(doc["content"], metadata.get("format", ""))
 
-            for i, chunk_text in enumerate(chunks):
+            for i, (chunk_text, heading_path, token_count) in enumerate(chunks):
                 chunk_metadata = metadata.copy()
                 chunk_metadata["chunk_index"] = i
                 chunk_metadata["total_chunks"] = len(chunks)
+                chunk_metadata["token_count"] = token_count
+                if heading_path:
+                    chunk_metadata["heading_path"] = HEADING_SEPARATOR.join(heading_path)
+                    chunk_metadata["section"] = heading_path[-1]
 
                 all_chunks.append({
                     "content": chunk_text,
@@ -54,3 +76,331 @@ class DocumentChunker:
 
         logger.info(f"Created {len(all_chunks)} chunks from {len(documents)} documents")
         return all_chunks
+
+    def chunk_with_parents(
+        self,
+        documents: List[Dict[str, Any]],
+        child_size: int
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Split documents into parent sections and small child chunks
+
+        Parents are this chunker's chunks; each is split again into
+        non-overlapping children of child_size tokens. Children are numbered
+        per source (chunk_index) and point at their parent (parent_index).
+
+        Args:
+            documents: List of dicts with 'content' and 'metadata'
+            child_size: Child chunk size in tokens
+
+        Returns:
+            (parents, children); parents are dicts with 'source',
+            'parent_index', 'content' and 'metadata'
+        """
+        child_chunker = DocumentChunker(chunk_size=child_size, chunk_overlap=0)
+        parents = []
+        children = []
+
+        for parent in self.chunk_documents(documents):
+            metadata = parent["metadata"]
+            if metadata["chunk_index"] == 0:
+                child_index = 0
+            heading_path = metadata.get("heading_path", "")
+            path = heading_path.split(HEADING_SEPARATOR) if heading_path else []
+
+            parents.append({
+                "source": metadata["source"],
+                "parent_index": metadata["chunk_index"],
+                "content": parent["content"],
+                "metadata": metadata
+            })
+
+            with child_chunker._document(parent["content"]):
+                child_chunks = child_chunker._pack_sections([(path, parent["content"])])
+            for child_text, _, token_count in child_chunks:
+                child_metadata = metadata.copy()
+                child_metadata["parent_index"] = metadata["chunk_index"]
+                child_metadata.pop("total_chunks", None)  # counts parents, not children
+                child_metadata["chunk_index"] = child_index
+                child_metadata["token_count"] = token_count
+                children.append({"content": child_text, "metadata": child_metadata})
+                child_index += 1
+
+        logger.info(f"Split {len(parents)} parent sections into {len(children)} child chunks")
+        return parents, children
+
+    def split_document(self, content: str, fmt: str) -> List[Tuple[str, List[str], int]]:
+        """
+        Split one document according to its format
+
+        Args:
+            content: Document text
+            fmt: File format from the loader metadata ('md', 'json', 'txt', 'pdf')
+
+        Returns:
+            List of (chunk text, heading path, token count)
+        """
+        if fmt == "json":
+            try:
+                return self._split_json(json.loads(content))
+            except ValueError:
+                logger.warning("Invalid JSON content, falling back to text chunking")
+
+        if fmt == "md":
+            sections = self._markdown_sections(content)
+        else:
+            sections = self._text_sections(content)
+
+        with self._document(content):
+            return self._pack_sections(sections)
+
+    # ------------------------------------------------------------------
+    # Section detection
+    # ------------------------------------------------------------------
+
+    def _markdown_sections(self, content: str) -> List[Tuple[List[str], str]]:
+        """Split Markdown into (heading path, text) sections, ignoring code fences"""
+        sections = []
+        path: List[Tuple[int, str]] = []
+        current: List[str] = []
+        in_fence = False
+
+        for line in content.splitlines():
+            if line.lstrip().startswith("```"):
+                in_fence = not in_fence
+
+            match = None if in_fence else MARKDOWN_HEADING.match(line)
+            if match:
+                if "".join(current).strip():
+                    sections.append(([title for _, title in path], "\n".join(current).strip()))
+                level = len(match.group(1))
+                path = [(lvl, title) for lvl, title in path if lvl < level]
+                path.append((level, match.group(2)))
+                current = [line]
+            else:
+                current.append(line)
+
+        if "".join(current).strip():
+            sections.append(([title for _, title in path], "\n".join(current).strip()))
+
+        return sections
+
+    def _text_sections(self, content: str) -> List[Tuple[List[str], str]]:
+        """Split plain text on '====' banner headings (one level)"""
+        lines = content.splitlines()
+        sections = []
+        title: Optional[str] = None
+        current: List[str] = []
+        i = 0
+
+        while i < len(lines):
+            if (
+                i + 2 < len(lines)
+                and BANNER_RULE.match(lines[i])
+                and lines[i + 1].strip()
+                and BANNER_RULE.match(lines[i + 2])
+            ):
+                if "".join(current).strip():
+                    sections.append(([title] if title else [], "\n".join(current).strip()))
+                title = lines[i + 1].strip().title()
+                current = [lines[i + 1].strip()]
+                i += 3
+                continue
+            current.append(lines[i])
+            i += 1
+
+        if "".join(current).strip():
+            sections.append(([title] if title else [], "\n".join(current).strip()))
+
+        return sections
+
+    # ------------------------------------------------------------------
+    # Packing
+    # ------------------------------------------------------------------
+
+    def _pack_sections(self, sections: Iterable[Tuple[List[str], str]]) -> List[Tuple[str, List[str], int]]:
+        """
+        Merge adjacent small sections and split large ones
+
+        Adjacent sections are merged while they fit; a chunk that is already
+        half full is closed at the next second-level heading. The merged chunk
+        gets the common heading path of its sections.
+        """
+        chunks = []
+        buffer: List[str] = []
+        buffer_path: Optional[List[str]] = None
+        buffer_tokens = 0
+
+        def flush():
+            nonlocal buffer, buffer_path, buffer_tokens
+            if buffer:
+                chunks.append(("\n\n".join(buffer), buffer_path or [], buffer_tokens))
+            buffer, buffer_path, buffer_tokens = [], None, 0
+
+        for path, text in sections:
+            tokens = self._count(text)
+
+            if tokens > self.chunk_size:
+                flush()
+                chunks.extend(
+                    (piece, path, piece_tokens)
+                    for piece, piece_tokens in self._split_large(text, path)
+                )
+                continue
+
+            # Start a new chunk at a new second-level branch once the buffer is half full
+            new_branch = buffer_path is not None and buffer_path[:2] != path[:2]
+            if buffer and (
+                buffer_tokens + tokens > self.chunk_size
+                or (new_branch and buffer_tokens >= self.chunk_size // 2)
+            ):
+                flush()
+
+            buffer.append(text)
+            buffer_tokens += tokens
+            buffer_path = path if buffer_path is None else _common_prefix(buffer_path, path)
+
+        flush()
+        return chunks
+
+    def _split_large(self, text: str, path: List[str]) -> List[Tuple[str, int]]:
+        """Pack paragraphs of an oversized section into windows with overlap"""
+        breadcrumb = f"[{HEADING_SEPARATOR.join(path)}]\n" if path else ""
+        breadcrumb_tokens = self._count(breadcrumb) if breadcrumb else 0
+        budget = self.chunk_size - breadcrumb_tokens
+
+        units: List[Tuple[str, int]] = []
+        for paragraph in re.split(r"\n\s*\n", text):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            tokens = self._count(paragraph)
+            if tokens > budget:
+                units.extend(self._split_by_lines(paragraph, budget))
+            else:
+                units.append((paragraph, tokens))
+
+        pieces = []
+        window: List[Tuple[str, int]] = []
+        window_tokens = 0
+        for unit, tokens in units:
+            if window and window_tokens + tokens > budget:
+                pieces.append(window)
+                # Carry trailing units forward as overlap
+                overlap: List[Tuple[str, int]] = []
+                overlap_tokens = 0
+                for prev in reversed(window):
+                    if overlap_tokens + prev[1] > self.chunk_overlap or overlap_tokens + prev[1] + tokens > budget:
+                        break
+                    overlap.insert(0, prev)
+                    overlap_tokens += prev[1]
+                window, window_tokens = overlap, overlap_tokens
+            window.append((unit, tokens))
+            window_tokens += tokens
+        if window:
+            pieces.append(window)
+
+        result = []
+        for i, piece in enumerate(pieces):
+            body = "\n\n".join(unit for unit, _ in piece)
+            tokens = sum(t for _, t in piece)
+            # The first piece starts with its own heading line
+            if i > 0 and breadcrumb:
+                result.append((breadcrumb + body, tokens + breadcrumb_tokens))
+            else:
+                result.append((body, tokens))
+        return result
+
+    def _split_by_lines(self, text: str, budget: int) -> List[Tuple[str, int]]:
+        """Split an oversized paragraph on lines, then on words as a last resort"""
+        units = []
+        current: List[str] = []
+        current_tokens = 0
+        for line in text.splitlines() or [text]:
+            tokens = self._count(line)
+            if tokens > budget:
+                words = line.split()
+                step = max(1, len(words) * budget // (tokens + 1))
+                for start in range(0, len(words), step):
+                    part = " ".join(words[start:start + step])
+                    units.append((part, self._count(part)))
+                continue
+            if current and current_tokens + tokens > budget:
+                units.append(("\n".join(current), current_tokens))
+                current, current_tokens = [], 0
+            current.append(line)
+            current_tokens += tokens
+        if current:
+            units.append(("\n".join(current), current_tokens))
+        return units
+
+    # ------------------------------------------------------------------
+    # JSON
+    # ------------------------------------------------------------------
+
+    def _split_json(self, data: Any) -> List[Tuple[str, List[str], int]]:
+        """
+        Split JSON per object, serialized compactly as 'path: {...}' lines
+
+        Objects that fit in a chunk are kept whole; larger ones are split into
+        their children. Sibling objects are packed together while they fit.
+        """
+        units: List[Tuple[List[str], str, int]] = []
+        self._json_units(data, [], units)
+
+        chunks = []
+        buffer: List[str] = []
+        buffer_path: Optional[List[str]] = None
+        buffer_tokens = 0
+        for path, text, tokens in units:
+            parent = path[:-1]
+            if buffer and (buffer_path != parent or buffer_tokens + tokens > self.chunk_size):
+                chunks.append(("\n".join(buffer), buffer_path, buffer_tokens))
+                buffer, buffer_tokens = [], 0
+            buffer.append(text)
+            buffer_path = parent
+            buffer_tokens += tokens
+        if buffer:
+            chunks.append(("\n".join(buffer), buffer_path, buffer_tokens))
+
+        return chunks
+
+    def _json_units(self, value: Any, path: List[str], units: List[Tuple[List[str], str, int]]):
+        serialized = json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+        label = ".".join(path) if path else "root"
+        text = f"{label}: {serialized}"
+        tokens = self._count(text)
+
+        if tokens <= self.chunk_size or not isinstance(value, (dict, list)) or not value:
+            if tokens > self.chunk_size:
+                units.extend((path, piece, piece_tokens) for piece, piece_tokens in self._split_by_lines(text, self.chunk_size))
+            else:
+                units.append((path, text, tokens))
+            return
+
+        items = value.items() if isinstance(value, dict) else enumerate(value)
+        for key, child in items:
+            self._json_units(child, path + [str(key)], units)
+
+    @contextmanager
+    def _document(self, content: str):
+        """Count the pieces of one document from a single encoding pass"""
+        self._tokens = DocumentTokens(content, self.token_model)
+        try:
+            yield
+        finally:
+            self._tokens = None
+
+    def _count(self, text: str) -> int:
+        if self._tokens is not None:
+            return self._tokens.count(text)
+        return count_tokens(text, self.token_model)
+
+
+def _common_prefix(a: List[str], b: List[str]) -> List[str]:
+    prefix = []
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        prefix.append(x)
+    return prefix
@@ -2,16 +2,18 @@
 Document loader for various file formats
 """
 import os
+import hashlib
+import importlib.util
+import mmap
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import json
+from config import settings
 from utils.logger import logger
 
-try:
-    from pypdf import PdfReader
-    PDF_AVAILABLE = True
-except ImportError:
-    PDF_AVAILABLE = False
+# pypdf is only imported when a PDF is actually parsed
+PDF_AVAILABLE = importlib.util.find_spec("pypdf") is not None
+if not PDF_AVAILABLE:
     logger.warning("pypdf not installed, PDF support disabled")
 
 
@@ -34,20 +36,56 @@ class DocumentLoader:
             logger.warning(f"Documents directory not found: {self.documents_dir}")
             return documents
 
-        # Recursively find all supported files
-        for file_path in self.documents_dir.rglob("*"):
-            if file_path.is_file() and self._is_supported_format(file_path):
-                try:
-                    doc = self._load_file(file_path)
-                    if doc:
-                        documents.append(doc)
-                        logger.debug(f"Loaded: {file_path.name}")
-                except Exception as e:
-                    logger.error(f"Failed to load {file_path}: {e}")
+        for file_path in self.iter_supported_files():
+            doc = self.load_file(file_path)
+            if doc:
+                documents.append(doc)
 
         logger.info(f"Loaded {len(documents)} documents total")
         return documents
 
+    def iter_supported_files(self) -> Iterator[Path]:
+        """Recursively yield all supported files in the documents directory"""
+        if not self.documents_dir.exists():
+            return
+
+        for file_path in self.documents_dir.rglob("*"):
+            if file_path.is_file() and self._is_supported_format(file_path):
+                yield file_path
+
+    def snapshot(self) -> Dict[str, Tuple[int, int]]:
+        """Map each supported file's source name to its (mtime_ns, size)"""
+        snapshot = {}
+        for file_path in self.iter_supported_files():
+            try:
+                stat = file_path.stat()
+            except FileNotFoundError:
+                continue
+            snapshot[self.source_name(file_path)] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def source_name(self, file_path: Path) -> str:
+        """Source identifier stored in chunk metadata (path relative to documents_dir)"""
+        return str(file_path.relative_to(self.documents_dir))
+
+    def load_file(self, file_path: Path) -> Optional[Dict[str, Any]]:
+        """
+        Load a single supported file
+
+        Args:
+            file_path: Path inside documents_dir
+
+        Returns:
+            Document dict, or None if loading failed
+        """
+        try:
+            doc = self._load_file(file_path)
+            logger.debug(f"Loaded: {file_path.name}")
+            return doc
+        except Exception as e:
+            logger.error(f"Failed to load {file_path}: {e}")
+            return None
+
     def _is_supported_format(self, file_path: Path) -> bool:
         """Check if file format is supported"""
         supported_extensions = {".md", ".txt", ".json"}
@@ -59,7 +97,13 @@ class DocumentLoader:
         return file_path.suffix.lower() in supported_extensions
 
     def _load_file(self, file_path: Path) -> Dict[str, Any]:
-        """Load a single file and return document dict"""
+        """
+        Load a single file and return document dict
+
+        Small files are returned as 'content'. PDFs and large text files are
+        returned as lazy 'segments' (pages or blocks) that the chunker consumes
+        incrementally, so the whole text is never held in memory at once.
+        """
         # Determine document type from directory structure
         relative_path = file_path.relative_to(self.documents_dir)
         parts = relative_path.parts
@@ -67,21 +111,31 @@ class DocumentLoader:
         doc_type = parts[0] if len(parts) > 1 else "general"
 
         # Load content based on file type
+        content = None
+        segments = None
         if file_path.suffix == ".json":
             content = self._load_json(file_path)
         elif file_path.suffix == ".pdf":
-            content = self._load_pdf(file_path)
+            segments = self._iter_pdf_pages(file_path)
+        elif file_path.stat().st_size >= settings.mmap_threshold_bytes:
+            segments = self._iter_text_blocks(file_path)
         else:
             content = self._load_text(file_path)
 
         # Build metadata
         metadata = {
-            "source": str(relative_path),
+            "source": self.source_name(file_path),
             "filename": file_path.name,
             "type": doc_type,
             "format": file_path.suffix[1:],  # Remove the dot
         }
 
+        if segments is not None:
+            return {
+                "segments": segments,
+                "metadata": metadata
+            }
+
         return {
             "content": content,
             "metadata": metadata
@@ -93,32 +147,80 @@ class DocumentLoader:
             return f.read()
 
     def _load_json(self, file_path: Path) -> str:
-        """Load JSON file and convert to readable text"""
+        """Load JSON file as compact JSON (the chunker splits it per object)"""
         with open(file_path, "r", encoding="utf-8") as f:
             data = json.load(f)
-            # Convert JSON to formatted string
-            return json.dumps(data, indent=2)
+            # Compact serialization: indentation only wastes chunk budget
+            return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+    def _iter_text_blocks(self, file_path: Path) -> Iterator[str]:
+        """Yield a large text file in blocks from a memory map, split at paragraph breaks"""
+        block_size = settings.large_file_block_bytes
+
+        with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size = len(mm)
+            start = 0
+            while start < size:
+                end = min(size, start + block_size)
+                if end < size:
+                    boundary = mm.rfind(b"\n\n", start, end)
+                    if boundary <= start:
+                        boundary = mm.rfind(b"\n", start, end)
+                    if boundary > start:
+                        end = boundary + 1
+                    else:
+                        # No line break: don't cut a UTF-8 sequence in half
+                        while end > start + 1 and mm[end] & 0xC0 == 0x80:
+                            end -= 1
+                yield mm[start:end].decode("utf-8", errors="replace")
+                start = end
+
+    def _iter_pdf_pages(self, file_path: Path) -> Iterator[str]:
+        """
+        Lazily extract PDF text page by page
 
-    def _load_pdf(self, file_path: Path) -> str:
-        """Load PDF file and extract text"""
+        The PDF is memory-mapped rather than read into a buffer, and extracted
+        pages are written to a cache keyed by the file's SHA-256, so an
+        unchanged PDF is never parsed twice.
+        """
         if not PDF_AVAILABLE:
             logger.error(f"Cannot load PDF {file_path}: pypdf not installed")
-            return ""
-
-        try:
-            reader = PdfReader(file_path)
-            text_parts = []
-
-            # Extract text from all pages
-            for page_num, page in enumerate(reader.pages, 1):
-                page_text = page.extract_text()
-                if page_text.strip():
-                    text_parts.append(f"[Page {page_num}]\n{page_text}")
-
-            content = "\n\n".join(text_parts)
-            logger.debug(f"Extracted {len(reader.pages)} pages from {file_path.name}")
-            return content
-
-        except Exception as e:
-            logger.error(f"Failed to extract text from PDF {file_path}: {e}")
-            return ""
+            return
+
+        # Empty files cannot be memory-mapped
+        if file_path.stat().st_size == 0:
+            return
+
+        with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            cache_path = Path(settings.extraction_cache_dir) / f"{hashlib.sha256(mm).hexdigest()}.jsonl"
+
+            if cache_path.exists():
+                logger.debug(f"Using cached text for {file_path.name}")
+                with open(cache_path, "r", encoding="utf-8") as cache:
+                    for line in cache:
+                        yield json.loads(line)
+                return
+
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+
+            try:
+                from pypdf import PdfReader
+                reader = PdfReader(mm)
+                with open(tmp_path, "w", encoding="utf-8") as cache:
+                    for page_num, page in enumerate(reader.pages, 1):
+                        page_text = page.extract_text()
+                        if page_text.strip():
+                            segment = f"[Page {page_num}]\n{page_text}"
+                            cache.write(json.dumps(segment) + "\n")
+                            yield segment
+
+                # Only a fully extracted PDF is cached
+                os.replace(tmp_path, cache_path)
+                logger.debug(f"Extracted {len(reader.pages)} pages from {file_path.name}")
+
+            except Exception as e:
+                logger.error(f"Failed to extract text from PDF {file_path}: {e}")
+            finally:
+                if tmp_path.exists():
+                    tmp_path.unlink()
@@ -2,16 +2,18 @@
 Generate embeddings using OpenAI API
 """
 from typing import List
-from openai import OpenAI
 from config import settings
 from utils.logger import logger
+from utils.shared_cache import shared_cache
+from utils.text import cache_key
+from utils.openai_client import get_openai_client, guarded, hedged
 
 
 class Embedder:
     """Generate embeddings for text chunks"""
 
     def __init__(self):
-        self.client = OpenAI(api_key=settings.openai_api_key)
+        self.client = get_openai_client()
         self.model = settings.embedding_model
         logger.info(f"Initialized embedder with model: {self.model}")
 
@@ -36,9 +38,9 @@ class Embedder:
             for i in range(0, len(texts), batch_size):
                 batch = texts[i:i + batch_size]
 
-                response = self.client.embeddings.create(
-                    model=self.model,
-                    input=batch
+                response = guarded(
+                    "embeddings_batch",
+                    lambda: self.client.embeddings.create(model=self.model, input=batch)
                 )
 
                 embeddings = [item.embedding for item in response.data]
@@ -63,12 +65,20 @@ class Embedder:
         Returns:
             Embedding vector
         """
+        key = cache_key(self.model, query)
+        cached = shared_cache.get("embedding", key)
+        if cached is not None:
+            return cached
+
         try:
-            response = self.client.embeddings.create(
-                model=self.model,
-                input=query
+            # Idempotent and latency-critical, so slow calls are hedged
+            response = hedged(
+                "embeddings",
+                lambda: self.client.embeddings.create(model=self.model, input=query)
             )
-            return response.data[0].embedding
+            embedding = response.data[0].embedding
+            shared_cache.set("embedding", key, embedding, settings.embedding_cache_ttl_seconds)
+            return embedding
 
         except Exception as e:
             logger.error(f"Failed to embed query: {e}")
@@ -1,12 +1,17 @@
 """
 Complete ingestion pipeline: load -> chunk -> embed -> store
 """
-from typing import List
+import argparse
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
 from ingestion.document_loader import DocumentLoader
 from ingestion.chunker import DocumentChunker
 from ingestion.embedder import Embedder
-from vector_store.pgvector_store import PgVectorStore, Document
+from vector_store.pgvector_store import PgVectorStore, Document, INGESTION_LOCK_KEY, configured_collections
 from utils.logger import logger
+from utils.shared_cache import shared_cache
+from utils.text import cache_key
 from config import settings
 
 
@@ -15,12 +20,88 @@ class IngestionPipeline:
 
     def __init__(self):
         self.loader = DocumentLoader()
-        self.chunker = DocumentChunker()
-        self.embedder = Embedder()
         self.vector_store = PgVectorStore()
-
-    def run(self):
-        """Execute the full ingestion pipeline"""
+        self._chunker = None
+        self._embedder = None
+
+    @property
+    def chunker(self) -> DocumentChunker:
+        """Created on first use, so a skipped ingestion never builds it"""
+        if self._chunker is None:
+            mode = settings.parent_retrieval_mode
+            if mode == "window":
+                # Small, non-overlapping chunks; neighbours are joined at query time
+                self._chunker = DocumentChunker(chunk_size=settings.child_chunk_size_tokens, chunk_overlap=0)
+            elif mode == "section":
+                # Parent sections, stored once; children are split from them
+                self._chunker = DocumentChunker(chunk_size=settings.parent_chunk_size_tokens, chunk_overlap=0)
+            else:
+                self._chunker = DocumentChunker()
+        return self._chunker
+
+    @property
+    def embedder(self) -> Embedder:
+        """Created on first use, so a skipped ingestion never builds it"""
+        if self._embedder is None:
+            self._embedder = Embedder()
+        return self._embedder
+
+    def fingerprint(self) -> str:
+        """Hash of the document snapshot and every setting that changes the chunks"""
+        return cache_key(
+            json.dumps(sorted(self.loader.snapshot().items())),
+            settings.embedding_model,
+            str(settings.embedding_dimension),
+            str(settings.chunk_size_tokens),
+            str(settings.chunk_overlap_tokens),
+            settings.parent_retrieval_mode,
+            str(settings.child_chunk_size_tokens),
+            str(settings.parent_chunk_size_tokens)
+        )
+
+    def chunk(self, documents: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Chunk documents for the configured retrieval mode
+
+        Returns:
+            (parent sections, chunks to embed); parents are only produced in
+            small-to-big "section" mode
+        """
+        if settings.parent_retrieval_mode == "section":
+            return self.chunker.chunk_with_parents(documents, settings.child_chunk_size_tokens)
+        return [], self.chunker.chunk_documents(documents)
+
+    def run_coordinated(self, force: bool = False):
+        """
+        Run ingestion at most once across worker processes
+
+        Every worker blocks on a Postgres advisory lock, so only one ingests at
+        a time; the others then see the recorded fingerprint and skip.
+
+        Args:
+            force: Ingest even if the fingerprint is unchanged
+        """
+        fingerprint = self.fingerprint()
+
+        logger.info("Waiting for ingestion lock...")
+        self.vector_store.acquire_lock(INGESTION_LOCK_KEY)
+        try:
+            if not force and settings.ingest_skip_unchanged and self.vector_store.last_ingestion_fingerprint() == fingerprint:
+                logger.info("Documents unchanged since last ingestion, skipping")
+                return
+
+            documents, chunks = self.run()
+            self.vector_store.record_ingestion_run(fingerprint, documents, chunks)
+        finally:
+            self.vector_store.release_lock(INGESTION_LOCK_KEY)
+
+    def run(self) -> Tuple[int, int]:
+        """
+        Execute the full ingestion pipeline
+
+        Returns:
+            (documents loaded, chunks stored)
+        """
         logger.info("=" * 60)
         logger.info("Starting document ingestion pipeline")
         logger.info("=" * 60)
@@ -38,11 +119,11 @@ class IngestionPipeline:
 
         if not documents:
             logger.warning("No documents found to ingest")
-            return
+            return 0, 0
 
         # Step 2: Chunk documents
         logger.info("Step 2: Chunking documents...")
-        chunks = self.chunker.chunk_documents(documents)
+        parents, chunks = self.chunk(documents)
 
         # Step 3: Generate embeddings
         logger.info("Step 3: Generating embeddings...")
@@ -63,7 +144,14 @@ class IngestionPipeline:
 
         # Step 5: Store in pgvector
         logger.info("Step 5: Storing in pgvector database...")
-        doc_ids = self.vector_store.add_documents(vector_docs)
+        doc_ids = self.vector_store.add_documents(vector_docs, parents)
+
+        # Step 6: Build the reduced-precision index if quantized search is on
+        index_name = self.vector_store.ensure_quantized_index()
+        if index_name:
+            logger.info(f"Step 6: Quantized search index ready: {index_name}")
+        if settings.retrieval_fanout_enabled:
+            self.vector_store.ensure_collection_indexes(configured_collections())
 
         logger.info("=" * 60)
         logger.info(f"✓ Ingestion complete!")
@@ -73,12 +161,79 @@ class IngestionPipeline:
         logger.info(f"  - Total documents in DB: {self.vector_store.get_document_count()}")
         logger.info("=" * 60)
 
+        # Cached answers may cite chunks that no longer exist
+        shared_cache.clear("answer")
+
+        return len(documents), len(doc_ids)
+
+
+    def ingest_files(self, file_paths: List[Path]) -> int:
+        """
+        Re-process individual files: load -> chunk -> embed -> replace chunks
+
+        Each file's old chunks are replaced in a single transaction, so a
+        search never sees a half-updated document.
+
+        Args:
+            file_paths: Changed or added files inside the documents directory
+
+        Returns:
+            Number of chunks stored
+        """
+        stored = 0
+        for file_path in file_paths:
+            document = self.loader.load_file(file_path)
+            if document is None:
+                continue
+
+            parents, chunks = self.chunk([document])
+            embeddings = self.embedder.embed_texts([chunk["content"] for chunk in chunks])
+            vector_docs = [
+                Document(
+                    content=chunk["content"],
+                    metadata=chunk["metadata"],
+                    embedding=embedding
+                )
+                for chunk, embedding in zip(chunks, embeddings)
+            ]
+
+            source = document["metadata"]["source"]
+            stored += len(self.vector_store.replace_source_documents(source, vector_docs, parents))
+
+        if file_paths:
+            shared_cache.clear("answer")
+        return stored
+
+    def remove_sources(self, sources: List[str]) -> int:
+        """Delete the chunks of removed files; returns the number of chunks deleted"""
+        deleted = sum(self.vector_store.delete_source(source) for source in sources)
+        if sources:
+            shared_cache.clear("answer")
+        return deleted
+
 
-def run_ingestion():
-    """Standalone function to run ingestion"""
+def run_ingestion(force: bool = False):
+    """Standalone function to run ingestion (coordinated across workers)"""
     pipeline = IngestionPipeline()
-    pipeline.run()
+    pipeline.run_coordinated(force=force)
 
 
 if __name__ == "__main__":
-    run_ingestion()
+    parser = argparse.ArgumentParser(description="Ingest documents into pgvector")
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="After ingesting, keep watching the documents directory and re-index changes"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-ingest even if documents and settings are unchanged"
+    )
+    args = parser.parse_args()
+
+    run_ingestion(force=args.force)
+
+    if args.watch:
+        from ingestion.watcher import DocumentWatcher
+        DocumentWatcher().run_forever()
@@ -0,0 +1,191 @@
+"""
+Local mock of the OpenAI and Anthropic HTTP APIs for exercising the LLM router
+
+Serves chat completions (plain and streamed), embeddings and Anthropic
+messages (plain and streamed) with configurable latency and error rate, so
+failover, circuit breaking and hedging can be tried without real providers.
+
+Usage (from backend/), e.g. a failing OpenAI and a healthy Anthropic:
+    python -m llm.mock_server --port 8091 --error-rate 1.0 &
+    python -m llm.mock_server --port 8092 --latency-ms 300 &
+    OPENAI_BASE_URL=http://localhost:8091/v1 ANTHROPIC_BASE_URL=http://localhost:8092 \
+        ANTHROPIC_API_KEY=test python main.py
+"""
+import argparse
+import hashlib
+import json
+import random
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, Tuple
+
+
+def _reply(body: Dict[str, Any]) -> str:
+    """Deterministic answer text for the last user message"""
+    messages = body.get("messages") or []
+    question = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+    if isinstance(question, list):
+        question = " ".join(part.get("text", "") for part in question)
+    return f"Mock answer from {body.get('model')}: {question[-80:]}"
+
+
+def _embedding(text: str, dimensions: int) -> list:
+    seed = int(hashlib.sha256(text.encode()).hexdigest()[:16], 16)
+    rng = random.Random(seed)
+    return [rng.uniform(-1, 1) for _ in range(dimensions)]
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    error_rate = 0.0
+    error_status = 503
+    dimensions = 1536
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_events(self, events: Iterator[Tuple[str, str]]):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for event, data in events:
+            prefix = f"event: {event}\n" if event else ""
+            self.wfile.write(f"{prefix}data: {data}\n\n".encode())
+            self.wfile.flush()
+            time.sleep(0.01)
+        self.close_connection = True
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        time.sleep(self.latency)
+
+        if random.random() < self.error_rate:
+            self._send_json(self.error_status, {"error": {"type": "overloaded_error", "message": "mock failure"}})
+            return
+
+        if self.path.endswith("/chat/completions"):
+            self._chat(body)
+        elif self.path.endswith("/embeddings"):
+            inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+            self._send_json(200, {
+                "object": "list",
+                "model": body.get("model"),
+                "data": [
+                    {"object": "embedding", "index": i, "embedding": _embedding(text, self.dimensions)}
+                    for i, text in enumerate(inputs)
+                ],
+                "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)}
+            })
+        elif self.path.endswith("/messages"):
+            self._messages(body)
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def _chat(self, body: Dict[str, Any]):
+        text = _reply(body)
+        words = text.split(" ")
+        usage = {"prompt_tokens": 10, "completion_tokens": len(words), "total_tokens": 10 + len(words)}
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex}", "created": int(time.time()), "model": body.get("model")}
+
+        if not body.get("stream"):
+            self._send_json(200, {
+                **base,
+                "object": "chat.completion",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage
+            })
+            return
+
+        def events():
+            for i, word in enumerate(words):
+                delta = {"content": word if i == 0 else f" {word}"}
+                yield "", json.dumps({
+                    **base,
+                    "object": "chat.completion.chunk",
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": None}]
+                })
+            yield "", json.dumps({
+                **base,
+                "object": "chat.completion.chunk",
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+            })
+            yield "", json.dumps({**base, "object": "chat.completion.chunk", "choices": [], "usage": usage})
+            yield "", "[DONE]"
+
+        self._send_events(events())
+
+    def _messages(self, body: Dict[str, Any]):
+        text = _reply(body)
+        words = text.split(" ")
+        message = {
+            "id": f"msg_{uuid.uuid4().hex}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model"),
+            "stop_sequence": None
+        }
+
+        if not body.get("stream"):
+            self._send_json(200, {
+                **message,
+                "content": [{"type": "text", "text": text}],
+                "stop_reason": "end_turn",
+                "usage": {"input_tokens": 10, "output_tokens": len(words)}
+            })
+            return
+
+        def events():
+            yield "message_start", json.dumps({
+                "type": "message_start",
+                "message": {**message, "content": [], "stop_reason": None, "usage": {"input_tokens": 10, "output_tokens": 1}}
+            })
+            yield "content_block_start", json.dumps({
+                "type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}
+            })
+            for i, word in enumerate(words):
+                yield "content_block_delta", json.dumps({
+                    "type": "content_block_delta",
+                    "index": 0,
+                    "delta": {"type": "text_delta", "text": word if i == 0 else f" {word}"}
+                })
+            yield "content_block_stop", json.dumps({"type": "content_block_stop", "index": 0})
+            yield "message_delta", json.dumps({
+                "type": "message_delta",
+                "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                "usage": {"output_tokens": len(words)}
+            })
+            yield "message_stop", json.dumps({"type": "message_stop"})
+
+        self._send_events(events())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8091)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay before every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--dimensions", type=int, default=1536, help="Embedding dimension")
+    args = parser.parse_args()
+
+    MockHandler.latency = args.latency_ms / 1000
+    MockHandler.error_rate = args.error_rate
+    MockHandler.error_status = args.error_status
+    MockHandler.dimensions = args.dimensions
+
+    server = ThreadingHTTPServer(("0.0.0.0", args.port), MockHandler)
+    print(f"Mock LLM server on :{args.port} (latency {args.latency_ms:.0f}ms, error rate {args.error_rate:.0%})")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+LLM provider adapters with one completion and streaming interface
+"""
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional
+from config import settings
+from utils.metrics import metrics
+from utils.openai_client import (
+    CircuitBreaker,
+    CircuitOpenError,
+    get_openai_client,
+    guarded,
+    new_http_client,
+    openai_circuit,
+    with_deadline
+)
+
+
+@dataclass
+class LLMResult:
+    """A finished completion"""
+    text: str
+    tokens: int
+    provider: str
+    model: str
+
+
+@dataclass
+class LLMChunk:
+    """One streamed piece: a text delta, or the final token usage"""
+    text: str = ""
+    tokens: int = 0
+
+
+class LLMProvider(ABC):
+    """
+    Base class for chat completion providers
+
+    Adapters take OpenAI-style messages ({"role", "content"}, system first)
+    and return LLMResult / LLMChunk, so callers never see provider types.
+    """
+
+    name = ""
+    circuit: CircuitBreaker
+
+    def __init__(self, models: Dict[str, str]):
+        self.models = models
+
+    @property
+    @abstractmethod
+    def configured(self) -> bool:
+        """True when credentials are set"""
+
+    def model_for(self, tier: str) -> str:
+        return self.models.get(tier) or self.models["default"]
+
+    @abstractmethod
+    def complete(
+        self,
+        messages: List[Dict[str, str]],
+        tier: str,
+        max_tokens: int,
+        temperature: float,
+        started_at: Optional[float] = None
+    ) -> LLMResult:
+        """Run one chat completion"""
+
+    @abstractmethod
+    def stream(
+        self,
+        messages: List[Dict[str, str]],
+        tier: str,
+        max_tokens: int,
+        temperature: float,
+        started_at: Optional[float] = None
+    ) -> Iterator[LLMChunk]:
+        """Stream one chat completion as text deltas, then the token usage"""
+
+    @abstractmethod
+    def is_transient(self, error: Exception) -> bool:
+        """Timeouts, connection errors, 5xx and rate limits: worth failing over"""
+
+
+class OpenAIProvider(LLMProvider):
+    """Chat completions on the shared OpenAI client"""
+
+    name = "openai"
+    circuit = openai_circuit
+
+    @property
+    def configured(self) -> bool:
+        return bool(settings.openai_api_key)
+
+    def complete(self, messages, tier, max_tokens, temperature, started_at=None) -> LLMResult:
+        model = self.model_for(tier)
+        client = with_deadline(get_openai_client(), started_at)
+        response = guarded(
+            "chat",
+            lambda: client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+        )
+        tokens = response.usage.total_tokens if response.usage else 0
+        return LLMResult(response.choices[0].message.content, tokens, self.name, model)
+
+    def stream(self, messages, tier, max_tokens, temperature, started_at=None) -> Iterator[LLMChunk]:
+        client = with_deadline(get_openai_client(), started_at)
+        stream = guarded(
+            "chat_stream",
+            lambda: client.chat.completions.create(
+                model=self.model_for(tier),
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+        )
+        for chunk in stream:
+            if chunk.usage:
+                yield LLMChunk(tokens=chunk.usage.total_tokens)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield LLMChunk(text=chunk.choices[0].delta.content)
+
+    def is_transient(self, error: Exception) -> bool:
+        import openai
+        return isinstance(
+            error,
+            (openai.APIConnectionError, openai.InternalServerError, openai.RateLimitError, CircuitOpenError)
+        )
+
+
+class AnthropicProvider(LLMProvider):
+    """Claude via the Messages API, with its own connection pool and circuit breaker"""
+
+    name = "anthropic"
+
+    def __init__(self, models: Dict[str, str]):
+        super().__init__(models)
+        self.circuit = CircuitBreaker(
+            "anthropic",
+            settings.openai_circuit_failure_threshold,
+            settings.openai_circuit_reset_seconds
+        )
+
+    @property
+    def configured(self) -> bool:
+        return bool(settings.anthropic_api_key)
+
+    @staticmethod
+    def _split_system(messages: List[Dict[str, str]]):
+        """
+        Anthropic takes the system prompt separately from the turns
+
+        The Messages API also requires the turns to start with the user and
+        alternate roles, while a token-budgeted history window can start
+        with an assistant turn: leading assistant turns are dropped and
+        consecutive turns of one role are merged.
+        """
+        system = "\n\n".join(m["content"].strip() for m in messages if m["role"] == "system")
+        turns: List[Dict[str, str]] = []
+        for m in messages:
+            if m["role"] == "system" or (not turns and m["role"] != "user"):
+                continue
+            if turns and turns[-1]["role"] == m["role"]:
+                turns[-1] = {"role": m["role"], "content": f"{turns[-1]['content']}\n\n{m['content']}"}
+            else:
+                turns.append({"role": m["role"], "content": m["content"]})
+        return system, turns
+
+    def _call(self, operation: str, fn):
+        """Run one request through this provider's circuit breaker"""
+        self.circuit.before_call()
+        start = time.perf_counter()
+        try:
+            result = fn()
+        except Exception as e:
+            failure = self.is_transient(e)
+            self.circuit.record(success=not failure)
+            if failure:
+                metrics.increment(f"anthropic.{operation}.failures")
+            raise
+        self.circuit.record(success=True)
+        metrics.observe(f"anthropic.{operation}_ms", (time.perf_counter() - start) * 1000)
+        return result
+
+    def complete(self, messages, tier, max_tokens, temperature, started_at=None) -> LLMResult:
+        model = self.model_for(tier)
+        system, turns = self._split_system(messages)
+        client = with_deadline(get_anthropic_client(), started_at)
+        response = self._call(
+            "messages",
+            lambda: client.messages.create(
+                model=model,
+                system=system,
+                messages=turns,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+        )
+        text = "".join(block.text for block in response.content if block.type == "text")
+        tokens = response.usage.input_tokens + response.usage.output_tokens
+        return LLMResult(text, tokens, self.name, model)
+
+    def stream(self, messages, tier, max_tokens, temperature, started_at=None) -> Iterator[LLMChunk]:
+        system, turns = self._split_system(messages)
+        client = with_deadline(get_anthropic_client(), started_at)
+        stream = self._call(
+            "messages_stream",
+            lambda: client.messages.create(
+                model=self.model_for(tier),
+                system=system,
+                messages=turns,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True
+            )
+        )
+        input_tokens = 0
+        for event in stream:
+            if event.type == "message_start":
+                input_tokens = event.message.usage.input_tokens
+            elif event.type == "content_block_delta" and event.delta.type == "text_delta":
+                yield LLMChunk(text=event.delta.text)
+            elif event.type == "message_delta" and event.usage:
+                yield LLMChunk(tokens=input_tokens + event.usage.output_tokens)
+
+    def is_transient(self, error: Exception) -> bool:
+        import anthropic
+        return isinstance(
+            error,
+            (anthropic.APIConnectionError, anthropic.InternalServerError, anthropic.RateLimitError, CircuitOpenError)
+        )
+
+
+@lru_cache(maxsize=1)
+def get_anthropic_client():
+    """Build the Anthropic client on first use, on its own tuned connection pool"""
+    from anthropic import Anthropic
+    return Anthropic(
+        api_key=settings.anthropic_api_key,
+        base_url=settings.anthropic_base_url,
+        http_client=new_http_client(),
+        timeout=settings.openai_timeout_seconds,
+        max_retries=settings.openai_max_retries
+    )
+
+
+def build_providers() -> Dict[str, LLMProvider]:
+    """All known providers by name (configured or not)"""
+    return {
+        "openai": OpenAIProvider({"default": settings.llm_model, "fast": settings.llm_fast_model}),
+        "anthropic": AnthropicProvider({"default": settings.anthropic_model, "fast": settings.anthropic_fast_model}),
+    }
@@ -0,0 +1,204 @@
+"""
+Route answer generation across LLM providers by health and latency
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+from config import settings
+from llm.providers import LLMChunk, LLMProvider, LLMResult, build_providers
+from utils.logger import logger
+from utils.metrics import metrics
+from utils.openai_client import CircuitOpenError
+
+
+class LLMRouter:
+    """
+    Pick a provider per call and fail over between providers
+
+    Every call's outcome and latency go into a rolling window per provider;
+    outcomes older than llm_router_window_seconds expire, so a provider that
+    was demoted (and therefore stopped receiving calls) is tried first again
+    once its failures have aged out. The preferred provider (llm_provider)
+    goes first unless its error rate is above llm_router_max_error_rate, its
+    circuit is open, or another healthy provider has been
+    llm_router_latency_factor times faster. On a
+    transient failure (timeout, connection error, 5xx, rate limit) the next
+    provider is tried; for streams this only happens before the first token.
+    """
+
+    def __init__(self, providers: Optional[Dict[str, LLMProvider]] = None):
+        providers = providers or build_providers()
+        names = [settings.llm_provider] + [
+            name.strip() for name in settings.llm_fallback_providers.split(",") if name.strip()
+        ]
+        self.providers: List[LLMProvider] = []
+        for name in dict.fromkeys(names):
+            provider = providers.get(name)
+            if provider is None:
+                logger.warning(f"Unknown LLM provider '{name}', ignoring")
+            elif provider.configured:
+                self.providers.append(provider)
+        if not self.providers:
+            raise ValueError("No LLM provider is configured")
+
+        # (ok, latency_ms, time.monotonic()) per call
+        self._calls: Dict[str, Deque[Tuple[bool, float, float]]] = {
+            provider.name: deque(maxlen=settings.llm_router_window) for provider in self.providers
+        }
+        self._lock = threading.Lock()
+        logger.info(f"LLM router providers: {', '.join(p.name for p in self.providers)}")
+
+    def tier_for(self, query: str, history: Optional[List[Dict[str, str]]] = None) -> str:
+        """Short standalone questions go to the fast tier"""
+        if not history and len(query.split()) <= settings.llm_fast_query_max_words:
+            return "fast"
+        return "default"
+
+    def _record(self, provider: LLMProvider, ok: bool, latency_ms: float):
+        with self._lock:
+            self._calls[provider.name].append((ok, latency_ms, time.monotonic()))
+        metrics.increment(f"llm_router.{provider.name}.{'ok' if ok else 'errors'}")
+        if ok:
+            metrics.observe(f"llm_router.{provider.name}_ms", latency_ms)
+
+    def _health(self, provider: LLMProvider) -> Tuple[float, Optional[float]]:
+        """(error rate, median latency of successful calls) over the unexpired window"""
+        expired = time.monotonic() - settings.llm_router_window_seconds
+        with self._lock:
+            window = self._calls[provider.name]
+            while window and window[0][2] < expired:
+                window.popleft()
+            calls = list(window)
+        if not calls:
+            return 0.0, None
+        latencies = sorted(latency for ok, latency, _ in calls if ok)
+        error_rate = sum(1 for ok, _, _ in calls if not ok) / len(calls)
+        return error_rate, latencies[len(latencies) // 2] if latencies else None
+
+    def _order(self) -> List[LLMProvider]:
+        """Healthy providers first (preferred first unless much slower), then the rest"""
+        healthy, unhealthy = [], []
+        for provider in self.providers:
+            error_rate, latency = self._health(provider)
+            if provider.circuit.status()["open"] or error_rate > settings.llm_router_max_error_rate:
+                unhealthy.append(provider)
+            else:
+                healthy.append((provider, latency))
+
+        if len(healthy) > 1:
+            preferred_latency = healthy[0][1]
+            fastest = min((item for item in healthy[1:] if item[1] is not None), key=lambda item: item[1], default=None)
+            if (
+                preferred_latency is not None
+                and fastest is not None
+                and preferred_latency > fastest[1] * settings.llm_router_latency_factor
+            ):
+                healthy.remove(fastest)
+                healthy.insert(0, fastest)
+
+        return [provider for provider, _ in healthy] + unhealthy
+
+    def check_available(self):
+        """
+        Fail fast when no provider can be called right now
+
+        Raises:
+            CircuitOpenError: Every provider's circuit is open (retry_after
+                is the soonest any of them lets a call through)
+        """
+        waits = [provider.circuit.retry_after() for provider in self.providers]
+        if all(wait is not None for wait in waits):
+            raise CircuitOpenError("llm", min(waits))
+
+    def complete(
+        self,
+        messages: List[Dict[str, str]],
+        tier: str = "default",
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        started_at: Optional[float] = None
+    ) -> LLMResult:
+        """
+        Complete a chat, failing over to the next provider on transient errors
+
+        Args:
+            messages: OpenAI-style messages, system prompt first
+            tier: 'default' or 'fast'
+            max_tokens: Output limit (defaults to llm_max_tokens)
+            temperature: Sampling temperature (defaults to llm_temperature)
+            started_at: time.perf_counter() when the query started (call deadlines)
+
+        Returns:
+            LLMResult from the first provider that succeeded
+        """
+        max_tokens = max_tokens or settings.llm_max_tokens
+        temperature = settings.llm_temperature if temperature is None else temperature
+        error: Optional[Exception] = None
+
+        for provider in self._order():
+            start = time.perf_counter()
+            try:
+                result = provider.complete(messages, tier, max_tokens, temperature, started_at)
+            except Exception as e:
+                self._record(provider, False, (time.perf_counter() - start) * 1000)
+                if not provider.is_transient(e):
+                    raise
+                logger.warning(f"LLM provider {provider.name} failed ({e}), failing over")
+                metrics.increment("llm_router.failovers")
+                error = e
+                continue
+            self._record(provider, True, (time.perf_counter() - start) * 1000)
+            return result
+
+        raise error
+
+    def stream(
+        self,
+        messages: List[Dict[str, str]],
+        tier: str = "default",
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        started_at: Optional[float] = None
+    ) -> Iterator[LLMChunk]:
+        """
+        Stream a chat as LLMChunks, failing over until the first token arrives
+
+        Arguments are the same as for complete(). Latency is recorded as the
+        time to the first chunk.
+        """
+        max_tokens = max_tokens or settings.llm_max_tokens
+        temperature = settings.llm_temperature if temperature is None else temperature
+        error: Optional[Exception] = None
+
+        for provider in self._order():
+            start = time.perf_counter()
+            started_streaming = False
+            try:
+                for chunk in provider.stream(messages, tier, max_tokens, temperature, started_at):
+                    if not started_streaming:
+                        started_streaming = True
+                        self._record(provider, True, (time.perf_counter() - start) * 1000)
+                    yield chunk
+                return
+            except Exception as e:
+                if started_streaming or not provider.is_transient(e):
+                    raise
+                self._record(provider, False, (time.perf_counter() - start) * 1000)
+                logger.warning(f"LLM provider {provider.name} failed before streaming ({e}), failing over")
+                metrics.increment("llm_router.failovers")
+                error = e
+
+        raise error
+
+    def status(self) -> Dict[str, Any]:
+        """Per-provider error rate, median latency and circuit state"""
+        status = {}
+        for provider in self.providers:
+            error_rate, latency = self._health(provider)
+            status[provider.name] = {
+                "error_rate": round(error_rate, 3),
+                "p50_ms": round(latency, 1) if latency is not None else None,
+                "circuit_open": provider.circuit.status()["open"]
+            }
+        return status
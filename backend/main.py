@@ -4,10 +4,12 @@ Main FastAPI application entry point
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from api.routes import router, initialize_workflow
+from api.routes import router, initialize_workflow, warm_up
 from config import settings
 from utils.logger import logger
-from ingestion.ingest_pipeline import run_ingestion
+from utils.metrics import metrics
+from utils.write_buffer import write_buffer
+from vector_store.pgvector_store import wait_for_database
 import time
 
 
@@ -30,10 +32,17 @@ app.add_middleware(
 # Include routes
 app.include_router(router)
 
+# Background document watcher (started when settings.watch_documents is set)
+document_watcher = None
+# Periodic analytics jobs (started when settings.analytics_refresh_seconds > 0)
+analytics_scheduler = None
+
 
 @app.on_event("startup")
 async def startup_event():
     """Run on application startup"""
+    global document_watcher, analytics_scheduler
+
     logger.info("=" * 60)
     logger.info("Starting Skyro Knowledge Assistant")
     logger.info("=" * 60)
@@ -42,22 +51,53 @@ async def startup_event():
     logger.info(f"LLM Model: {settings.llm_model}")
     logger.info(f"Embedding Model: {settings.embedding_model}")
 
+    startup_start = time.perf_counter()
+
     # Wait for database to be ready
     logger.info("Waiting for database to be ready...")
-    time.sleep(5)
+    with metrics.timer("startup.db_wait_ms"):
+        wait_for_database()
 
-    # Run ingestion if enabled
+    # Run ingestion if enabled (only one worker ingests; the rest wait and skip)
     if settings.auto_ingest_on_startup:
         logger.info("Auto-ingestion enabled, running ingestion pipeline...")
+        # The ingestion stack is only imported when ingestion actually runs
+        from ingestion.ingest_pipeline import run_ingestion
         try:
-            run_ingestion()
+            with metrics.timer("startup.ingestion_ms"):
+                run_ingestion()
         except Exception as e:
             logger.error(f"Ingestion failed: {e}")
             logger.info("Continuing with existing data...")
 
     # Initialize RAG workflow
     logger.info("Initializing RAG workflow...")
-    initialize_workflow()
+    with metrics.timer("startup.workflow_init_ms"):
+        initialize_workflow()
+
+    # Pre-load index pages before the readiness probe reports ready
+    logger.info("Warming up...")
+    with metrics.timer("startup.warm_up_ms"):
+        warm_up()
+
+    # Watch the documents directory for incremental re-indexing
+    if settings.watch_documents:
+        from ingestion.watcher import DocumentWatcher
+        document_watcher = DocumentWatcher()
+        document_watcher.start()
+
+    # Rollups, feedback boosts and log retention
+    if settings.analytics_refresh_seconds > 0:
+        from analytics.scheduler import AnalyticsScheduler
+        analytics_scheduler = AnalyticsScheduler()
+        analytics_scheduler.start()
+
+    metrics.observe("startup.total_ms", (time.perf_counter() - startup_start) * 1000)
+    phases = metrics.snapshot()["timings"]
+    logger.info("Startup profile: " + ", ".join(
+        f"{name.split('.', 1)[1]}={timing['avg']:.0f}"
+        for name, timing in phases.items() if name.startswith("startup.")
+    ))
 
     logger.info("=" * 60)
     logger.info("✓ Skyro Knowledge Assistant is ready!")
@@ -70,11 +110,23 @@ async def shutdown_event():
     """Run on application shutdown"""
     logger.info("Shutting down Skyro Knowledge Assistant")
 
+    if document_watcher is not None:
+        document_watcher.stop()
+
+    if analytics_scheduler is not None:
+        analytics_scheduler.stop()
+
+    # Flush buffered feedback and query logs before the process exits
+    write_buffer.stop()
+
 
 if __name__ == "__main__":
+    development = settings.environment == "development"
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=8000,
-        reload=settings.environment == "development"
+        reload=development,
+        # reload only supports a single process
+        workers=1 if development else settings.server_workers
     )
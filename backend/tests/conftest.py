@@ -0,0 +1,11 @@
+"""
+Shared test setup: import modules from backend/ and satisfy required settings
+
+Usage (from backend/):
+    pytest tests/
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
@@ -0,0 +1,220 @@
+"""
+Tests for admission control: the rate limiter, the concurrency limiter and its
+use by the stream endpoint
+"""
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from api import routes
+from api import admission
+from api.admission import AdmissionRejected, ConcurrencyLimiter, RateLimiter
+from config import settings
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+def make_rate_limiter(monkeypatch, per_minute=60, burst=2, max_clients=100, shared=False) -> RateLimiter:
+    monkeypatch.setattr(settings, "rate_limit_enabled", True)
+    monkeypatch.setattr(settings, "rate_limit_shared", shared)
+    monkeypatch.setattr(settings, "rate_limit_per_minute", per_minute)
+    monkeypatch.setattr(settings, "rate_limit_burst", burst)
+    monkeypatch.setattr(settings, "rate_limit_max_clients", max_clients)
+    return RateLimiter()
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(admission, "time", SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+def test_rate_limit_allows_burst_then_rejects(monkeypatch, clock):
+    limiter = make_rate_limiter(monkeypatch)
+    limiter.check("alice")
+    limiter.check("alice")
+    with pytest.raises(AdmissionRejected) as rejected:
+        limiter.check("alice")
+    assert rejected.value.retry_after == 1
+    # Buckets are per client
+    limiter.check("bob")
+
+
+def test_rate_limit_bucket_refills(monkeypatch, clock):
+    limiter = make_rate_limiter(monkeypatch)
+    limiter.check("alice")
+    limiter.check("alice")
+    clock.now += 1.0
+    limiter.check("alice")
+    with pytest.raises(AdmissionRejected):
+        limiter.check("alice")
+
+
+def test_rate_limit_evicts_least_recent_client(monkeypatch, clock):
+    limiter = make_rate_limiter(monkeypatch, burst=1, max_clients=2)
+    limiter.check("alice")
+    limiter.check("bob")
+    limiter.check("carol")
+    assert list(limiter._buckets) == ["bob", "carol"]
+    # An evicted client comes back with a full bucket
+    limiter.check("alice")
+    with pytest.raises(AdmissionRejected):
+        limiter.check("carol")
+
+
+def test_rate_limit_disabled(monkeypatch, clock):
+    limiter = make_rate_limiter(monkeypatch, burst=1)
+    limiter.enabled = False
+    for _ in range(5):
+        limiter.check("alice")
+
+
+def test_shared_rate_limit_falls_back_to_local_bucket(monkeypatch, clock):
+    limiter = make_rate_limiter(monkeypatch, burst=1, shared=True)
+
+    def unavailable():
+        raise ConnectionError("database down")
+
+    monkeypatch.setattr(limiter, "_get_connection", unavailable)
+
+    async def scenario():
+        await limiter.check_async("alice")
+        with pytest.raises(AdmissionRejected):
+            await limiter.check_async("alice")
+
+    asyncio.run(scenario())
+
+
+def make_limiter(monkeypatch, max_in_flight=1, max_queued=1, queue_timeout=5.0) -> ConcurrencyLimiter:
+    monkeypatch.setattr(settings, "max_in_flight_queries", max_in_flight)
+    monkeypatch.setattr(settings, "max_queued_queries", max_queued)
+    monkeypatch.setattr(settings, "queue_timeout_seconds", queue_timeout)
+    return ConcurrencyLimiter()
+
+
+def test_queued_request_admitted_after_release(monkeypatch):
+    limiter = make_limiter(monkeypatch)
+
+    async def scenario():
+        started = await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.01)
+        assert limiter.waiting == 1
+
+        await limiter.release_async(started)
+        await asyncio.wait_for(waiter, timeout=1)
+        assert limiter.in_flight == 1 and limiter.waiting == 0
+        limiter.release(waiter.result())
+
+    asyncio.run(scenario())
+    assert limiter.in_flight == 0
+
+
+def test_sheds_when_queue_is_full(monkeypatch):
+    limiter = make_limiter(monkeypatch, max_queued=0)
+
+    async def scenario():
+        started = await limiter.acquire()
+        with pytest.raises(AdmissionRejected):
+            await limiter.acquire()
+        limiter.release(started)
+
+    asyncio.run(scenario())
+
+
+def test_sheds_after_queue_timeout(monkeypatch):
+    limiter = make_limiter(monkeypatch, queue_timeout=0.05)
+
+    async def scenario():
+        started = await limiter.acquire()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await limiter.acquire()
+        assert rejected.value.retry_after >= 1
+        assert limiter.waiting == 0
+        limiter.release(started)
+
+    asyncio.run(scenario())
+
+
+class RecordingLimiter(ConcurrencyLimiter):
+    """Records the threads that acquire and release slots"""
+
+    def __init__(self):
+        super().__init__()
+        self.acquire_threads = set()
+        self.release_threads = set()
+
+    async def acquire(self) -> float:
+        self.acquire_threads.add(threading.get_ident())
+        return await super().acquire()
+
+    def release(self, started: float):
+        self.release_threads.add(threading.get_ident())
+        super().release(started)
+
+
+class FakeWorkflow:
+    """Streams a fixed answer; the 'slow' question waits for the test to let it finish"""
+
+    def __init__(self):
+        self.gate = threading.Event()
+
+    def stream(self, question, session=None):
+        yield {"type": "sources", "sources": []}
+        if question == "slow":
+            self.gate.wait(5)
+        yield {"type": "token", "content": "answer"}
+        yield {"type": "done", "answer": "answer", "last_retrieval": None, "tokens_used": 0}
+
+
+def test_stream_releases_slot_to_queued_request(monkeypatch):
+    make_limiter(monkeypatch, max_in_flight=2, max_queued=1)
+    limiter = RecordingLimiter()
+    workflow = FakeWorkflow()
+    monkeypatch.setattr(routes, "rag_workflow", workflow)
+    monkeypatch.setattr(routes, "concurrency_limiter", limiter)
+    monkeypatch.setattr(routes, "log_query", lambda *args: None)
+    monkeypatch.setattr(routes.rate_limiter, "enabled", False)
+
+    app = FastAPI()
+    app.include_router(routes.router)
+    responses = {}
+
+    def post(name, question):
+        responses[name] = client.post("/api/v1/query/stream", json={"question": question})
+
+    with TestClient(app) as client:
+        # Fill every in-flight slot with a stream that is still running
+        streams = [threading.Thread(target=post, args=(f"stream-{i}", "slow")) for i in range(2)]
+        for thread in streams:
+            thread.start()
+        deadline = time.monotonic() + 5
+        while limiter.in_flight < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert limiter.in_flight == 2
+
+        queued = threading.Thread(target=post, args=("queued", "fast"))
+        queued.start()
+        while limiter.waiting < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert limiter.waiting == 1
+
+        workflow.gate.set()
+        for thread in streams + [queued]:
+            thread.join(timeout=5)
+
+    assert all(response.status_code == 200 for response in responses.values())
+    assert '"type": "done"' in responses["queued"].text
+    assert limiter.in_flight == 0 and limiter.waiting == 0
+    # asyncio.Semaphore is not thread-safe: slots must be returned on the event loop
+    assert limiter.release_threads == limiter.acquire_threads
@@ -0,0 +1,78 @@
+"""
+Tests for the circuit breaker in front of the LLM providers
+"""
+from types import SimpleNamespace
+import pytest
+from utils import openai_client
+from utils.openai_client import CircuitBreaker, CircuitOpenError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(openai_client, "time", SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+def fail(breaker: CircuitBreaker, times: int):
+    for _ in range(times):
+        breaker.before_call()
+        breaker.record(False)
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_seconds=30)
+    fail(breaker, 2)
+    assert breaker.status() == {"open": False, "consecutive_failures": 2}
+
+    fail(breaker, 1)
+    assert breaker.status()["open"]
+    with pytest.raises(CircuitOpenError) as rejected:
+        breaker.before_call()
+    assert rejected.value.retry_after == 30
+
+
+def test_success_resets_failure_count(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_seconds=30)
+    fail(breaker, 2)
+    breaker.before_call()
+    breaker.record(True)
+    fail(breaker, 2)
+    assert breaker.status() == {"open": False, "consecutive_failures": 2}
+
+
+def test_single_trial_after_reset_period(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=30)
+    fail(breaker, 1)
+    clock.now += 10
+    assert breaker.retry_after() == 20
+
+    clock.now += 20
+    assert breaker.retry_after() is None
+    breaker.before_call()
+    # Only one trial goes out while it is running
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.retry_after() is not None
+
+    breaker.record(True)
+    assert breaker.status() == {"open": False, "consecutive_failures": 0}
+    breaker.before_call()
+
+
+def test_failed_trial_reopens_for_full_period(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=30)
+    fail(breaker, 1)
+    clock.now += 30
+    fail(breaker, 1)
+    assert breaker.retry_after() == 30
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
@@ -0,0 +1,80 @@
+"""
+Tests for the pure routing functions behind the graph's conditional edges
+"""
+import time
+import pytest
+from config import Settings, settings
+from graph.nodes import answered_extractively, answered_from_index, should_regenerate
+from vector_store.pgvector_store import RetrievedChunk
+
+
+def chunk(similarity: float) -> RetrievedChunk:
+    return RetrievedChunk(id=1, content="text", source="doc.md", doc_type="confluence", similarity=similarity)
+
+
+def state(docs=None, weak=False, retry_count=0, elapsed_ms=0.0, **extra):
+    return {
+        "retrieved_docs": [chunk(0.5)] if docs is None else docs,
+        "should_regenerate": weak,
+        "retry_count": retry_count,
+        "started_at": time.perf_counter() - elapsed_ms / 1000,
+        **extra
+    }
+
+
+@pytest.fixture
+def retry_loop(monkeypatch):
+    monkeypatch.setattr(settings, "context_retry_max", 1)
+    monkeypatch.setattr(settings, "context_retry_budget_ms", 4000)
+    monkeypatch.setattr(settings, "no_answer_policy", "template")
+
+
+def test_strong_context_takes_fast_path(retry_loop):
+    assert should_regenerate(state(weak=False)) == "format_context"
+
+
+def test_weak_context_is_rewritten(retry_loop):
+    assert should_regenerate(state(weak=True)) == "rewrite_query"
+
+
+def test_retry_loop_off_by_default(monkeypatch):
+    assert Settings.model_fields["context_retry_max"].default == 0
+    monkeypatch.setattr(settings, "context_retry_max", 0)
+    assert should_regenerate(state(weak=True)) == "format_context"
+
+
+def test_no_rewrite_once_retries_are_used(retry_loop):
+    assert should_regenerate(state(weak=True, retry_count=1)) == "format_context"
+
+
+def test_no_rewrite_past_time_budget(retry_loop):
+    assert should_regenerate(state(weak=True, elapsed_ms=5000)) == "format_context"
+
+
+def test_empty_retrieval_goes_to_template_without_rewrite(retry_loop):
+    assert should_regenerate(state(docs=[], weak=True)) == "no_answer"
+
+
+def test_empty_retrieval_rewrites_with_llm_policy(retry_loop, monkeypatch):
+    monkeypatch.setattr(settings, "no_answer_policy", "llm")
+    assert should_regenerate(state(docs=[], weak=True)) == "rewrite_query"
+    assert should_regenerate(state(docs=[], weak=True, retry_count=1)) == "format_context"
+
+
+def test_extractive_answer_ends_the_run():
+    assert answered_extractively(state(answer="The limit is 5000 EUR.")) == "done"
+
+
+@pytest.mark.parametrize("answer", [None, ""])
+def test_no_extractive_answer_falls_through_to_generation(answer):
+    assert answered_extractively(state(answer=answer)) == "generate"
+    assert answered_extractively(state()) == "generate"
+
+
+def test_indexed_answer_skips_retrieval():
+    assert answered_from_index({"query": "What is the card limit?", "answer": "5000 EUR."}) == "done"
+
+
+def test_index_miss_goes_to_retrieval():
+    assert answered_from_index({"query": "What is the card limit?"}) == "retrieve"
+    assert answered_from_index({"query": "What is the card limit?", "answer": ""}) == "retrieve"
@@ -0,0 +1,35 @@
+"""
+Tests for provider message adaptation
+"""
+from llm.providers import AnthropicProvider
+
+
+def test_split_system_moves_system_prompts_out():
+    system, turns = AnthropicProvider._split_system([
+        {"role": "system", "content": "Be brief. "},
+        {"role": "system", "content": "Cite sources."},
+        {"role": "user", "content": "Question"}
+    ])
+    assert system == "Be brief.\n\nCite sources."
+    assert turns == [{"role": "user", "content": "Question"}]
+
+
+def test_split_system_drops_leading_assistant_turns():
+    # A token-budgeted history window can be cut after a user turn
+    _, turns = AnthropicProvider._split_system([
+        {"role": "system", "content": "Prompt"},
+        {"role": "assistant", "content": "Earlier answer"},
+        {"role": "user", "content": "Follow-up"},
+        {"role": "assistant", "content": "Answer"},
+        {"role": "user", "content": "Question"}
+    ])
+    assert [turn["role"] for turn in turns] == ["user", "assistant", "user"]
+    assert turns[0]["content"] == "Follow-up"
+
+
+def test_split_system_merges_consecutive_turns_of_one_role():
+    _, turns = AnthropicProvider._split_system([
+        {"role": "user", "content": "History question"},
+        {"role": "user", "content": "Context and question"}
+    ])
+    assert turns == [{"role": "user", "content": "History question\n\nContext and question"}]
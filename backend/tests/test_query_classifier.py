@@ -0,0 +1,65 @@
+"""
+Tests for the query classifier's tier, max_tokens and context size decisions
+"""
+import pytest
+from config import Settings, settings
+from graph.query_classifier import classify, dominant_doc_type
+from vector_store.pgvector_store import RetrievedChunk
+
+
+def docs(*doc_types):
+    return [
+        RetrievedChunk(id=i, content="text", source=f"doc{i}.md", doc_type=doc_type, similarity=0.8)
+        for i, doc_type in enumerate(doc_types)
+    ]
+
+
+@pytest.fixture(autouse=True)
+def thresholds(monkeypatch):
+    monkeypatch.setattr(settings, "llm_fast_query_max_words", 12)
+    monkeypatch.setattr(settings, "llm_max_tokens", 2000)
+    monkeypatch.setattr(settings, "context_similarity_threshold", 0.75)
+    monkeypatch.setattr(settings, "classifier_lookup_confidence", 0.82)
+    monkeypatch.setattr(settings, "classifier_lookup_max_tokens", 400)
+    monkeypatch.setattr(settings, "classifier_lookup_context_docs", 3)
+    monkeypatch.setattr(settings, "classifier_standard_max_tokens", 1000)
+    monkeypatch.setattr(settings, "classifier_standard_context_docs", 5)
+
+
+def test_classifier_off_by_default():
+    assert Settings.model_fields["query_classifier_enabled"].default is False
+
+
+@pytest.mark.parametrize("confidence, label, tier, max_tokens, context_docs", [
+    (0.90, "lookup", "fast", 400, 3),
+    (0.82, "lookup", "fast", 400, 3),
+    (0.80, "standard", "default", 1000, 5),
+    (0.75, "standard", "default", 1000, 5),
+    (0.60, "complex", "default", 2000, 6),
+    (None, "complex", "default", 2000, 6),
+])
+def test_short_question_routed_by_confidence(confidence, label, tier, max_tokens, context_docs):
+    route = classify("What is the card limit?", docs(*["product_specs"] * 6), confidence)
+    assert (route.label, route.tier, route.max_tokens, route.context_docs) == (label, tier, max_tokens, context_docs)
+
+
+@pytest.mark.parametrize("query, history, retry_count", [
+    ("Why did we drop the legacy card?", None, 0),
+    ("Compare the two onboarding flows", None, 0),
+    ("What is the card limit?", [{"role": "user", "content": "Hi"}], 0),
+    ("What is the card limit?", None, 1),
+    (" ".join(["word"] * 25), None, 0),
+])
+def test_complex_questions_get_the_full_budget(query, history, retry_count):
+    route = classify(query, docs("product_specs", "confluence"), 0.95, history=history, retry_count=retry_count)
+    assert (route.label, route.tier, route.max_tokens, route.context_docs) == ("complex", "default", 2000, 2)
+
+
+def test_meeting_notes_are_not_lookups():
+    route = classify("Who owns the launch?", docs("meetings", "meetings", "confluence"), 0.95)
+    assert (route.label, route.tier, route.max_tokens) == ("standard", "default", 1000)
+
+
+def test_dominant_doc_type_ties_go_to_better_ranked():
+    assert dominant_doc_type(docs("confluence", "meetings", "meetings", "confluence")) == "confluence"
+    assert dominant_doc_type([]) is None
@@ -0,0 +1,131 @@
+"""
+Tests for request coalescing (SingleFlight, StreamFlight) and shared streams in the workflow
+"""
+import threading
+import time
+import pytest
+from graph import workflow as workflow_module
+from graph.workflow import RAGWorkflow
+from utils.single_flight import SingleFlight, StreamFlight
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def run_concurrently(count, target):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    flight = SingleFlight("test")
+    gate = threading.Event()
+    calls = []
+    results = []
+
+    def compute():
+        calls.append(1)
+        gate.wait(5)
+        return "answer"
+
+    threads = run_concurrently(4, lambda: results.append(flight.do("key", compute)))
+    wait_until(lambda: "key" in flight._calls and flight._calls["key"].waiters == 3)
+    gate.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True]
+    assert all(result == "answer" for result, _ in results)
+    assert flight._calls == {}
+
+
+def test_single_flight_propagates_errors_to_waiters():
+    flight = SingleFlight("test")
+    gate = threading.Event()
+    errors = []
+
+    def compute():
+        gate.wait(5)
+        raise ValueError("boom")
+
+    def call():
+        try:
+            flight.do("key", compute)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = run_concurrently(3, call)
+    wait_until(lambda: "key" in flight._calls and flight._calls["key"].waiters == 2)
+    gate.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert len(errors) == 3
+    # The key is released, so the next call runs again
+    assert flight.do("key", lambda: "fresh") == ("fresh", False)
+
+
+def test_stream_flight_replays_events_to_late_subscribers():
+    flight = StreamFlight("test")
+    gate = threading.Event()
+    runs = []
+
+    def produce():
+        runs.append(1)
+        yield 1
+        gate.wait(5)
+        yield 2
+        yield 3
+
+    leader, leader_shared = flight.subscribe("key", produce)
+    assert next(leader) == 1
+    follower, follower_shared = flight.subscribe("key", produce)
+    gate.set()
+
+    assert (leader_shared, follower_shared) == (False, True)
+    assert list(leader) == [2, 3]
+    assert list(follower) == [1, 2, 3]
+    assert len(runs) == 1
+
+
+def test_stream_flight_propagates_errors_after_replay():
+    flight = StreamFlight("test")
+
+    def produce():
+        yield "first"
+        raise RuntimeError("stream failed")
+
+    events, _ = flight.subscribe("key", produce)
+    assert next(events) == "first"
+    with pytest.raises(RuntimeError, match="stream failed"):
+        next(events)
+
+
+def test_shared_stream_followers_report_no_tokens(monkeypatch):
+    monkeypatch.setattr(workflow_module.shared_cache, "get", lambda namespace, key: None)
+    gate = threading.Event()
+
+    def fake_stream(question, session, answer_key):
+        yield {"type": "sources", "sources": []}
+        gate.wait(5)
+        yield {"type": "done", "answer": "answer", "last_retrieval": None, "tokens_used": 42}
+
+    workflow = RAGWorkflow.__new__(RAGWorkflow)
+    workflow.stream_flight = StreamFlight("query_stream")
+    workflow._stream = fake_stream
+
+    leader = workflow.stream("What is Skyro?")
+    assert next(leader)["type"] == "sources"
+    follower = workflow.stream("what is skyro")
+    assert next(follower)["type"] == "sources"
+    gate.set()
+
+    assert [event["tokens_used"] for event in leader if event["type"] == "done"] == [42]
+    assert [event["tokens_used"] for event in follower if event["type"] == "done"] == [0]
@@ -0,0 +1,99 @@
+"""
+Tests for the write-behind buffer: batching, retry, rejected rows and overflow
+"""
+import threading
+import time
+import psycopg2
+import pytest
+from config import settings
+from utils.write_buffer import WriteBehindBuffer
+
+
+class FakeDatabase:
+    """Stands in for WriteBehindBuffer._insert; rejects rows whose query is 'bad'"""
+
+    def __init__(self):
+        self.written = []
+        self.attempts = 0
+        self.down = False
+        self.lock = threading.Lock()
+
+    def insert(self, batch):
+        with self.lock:
+            self.attempts += 1
+            if self.down:
+                raise psycopg2.OperationalError("connection refused")
+            if any(row["query"] == "bad" for _, row in batch):
+                raise psycopg2.IntegrityError("violates check constraint")
+            self.written.extend(row["query"] for _, row in batch)
+        return {"query_logs": len(batch)}
+
+
+@pytest.fixture
+def buffer(monkeypatch):
+    monkeypatch.setattr(settings, "write_buffer_batch_size", 3)
+    monkeypatch.setattr(settings, "write_buffer_flush_interval_seconds", 0.01)
+    monkeypatch.setattr(settings, "write_buffer_max_pending", 10)
+    monkeypatch.setattr(settings, "write_buffer_max_batch_attempts", 2)
+    buffer = WriteBehindBuffer()
+    buffer.database = FakeDatabase()
+    buffer._insert = buffer.database.insert
+    yield buffer
+    buffer.stop(timeout=1)
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def enqueue(buffer, *queries):
+    return [buffer.enqueue("query_logs", {"query": query}) for query in queries]
+
+
+def test_rows_are_written_in_order(buffer):
+    enqueue(buffer, "a", "b", "c", "d")
+    wait_until(lambda: len(buffer.database.written) == 4)
+    assert buffer.database.written == ["a", "b", "c", "d"]
+    assert buffer.status()["pending"] == 0
+
+
+def test_rejected_row_is_dropped_without_blocking_later_rows(buffer):
+    enqueue(buffer, "a", "bad", "b", "c", "d")
+    wait_until(lambda: buffer.database.written[-2:] == ["c", "d"])
+
+    assert buffer.database.written == ["a", "b", "c", "d"]
+    # The queue moved again, so the retry state is reset
+    assert buffer.status() == {"pending": 0, "backoff_seconds": 0.0, "failed_attempts": 0}
+
+
+def test_rows_are_kept_while_database_is_down(buffer):
+    buffer.database.down = True
+    enqueue(buffer, "a", "b")
+    wait_until(lambda: buffer.database.attempts >= 3)
+    assert buffer.database.written == []
+    assert buffer.status()["pending"] == 2
+
+    buffer.database.down = False
+    buffer._stop_event.set()  # skip the rest of the backoff
+    wait_until(lambda: buffer.database.written == ["a", "b"])
+
+
+def test_new_rows_dropped_when_buffer_is_full(buffer):
+    buffer.database.down = True
+    accepted = enqueue(buffer, *[str(i) for i in range(12)])
+    assert accepted == [True] * 10 + [False] * 2
+
+
+def test_unknown_table_rejected(buffer):
+    with pytest.raises(ValueError):
+        buffer.enqueue("documents", {"content": "x"})
+
+
+def test_stop_flushes_pending_rows(buffer):
+    buffer.flush_interval = 60
+    enqueue(buffer, "a")
+    buffer.stop(timeout=5)
+    assert buffer.database.written == ["a"]
@@ -0,0 +1,84 @@
+"""
+Lightweight in-process metrics (counters and latency timings)
+"""
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+
+class Metrics:
+    """Thread-safe counters and rolling-window timings"""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._timings: Dict[str, deque] = defaultdict(lambda: deque(maxlen=self.window))
+
+    def increment(self, name: str, value: float = 1):
+        """Increase a counter"""
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name: str, value_ms: float):
+        """Record a latency observation in milliseconds"""
+        with self._lock:
+            self._timings[name].append(value_ms)
+
+    def percentile(self, name: str, pct: float, min_count: int = 1) -> Optional[float]:
+        """
+        Current percentile of one timing
+
+        Args:
+            name: Timing name
+            pct: Percentile as a fraction (0.95 for p95)
+            min_count: Return None until this many observations exist
+
+        Returns:
+            Value in milliseconds, or None without enough observations
+        """
+        with self._lock:
+            values = sorted(self._timings.get(name, ()))
+        if not values or len(values) < min_count:
+            return None
+        return values[min(len(values) - 1, int(len(values) * pct))]
+
+    @contextmanager
+    def timer(self, name: str):
+        """Record the duration of a with-block as a timing in milliseconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get current counters and timing percentiles
+
+        Returns:
+            Dict with 'counters' and 'timings' (count, avg, p50, p95, p99 per name)
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            timings_raw = {name: sorted(values) for name, values in self._timings.items()}
+
+        timings = {}
+        for name, values in timings_raw.items():
+            if not values:
+                continue
+            timings[name] = {
+                "count": len(values),
+                "avg": round(sum(values) / len(values), 2),
+                "p50": round(values[int(len(values) * 0.50)], 2),
+                "p95": round(values[min(len(values) - 1, int(len(values) * 0.95))], 2),
+                "p99": round(values[min(len(values) - 1, int(len(values) * 0.99))], 2),
+            }
+
+        return {"counters": counters, "timings": timings}
+
+
+# Default metrics registry
+metrics = Metrics()
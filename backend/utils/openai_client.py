@@ -0,0 +1,275 @@
+"""
+Process-wide OpenAI client shared by the embedder and the RAG nodes
+
+All calls share one tuned httpx transport: a keep-alive pool sized to the
+number of concurrent queries, HTTP/2 when the h2 package is installed, and
+connect/read timeouts. Calls go through a circuit breaker, take deadlines
+from the query's remaining budget, and query embeddings are hedged once
+they run past their recent p95.
+"""
+import importlib.util
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional
+from config import settings
+from utils.logger import logger
+from utils.metrics import metrics
+
+# HTTP/2 needs the optional h2 package (pip install httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider while its circuit breaker is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} circuit open, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Stop calling an upstream that keeps failing
+
+    After failure_threshold consecutive connection errors, timeouts or 5xx
+    responses the circuit opens and calls fail fast for reset_seconds. Then
+    a single trial call is let through: success closes the circuit, failure
+    opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go out now"""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            waited = time.monotonic() - self._opened_at
+            if waited < self.reset_seconds or self._trial_running:
+                metrics.increment(f"circuit.{self.name}.rejected")
+                raise CircuitOpenError(self.name, max(1.0, self.reset_seconds - waited))
+            self._trial_running = True
+
+    def record(self, success: bool):
+        """Record the outcome of a call let through by before_call"""
+        with self._lock:
+            self._trial_running = False
+            if success:
+                if self._opened_at is not None:
+                    logger.info(f"Circuit {self.name} closed")
+                self._failures = 0
+                self._opened_at = None
+                return
+
+            self._failures += 1
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning(f"Circuit {self.name} opened after {self._failures} consecutive failures")
+                    metrics.increment(f"circuit.{self.name}.opened")
+                self._opened_at = time.monotonic()
+
+    def retry_after(self) -> Optional[float]:
+        """Seconds until a call may go out again, or None if one may go out now"""
+        with self._lock:
+            if self._opened_at is None:
+                return None
+            waited = time.monotonic() - self._opened_at
+            if waited < self.reset_seconds or self._trial_running:
+                return max(1.0, self.reset_seconds - waited)
+            return None
+
+    def status(self) -> Dict[str, Any]:
+        """Current state and consecutive failure count"""
+        with self._lock:
+            return {"open": self._opened_at is not None, "consecutive_failures": self._failures}
+
+
+openai_circuit = CircuitBreaker(
+    "openai",
+    settings.openai_circuit_failure_threshold,
+    settings.openai_circuit_reset_seconds
+)
+
+
+def _pool_size() -> int:
+    # Each in-flight query may hold an answer stream plus a rewrite/embedding call
+    return settings.openai_max_connections or max(8, settings.max_in_flight_queries * 2)
+
+
+def _trace(event_name: str, info: Dict[str, Any]):
+    """httpcore trace hook: count connections opened (the rest were reused)"""
+    if event_name == "connection.connect_tcp.complete":
+        metrics.increment("openai.http.connections_opened")
+
+
+def _on_request(request):
+    metrics.increment("openai.http.requests")
+    request.extensions["trace"] = _trace
+
+
+def new_http_client():
+    """Build a tuned httpx client (keep-alive pool, timeouts, reuse metrics) for an LLM provider"""
+    import httpx
+
+    http2 = settings.openai_http2 and HTTP2_AVAILABLE
+    size = _pool_size()
+    logger.info(f"LLM transport: pool of {size} connections, HTTP/{'2' if http2 else '1.1'}")
+    return httpx.Client(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=size,
+            max_keepalive_connections=size,
+            keepalive_expiry=settings.openai_keepalive_seconds
+        ),
+        timeout=httpx.Timeout(
+            settings.openai_timeout_seconds,
+            connect=settings.openai_connect_timeout_seconds
+        ),
+        event_hooks={"request": [_on_request]}
+    )
+
+
+@lru_cache(maxsize=1)
+def get_http_client():
+    """The OpenAI connection pool, built on first use"""
+    return new_http_client()
+
+
+@lru_cache(maxsize=1)
+def get_openai_client():
+    """Build the OpenAI client on first use and reuse it (and its connection pool)"""
+    from openai import OpenAI
+    return OpenAI(
+        api_key=settings.openai_api_key,
+        base_url=settings.openai_base_url,
+        http_client=get_http_client(),
+        timeout=settings.openai_timeout_seconds,
+        max_retries=settings.openai_max_retries
+    )
+
+
+def with_deadline(client, started_at: Optional[float]):
+    """
+    Bound a call by what is left of the query's budget
+
+    While the budget covers the full retry schedule the shared client is
+    returned as-is; otherwise one attempt with the remaining time (at least
+    openai_min_timeout_seconds) is allowed.
+
+    Args:
+        client: OpenAI (or Anthropic) client
+        started_at: time.perf_counter() when the query started (None = no budget)
+
+    Returns:
+        The client, or a copy with a shorter timeout and no retries
+    """
+    if started_at is None:
+        return client
+    remaining = settings.request_budget_seconds - (time.perf_counter() - started_at)
+    if remaining >= settings.openai_timeout_seconds * (settings.openai_max_retries + 1):
+        return client
+    metrics.increment("openai.deadline_limited")
+    return client.with_options(timeout=max(settings.openai_min_timeout_seconds, remaining), max_retries=0)
+
+
+def _is_upstream_failure(error: Exception) -> bool:
+    """Connection errors, timeouts and 5xx responses count against the circuit"""
+    import openai
+    return isinstance(error, (openai.APIConnectionError, openai.InternalServerError))
+
+
+def guarded(operation: str, fn: Callable[[], Any]) -> Any:
+    """
+    Make one OpenAI call through the circuit breaker
+
+    Args:
+        operation: Name used for metrics ('chat', 'embeddings')
+        fn: Zero-argument function making the call
+
+    Returns:
+        fn's result
+    """
+    openai_circuit.before_call()
+    start = time.perf_counter()
+    try:
+        result = fn()
+    except Exception as e:
+        failure = _is_upstream_failure(e)
+        openai_circuit.record(success=not failure)
+        if failure:
+            metrics.increment(f"openai.{operation}.failures")
+        raise
+    openai_circuit.record(success=True)
+    metrics.observe(f"openai.{operation}_ms", (time.perf_counter() - start) * 1000)
+    return result
+
+
+@lru_cache(maxsize=1)
+def _hedge_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=_pool_size(), thread_name_prefix="openai-hedge")
+
+
+def hedged(operation: str, fn: Callable[[], Any]) -> Any:
+    """
+    Make an idempotent call, hedging it once it runs past its recent p95
+
+    Until openai_hedge_min_samples calls have been timed this is a plain
+    guarded() call. After that, if the call has not returned within the
+    operation's p95, an identical second call is started and whichever
+    succeeds first wins.
+
+    Args:
+        operation: Name used for metrics and the p95 lookup
+        fn: Zero-argument function making the call
+
+    Returns:
+        fn's result
+    """
+    delay_ms = metrics.percentile(f"openai.{operation}_ms", 0.95, settings.openai_hedge_min_samples)
+    if not settings.openai_hedge_embeddings or delay_ms is None:
+        return guarded(operation, fn)
+
+    executor = _hedge_executor()
+    first = executor.submit(guarded, operation, fn)
+    try:
+        return first.result(timeout=delay_ms / 1000)
+    except FutureTimeout:
+        pass
+
+    metrics.increment(f"openai.{operation}.hedged")
+    second = executor.submit(guarded, operation, fn)
+    pending = {first, second}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is second:
+                    metrics.increment(f"openai.{operation}.hedge_wins")
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def transport_status() -> Dict[str, Any]:
+    """Connection reuse and circuit state for the metrics endpoint"""
+    counters = metrics.snapshot()["counters"]
+    requests = counters.get("openai.http.requests", 0)
+    opened = counters.get("openai.http.connections_opened", 0)
+    return {
+        "pool_size": _pool_size(),
+        "http2": settings.openai_http2 and HTTP2_AVAILABLE,
+        "requests": requests,
+        "connections_opened": opened,
+        "connection_reuse_ratio": round(1 - opened / requests, 3) if requests else None,
+        "circuit": openai_circuit.status()
+    }
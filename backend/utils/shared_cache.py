@@ -0,0 +1,173 @@
+"""
+Two-tier cache shared by all workers: per-process LRU in front of Postgres
+"""
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Optional, Tuple
+import psycopg2
+from psycopg2.extras import Json
+from config import settings
+from utils.logger import logger
+from utils.metrics import metrics
+
+
+class SharedCache:
+    """
+    Cache values (embeddings, answers) across worker processes
+
+    Reads hit the in-process LRU first, then the shared_cache table. The
+    local tier has a short TTL so invalidations made by another worker
+    (e.g. after ingestion) propagate quickly. Database errors are logged and
+    the cache degrades to local-only rather than failing the request.
+
+    The lock only guards the local tier; each thread talks to the shared
+    tier on its own autocommit connection, with shared_cache_timeout_ms as
+    statement timeout, so a slow database never holds up local hits.
+    """
+
+    def __init__(self):
+        self.enabled = settings.shared_cache_enabled
+        self.local_size = settings.local_cache_size
+        self.local_ttl = settings.local_cache_ttl_seconds
+        self._local: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._connections = threading.local()
+
+    @contextmanager
+    def _cursor(self, maintenance: bool = False):
+        """
+        Cursor on this thread's shared-tier connection (reconnects once it is closed)
+
+        Args:
+            maintenance: Lift the statement timeout (namespace clears and purges)
+        """
+        connection = getattr(self._connections, "connection", None)
+        if connection is None or connection.closed:
+            connection = psycopg2.connect(
+                settings.database_url,
+                connect_timeout=2,
+                options=f"-c statement_timeout={settings.shared_cache_timeout_ms}"
+            )
+            connection.autocommit = True
+            self._connections.connection = connection
+
+        with connection.cursor() as cursor:
+            if not maintenance:
+                yield cursor
+                return
+            cursor.execute("SET statement_timeout = 0")
+            try:
+                yield cursor
+            finally:
+                cursor.execute("RESET statement_timeout")
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """
+        Get a cached value
+
+        Args:
+            namespace: Cache namespace (e.g. 'embedding', 'answer')
+            key: Cache key within the namespace
+
+        Returns:
+            Cached value, or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._local.get((namespace, key))
+            if entry and entry[0] > now:
+                self._local.move_to_end((namespace, key))
+                metrics.increment(f"cache.{namespace}.local_hits")
+                return entry[1]
+
+        if not self.enabled:
+            metrics.increment(f"cache.{namespace}.misses")
+            return None
+
+        try:
+            with self._cursor() as cursor:
+                cursor.execute(
+                    """
+                    SELECT value, EXTRACT(EPOCH FROM expires_at - NOW())
+                    FROM shared_cache
+                    WHERE namespace = %s AND key = %s AND expires_at > NOW()
+                    """,
+                    (namespace, key)
+                )
+                row = cursor.fetchone()
+        except Exception as e:
+            logger.warning(f"Shared cache read failed: {e}")
+            row = None
+
+        if row is None:
+            metrics.increment(f"cache.{namespace}.misses")
+            return None
+
+        value, remaining_seconds = row
+        self._set_local(namespace, key, value, now + min(float(remaining_seconds), self.local_ttl))
+        metrics.increment(f"cache.{namespace}.shared_hits")
+        return value
+
+    def set(self, namespace: str, key: str, value: Any, ttl_seconds: int):
+        """Store a JSON-serializable value in both tiers"""
+        now = time.time()
+        self._set_local(namespace, key, value, now + min(ttl_seconds, self.local_ttl))
+
+        if not self.enabled:
+            return
+
+        try:
+            with self._cursor() as cursor:
+                cursor.execute(
+                    """
+                    INSERT INTO shared_cache (namespace, key, value, expires_at)
+                    VALUES (%s, %s, %s, NOW() + make_interval(secs => %s))
+                    ON CONFLICT (namespace, key) DO UPDATE
+                    SET value = EXCLUDED.value, expires_at = EXCLUDED.expires_at
+                    """,
+                    (namespace, key, Json(value), ttl_seconds)
+                )
+        except Exception as e:
+            logger.warning(f"Shared cache write failed: {e}")
+
+    def clear(self, namespace: str):
+        """Drop every entry in a namespace (all workers, after their local TTL)"""
+        with self._lock:
+            for cache_key in [k for k in self._local if k[0] == namespace]:
+                del self._local[cache_key]
+
+        if not self.enabled:
+            return
+
+        try:
+            with self._cursor(maintenance=True) as cursor:
+                cursor.execute("DELETE FROM shared_cache WHERE namespace = %s", (namespace,))
+            logger.info(f"Cleared shared cache namespace: {namespace}")
+        except Exception as e:
+            logger.warning(f"Shared cache clear failed: {e}")
+
+    def purge_expired(self) -> int:
+        """Delete expired rows from the shared tier; returns the number deleted"""
+        if not self.enabled:
+            return 0
+
+        try:
+            with self._cursor(maintenance=True) as cursor:
+                cursor.execute("DELETE FROM shared_cache WHERE expires_at <= NOW()")
+                return cursor.rowcount
+        except Exception as e:
+            logger.warning(f"Shared cache purge failed: {e}")
+            return 0
+
+    def _set_local(self, namespace: str, key: str, value: Any, expires_at: float):
+        with self._lock:
+            self._local[(namespace, key)] = (expires_at, value)
+            self._local.move_to_end((namespace, key))
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+
+# Process-wide cache instance
+shared_cache = SharedCache()
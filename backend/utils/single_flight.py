@@ -0,0 +1,161 @@
+"""
+Single-flight request coalescing: concurrent identical requests share one computation
+"""
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+from utils.logger import logger
+from utils.metrics import metrics
+
+
+class _Call:
+    """One in-flight computation and the result it will publish"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Run a function once per key while callers with the same key are in flight
+
+    The first caller (the leader) runs the function; callers arriving before
+    it finishes block and receive the same result or exception. Nothing is
+    cached: the key is released as soon as the leader finishes.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn for key, or wait for the in-flight run
+
+        Args:
+            key: Coalescing key (e.g. hash of the normalized question)
+            fn: Zero-argument function computing the result
+
+        Returns:
+            (result, shared) where shared is True if another caller computed it
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if not leader:
+            metrics.increment(f"coalesce.{self.name}.coalesced")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        metrics.increment(f"coalesce.{self.name}.leaders")
+        try:
+            call.result = fn()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            if call.waiters:
+                logger.info(f"Shared one {self.name} computation with {call.waiters} coalesced requests")
+            call.done.set()
+
+
+class _Broadcast:
+    """Events produced by one stream, replayed to every subscriber"""
+
+    def __init__(self):
+        self.events: List[Any] = []
+        self.finished = False
+        self.error: BaseException = None
+        self.condition = threading.Condition()
+
+    def subscribe(self) -> Iterator[Any]:
+        index = 0
+        while True:
+            with self.condition:
+                while index >= len(self.events) and not self.finished:
+                    self.condition.wait()
+                pending = self.events[index:]
+                finished = self.finished
+            for event in pending:
+                yield event
+            index += len(pending)
+            if finished and index >= len(self.events):
+                if self.error is not None:
+                    raise self.error
+                return
+
+
+class StreamFlight:
+    """
+    Share one streaming computation between concurrent identical requests
+
+    The producer runs on its own thread so it keeps going (and can fill the
+    answer cache) even if the client that started it disconnects. Every
+    subscriber, including the first, replays the events produced so far and
+    then follows the live stream.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._streams: Dict[str, _Broadcast] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, key: str, fn: Callable[[], Iterator[Any]]) -> Tuple[Iterator[Any], bool]:
+        """
+        Follow the in-flight stream for key, starting it if needed
+
+        Args:
+            key: Coalescing key
+            fn: Zero-argument function returning the event iterator
+
+        Returns:
+            (iterator over the stream's events, shared) where shared is True
+            if another caller started the stream
+        """
+        with self._lock:
+            broadcast = self._streams.get(key)
+            leader = broadcast is None
+            if leader:
+                broadcast = self._streams[key] = _Broadcast()
+
+        if leader:
+            metrics.increment(f"coalesce.{self.name}.leaders")
+            threading.Thread(
+                target=self._produce,
+                args=(key, broadcast, fn),
+                name=f"{self.name}-stream",
+                daemon=True
+            ).start()
+        else:
+            metrics.increment(f"coalesce.{self.name}.coalesced")
+
+        return broadcast.subscribe(), not leader
+
+    def _produce(self, key: str, broadcast: _Broadcast, fn: Callable[[], Iterator[Any]]):
+        try:
+            for event in fn():
+                with broadcast.condition:
+                    broadcast.events.append(event)
+                    broadcast.condition.notify_all()
+        except BaseException as e:
+            logger.error(f"Shared {self.name} stream failed: {e}")
+            broadcast.error = e
+        finally:
+            with self._lock:
+                del self._streams[key]
+            with broadcast.condition:
+                broadcast.finished = True
+                broadcast.condition.notify_all()
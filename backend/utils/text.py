@@ -0,0 +1,15 @@
+"""
+Text normalization helpers
+"""
+import hashlib
+import re
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    return re.sub(r"\s+", " ", question).strip().lower().rstrip("?!. ")
+
+
+def cache_key(*parts: str) -> str:
+    """Stable SHA-256 key for a tuple of strings"""
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
@@ -0,0 +1,76 @@
+"""
+Token counting helpers (tiktoken with a character-based fallback)
+"""
+import importlib.util
+from bisect import bisect_left
+from functools import lru_cache
+from itertools import accumulate
+from typing import Optional
+from config import settings
+
+# tiktoken is imported on first use; checking for it here is cheap
+TIKTOKEN_AVAILABLE = importlib.util.find_spec("tiktoken") is not None
+
+
+@lru_cache(maxsize=8)
+def get_encoding(model: str):
+    """Get (and cache) the tiktoken encoding for a model"""
+    import tiktoken
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """
+    Count tokens in text
+
+    Args:
+        text: Text to measure
+        model: Model whose tokenizer to use (defaults to settings.llm_model)
+
+    Returns:
+        Token count (approximately len/4 if tiktoken is not installed)
+    """
+    if not TIKTOKEN_AVAILABLE:
+        return len(text) // 4 + 1
+    return len(get_encoding(model or settings.llm_model).encode(text))
+
+
+class DocumentTokens:
+    """
+    Token counts for pieces of one document, from a single encoding pass
+
+    The document is encoded once and the byte offset where each token starts
+    is kept. A piece found in the document is counted as the tokens starting
+    inside its span; pieces are looked up from the last match onwards, so
+    counting them in reading order stays linear. Text that is not a
+    substring of the document (e.g. re-joined words) is encoded on its own.
+    """
+
+    def __init__(self, text: str, model: Optional[str] = None):
+        self.model = model
+        self.data = text.encode("utf-8")
+        self.cursor = 0
+        self.starts = None
+        if TIKTOKEN_AVAILABLE:
+            encoding = get_encoding(model or settings.llm_model)
+            lengths = map(len, encoding.decode_tokens_bytes(encoding.encode(text)))
+            self.starts = list(accumulate(lengths, initial=0))[:-1]
+
+    def count(self, text: str) -> int:
+        """Token count of a piece of the document (count_tokens for anything else)"""
+        if self.starts is None or not text:
+            return count_tokens(text, self.model)
+
+        needle = text.encode("utf-8")
+        position = self.data.find(needle, self.cursor)
+        if position < 0:
+            position = self.data.find(needle)
+        if position < 0:
+            return count_tokens(text, self.model)
+
+        self.cursor = position
+        tokens = bisect_left(self.starts, position + len(needle)) - bisect_left(self.starts, position)
+        return max(1, tokens)
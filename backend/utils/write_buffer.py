@@ -0,0 +1,220 @@
+"""
+Write-behind buffer for feedback and query logs, flushed in batches off the request path
+"""
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Tuple
+import psycopg2
+from psycopg2.extras import execute_values
+from config import settings
+from utils.logger import logger
+from utils.metrics import metrics
+
+
+# Columns written per table; rows are enqueued as dicts with these keys
+TABLE_COLUMNS = {
+    "feedback": ("query", "answer", "helpful", "comment", "sources", "user_id", "created_at"),
+    "query_logs": (
+        "query", "retrieved_docs", "response_time_ms", "llm_tokens_used", "doc_types", "user_id", "created_at"
+    ),
+}
+
+
+def utc_now() -> datetime:
+    """created_at for buffered rows: naive UTC, like the tables' TIMESTAMP columns"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class WriteBehindBuffer:
+    """
+    Buffer analytics rows in memory and insert them in batches
+
+    enqueue() only appends to an in-memory deque, so requests never wait on
+    the database. A background thread flushes once batch_size rows are
+    pending or flush_interval has passed, with one multi-row INSERT per
+    table. When the database is slow or down, failed batches are kept and
+    retried with exponential backoff. After max_batch_attempts failures a
+    batch is written row by row: rows the database rejects are logged and
+    dropped so they cannot block the queue, while a connection error keeps
+    the remaining rows for the next retry. Once max_pending rows are
+    buffered, new rows are dropped (and counted) rather than growing memory
+    or blocking requests.
+    """
+
+    def __init__(self):
+        self.batch_size = max(1, settings.write_buffer_batch_size)
+        self.flush_interval = settings.write_buffer_flush_interval_seconds
+        self.max_pending = settings.write_buffer_max_pending
+        self.max_batch_attempts = max(1, settings.write_buffer_max_batch_attempts)
+        self._pending: Deque[Tuple[str, Dict[str, Any]]] = deque()
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._stop_event = threading.Event()  # interrupts the retry backoff
+        self._thread = None
+        self._connection = None
+        self._backoff = 0.0
+        self._failed_attempts = 0  # consecutive failed flushes of the batch at the front
+
+    def _get_connection(self):
+        if self._connection is None or self._connection.closed:
+            self._connection = psycopg2.connect(settings.database_url)
+        return self._connection
+
+    def enqueue(self, table: str, row: Dict[str, Any]) -> bool:
+        """
+        Queue a row for insertion
+
+        Args:
+            table: Target table (a key of TABLE_COLUMNS)
+            row: Column values; missing columns are inserted as NULL
+
+        Returns:
+            False if the buffer is full and the row was dropped
+        """
+        if table not in TABLE_COLUMNS:
+            raise ValueError(f"Unknown buffered table: {table}")
+
+        with self._condition:
+            if len(self._pending) >= self.max_pending:
+                metrics.increment(f"write_buffer.{table}.dropped")
+                return False
+            self._pending.append((table, row))
+            if len(self._pending) == self.batch_size:
+                self._condition.notify()
+            if self._thread is None:
+                self._start()
+
+        metrics.increment(f"write_buffer.{table}.enqueued")
+        return True
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name="write-buffer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._stopping and len(self._pending) < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+                if self._stopping and not self._pending:
+                    return
+                batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+
+            if batch and not self._flush(batch):
+                self._failed_attempts += 1
+                if self._failed_attempts >= self.max_batch_attempts:
+                    batch = self._flush_rows(batch)
+            else:
+                batch = []
+
+            if batch:
+                with self._condition:
+                    # Keep the failed rows at the front, in order, and slow down
+                    self._pending.extendleft(reversed(batch))
+                    if self._stopping:
+                        return
+                self._backoff = min(max(self._backoff * 2, 0.5), 30.0)
+                self._stop_event.wait(self._backoff)
+
+    def _insert(self, batch: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, int]:
+        """Insert rows with a multi-row INSERT per table and commit; rolls back and raises on failure"""
+        by_table: Dict[str, List[tuple]] = {}
+        for table, row in batch:
+            by_table.setdefault(table, []).append(tuple(row.get(column) for column in TABLE_COLUMNS[table]))
+
+        try:
+            connection = self._get_connection()
+            with connection.cursor() as cursor:
+                for table, rows in by_table.items():
+                    execute_values(
+                        cursor,
+                        f"INSERT INTO {table} ({', '.join(TABLE_COLUMNS[table])}) VALUES %s",
+                        rows,
+                        page_size=self.batch_size
+                    )
+            connection.commit()
+        except Exception:
+            if self._connection is not None and not self._connection.closed:
+                try:
+                    self._connection.rollback()
+                except Exception:
+                    self._connection.close()
+            raise
+
+        return {table: len(rows) for table, rows in by_table.items()}
+
+    def _written(self, counts: Dict[str, int]):
+        """The queue moved again: reset the retry state and count the rows"""
+        self._backoff = 0.0
+        self._failed_attempts = 0
+        for table, count in counts.items():
+            metrics.increment(f"write_buffer.{table}.written", count)
+
+    def _flush(self, batch: List[Tuple[str, Dict[str, Any]]]) -> bool:
+        """Insert one batch; returns False on failure"""
+        start = time.perf_counter()
+        try:
+            counts = self._insert(batch)
+        except Exception as e:
+            logger.error(f"Write buffer flush of {len(batch)} rows failed: {e}")
+            metrics.increment("write_buffer.flush_errors")
+            return False
+
+        metrics.observe("write_buffer.flush_ms", (time.perf_counter() - start) * 1000)
+        self._written(counts)
+        return True
+
+    def _flush_rows(self, batch: List[Tuple[str, Dict[str, Any]]]) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Insert a repeatedly failing batch one row at a time
+
+        Rows the database rejects are logged and dropped. A connection error
+        means the database, not the row, is at fault, so writing stops there.
+
+        Returns:
+            Rows still to be written (from the first connection error on)
+        """
+        for i, (table, row) in enumerate(batch):
+            try:
+                self._written(self._insert([(table, row)]))
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                logger.error(f"Write buffer lost the database connection: {e}")
+                return batch[i:]
+            except Exception as e:
+                logger.error(f"Dropping {table} row rejected by the database: {e}; row={row!r}")
+                metrics.increment(f"write_buffer.{table}.rejected")
+
+        self._backoff = 0.0
+        self._failed_attempts = 0
+        return []
+
+    def stop(self, timeout: float = 10.0):
+        """Flush everything still buffered and stop the writer thread (shutdown hook)"""
+        with self._condition:
+            self._stopping = True
+            self._stop_event.set()
+            self._condition.notify()
+            thread = self._thread
+
+        if thread is not None:
+            thread.join(timeout=timeout)
+
+        remaining = len(self._pending)
+        if remaining:
+            logger.warning(f"Write buffer stopped with {remaining} unwritten rows")
+        if self._connection is not None and not self._connection.closed:
+            self._connection.close()
+
+    def status(self) -> Dict[str, Any]:
+        """Rows waiting to be written and the current retry state"""
+        return {
+            "pending": len(self._pending),
+            "backoff_seconds": self._backoff,
+            "failed_attempts": self._failed_attempts
+        }
+
+
+# Process-wide buffer
+write_buffer = WriteBehindBuffer()
@@ -1,12 +1,87 @@
 """
 PostgreSQL + pgvector integration for vector storage and retrieval
 """
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
 import psycopg2
 from psycopg2.extras import Json, execute_batch
-from typing import List, Dict, Any, Optional
+from psycopg2.pool import ThreadedConnectionPool
+from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 from config import settings
 from utils.logger import logger
+from utils.metrics import metrics
+
+
+# First-pass search modes supported by pgvector >= 0.7
+QUANTIZATION_MODES = {"none", "halfvec", "binary"}
+
+# Models trained with Matryoshka representation learning, whose embeddings
+# can be truncated to a prefix without re-embedding
+MATRYOSHKA_MODELS = {"text-embedding-3-small", "text-embedding-3-large"}
+
+# pgvector rejects hnsw.ef_search values above this
+MAX_EF_SEARCH = 1000
+
+# Columns read by similarity search; the metadata JSONB is never returned whole
+SEARCH_COLUMNS = (
+    "id, content, metadata->>'source' as source, metadata->>'type' as doc_type, "
+    "(metadata->>'chunk_index')::int as chunk_index"
+)
+
+INSERT_PARENT_QUERY = """
+    INSERT INTO document_parents (source, parent_index, content, metadata)
+    VALUES (%s, %s, %s, %s)
+    ON CONFLICT (source, parent_index) DO UPDATE
+    SET content = EXCLUDED.content, metadata = EXCLUDED.metadata
+"""
+
+# Collection (document type) names usable in per-collection index names
+COLLECTION_NAME = re.compile(r"^[a-z0-9_]+$")
+
+
+def configured_collections() -> List[str]:
+    """Collections searched separately when retrieval fan-out is enabled"""
+    return [c.strip() for c in settings.retrieval_collections.split(",") if c.strip()]
+
+
+# Advisory lock keys shared by all worker processes
+INGESTION_LOCK_KEY = 72_001
+WATCHER_LOCK_KEY = 72_002
+ANALYTICS_LOCK_KEY = 72_003
+
+
+def wait_for_database(timeout: float = None) -> float:
+    """
+    Poll until the database accepts connections, with exponential backoff
+
+    Args:
+        timeout: Maximum seconds to wait (defaults to settings.db_wait_timeout_seconds)
+
+    Returns:
+        Seconds waited
+
+    Raises:
+        TimeoutError: If the database is still unreachable after the timeout
+    """
+    timeout = settings.db_wait_timeout_seconds if timeout is None else timeout
+    start = time.monotonic()
+    delay = 0.1
+
+    while True:
+        try:
+            psycopg2.connect(settings.database_url, connect_timeout=5).close()
+            return time.monotonic() - start
+        except psycopg2.OperationalError as e:
+            elapsed = time.monotonic() - start
+            if elapsed + delay > timeout:
+                raise TimeoutError(f"Database not ready after {elapsed:.1f}s: {e}")
+            logger.info(f"Database not ready, retrying in {delay:.1f}s")
+            time.sleep(delay)
+            delay = min(delay * 2, 2.0)
 
 
 @dataclass
@@ -18,13 +93,98 @@ class Document:
     id: Optional[int] = None
 
 
+class RetrievedChunk:
+    """
+    One search hit, carrying only the columns the RAG graph needs
+
+    Instances use __slots__ (no per-object __dict__) and flow through every
+    graph node as-is: re-ranking sets rerank_score in place rather than
+    copying, and context text is only built when the LLM prompt is.
+    """
+
+    __slots__ = ("id", "content", "source", "doc_type", "chunk_index", "similarity", "boost", "rerank_score")
+
+    def __init__(
+        self,
+        id: int,
+        content: str,
+        source: Optional[str],
+        doc_type: Optional[str],
+        chunk_index: Optional[int] = None,
+        similarity: float = 0.0,
+        boost: float = 0.0,
+        rerank_score: Optional[float] = None
+    ):
+        self.id = id
+        self.content = content
+        self.source = source
+        self.doc_type = doc_type
+        self.chunk_index = chunk_index
+        self.similarity = similarity
+        self.boost = boost
+        self.rerank_score = rerank_score
+
+    def with_content(self, content: str) -> "RetrievedChunk":
+        """Copy of this hit carrying different text (e.g. its parent section)"""
+        copy = RetrievedChunk(**self.to_dict())
+        copy.content = content
+        return copy
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable form (stored with conversation sessions)"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RetrievedChunk":
+        """Rebuild from to_dict() output, or from the older content/metadata dicts"""
+        if "metadata" in data:
+            metadata = data["metadata"]
+            return cls(
+                id=metadata.get("document_id"),
+                content=data["content"],
+                source=metadata.get("source"),
+                doc_type=metadata.get("type"),
+                chunk_index=metadata.get("chunk_index"),
+                similarity=data.get("similarity", 0.0)
+            )
+        return cls(**{name: data.get(name) for name in cls.__slots__ if name in data})
+
+
 class PgVectorStore:
     """PostgreSQL + pgvector storage for document embeddings"""
 
     def __init__(self):
         self.connection = None
+        self.quantization = settings.vector_quantization
+        self.search_dimensions = self._resolve_search_dimensions()
+        self.rerank_multiplier = max(1, settings.quantization_rerank_multiplier)
+        # Feedback boosts re-order this many times top_k vector candidates
+        self.boosts_enabled = settings.feedback_boosts_enabled
+        self.boost_multiplier = max(1, settings.feedback_boost_candidates)
+        # Per-collection fan-out searches run on their own pooled connections;
+        # created up front so concurrent first requests cannot race to build them
+        self._search_pool: Optional[ThreadedConnectionPool] = None
+        self._search_executor: Optional[ThreadPoolExecutor] = None
+        if settings.retrieval_fanout_enabled:
+            fanout_size = max(1, settings.retrieval_fanout_pool_size)
+            self._search_pool = ThreadedConnectionPool(0, fanout_size, settings.database_url)
+            self._search_executor = ThreadPoolExecutor(max_workers=fanout_size, thread_name_prefix="fanout")
+
+        if self.quantization not in QUANTIZATION_MODES:
+            logger.warning(
+                f"Unknown vector_quantization '{self.quantization}', "
+                f"falling back to full precision"
+            )
+            self.quantization = "none"
+
         self._connect()
 
+        # Query-time work runs on many request threads; each borrows a pooled
+        # connection (opened on demand) instead of sharing self.connection
+        read_pool_size = settings.database_read_pool_size or settings.max_in_flight_queries + 2
+        self._read_pool = ThreadedConnectionPool(0, read_pool_size, settings.database_url)
+        self._read_slots = threading.BoundedSemaphore(read_pool_size)
+
     def _connect(self):
         """Establish database connection"""
         try:
@@ -34,12 +194,213 @@ class PgVectorStore:
             logger.error(f"Failed to connect to database: {e}")
             raise
 
-    def add_documents(self, documents: List[Document]) -> List[int]:
+    @contextmanager
+    def pooled_connection(self):
+        """
+        Borrow a pooled connection, waiting while all are in use
+
+        Used for query-time reads here and by request handlers (sessions,
+        analytics) that must not share self.connection across threads. The
+        transaction is rolled back on return, so a failed query never leaves
+        the connection aborted and none sits idle in transaction; writers
+        commit before returning it.
+        """
+        with self._read_slots:
+            connection = self._read_pool.getconn()
+            try:
+                yield connection
+            finally:
+                try:
+                    connection.rollback()
+                except Exception:
+                    connection.close()
+                self._read_pool.putconn(connection, close=bool(connection.closed))
+
+    def _resolve_search_dimensions(self) -> Optional[int]:
+        """Validate the Matryoshka truncation setting against the embedding model"""
+        dims = settings.vector_search_dimensions
+        if not dims or dims >= settings.embedding_dimension:
+            return None
+
+        if settings.embedding_model not in MATRYOSHKA_MODELS:
+            logger.warning(
+                f"Embedding model {settings.embedding_model} does not support "
+                f"Matryoshka truncation, searching all {settings.embedding_dimension} dimensions"
+            )
+            return None
+
+        return dims
+
+    @property
+    def uses_quantized_search(self) -> bool:
+        """True when similarity search runs a reduced-precision first pass"""
+        return self.quantization != "none" or self.search_dimensions is not None
+
+    def _first_pass_expression(self, operand: str) -> str:
+        """
+        Build the reduced-precision SQL expression for a vector operand
+
+        The same expression is used for the index definition and for both
+        sides of the ORDER BY, so the planner can match the expression index.
+
+        Args:
+            operand: SQL vector expression (column name or placeholder)
+
+        Returns:
+            SQL expression string
+        """
+        dims = self.search_dimensions or settings.embedding_dimension
+        if self.search_dimensions:
+            operand = f"subvector({operand}, 1, {dims})"
+
+        if self.quantization == "binary":
+            return f"binary_quantize({operand})::bit({dims})"
+        if self.quantization == "halfvec":
+            return f"({operand})::halfvec({dims})"
+        return f"({operand})::vector({dims})"
+
+    def _boosted(self, ranked_query: str) -> str:
+        """
+        Wrap a ranked candidate query so feedback boosts re-order it in SQL
+
+        Candidates keep their vector similarity; they are ordered by
+        similarity + boost, where the boost comes from the chunk's own
+        row in retrieval_boosts or, failing that, its source's row
+        (chunk_index -1). The wrapped query takes top_k as its last parameter.
+
+        Args:
+            ranked_query: Query returning SEARCH_COLUMNS and similarity
+
+        Returns:
+            Query returning the same columns plus boost
+        """
+        return f"""
+            WITH ranked AS ({ranked_query})
+            SELECT
+                r.id,
+                r.content,
+                r.source,
+                r.doc_type,
+                r.chunk_index,
+                r.similarity,
+                COALESCE(chunk.boost, source.boost, 0) as boost
+            FROM ranked r
+            LEFT JOIN retrieval_boosts chunk
+                ON chunk.source = r.source
+                AND chunk.chunk_index = COALESCE(r.chunk_index, -2)
+            LEFT JOIN retrieval_boosts source
+                ON source.source = r.source
+                AND source.chunk_index = -1
+            ORDER BY r.similarity + COALESCE(chunk.boost, source.boost, 0) DESC
+            LIMIT %s
+        """
+
+    def _first_pass_operator(self) -> str:
+        """Distance operator for the first pass (Hamming for binary, cosine otherwise)"""
+        return "<~>" if self.quantization == "binary" else "<=>"
+
+    def _first_pass_opclass(self) -> str:
+        """HNSW operator class matching the first-pass expression and operator"""
+        if self.quantization == "binary":
+            return "bit_hamming_ops"
+        if self.quantization == "halfvec":
+            return "halfvec_cosine_ops"
+        return "vector_cosine_ops"
+
+    def quantized_index_name(self) -> str:
+        """Name of the expression index backing the current first-pass mode"""
+        dims = self.search_dimensions or settings.embedding_dimension
+        return f"documents_embedding_{self.quantization}_{dims}_idx"
+
+    def ensure_quantized_index(self) -> Optional[str]:
+        """
+        Create the HNSW expression index for the configured first-pass mode
+
+        Full-precision search uses documents_embedding_idx from init.sql, so
+        nothing is created unless quantization or truncation is enabled.
+
+        Returns:
+            Index name, or None when quantized search is disabled
+        """
+        if not self.uses_quantized_search:
+            return None
+
+        index_name = self.quantized_index_name()
+        query = f"""
+            CREATE INDEX IF NOT EXISTS {index_name}
+            ON documents USING hnsw (({self._first_pass_expression("embedding")}) {self._first_pass_opclass()})
+        """
+
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(query)
+                self.connection.commit()
+                logger.info(f"Ensured quantized index {index_name}")
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f"Failed to create quantized index {index_name}: {e}")
+            raise
+
+        return index_name
+
+    def ensure_collection_indexes(self, collections: List[str]) -> List[str]:
+        """
+        Create one partial HNSW index per collection (document type)
+
+        A search filtered on metadata->>'type' walks its collection's own
+        graph, so a large collection cannot crowd a small one out of the
+        top-k the way it does with a filter applied after the shared index.
+        With quantized search the partial indexes are built on the same
+        reduced-precision expression as the first pass, since that pass is
+        the one ordered by the index.
+
+        Args:
+            collections: Document types to index
+
+        Returns:
+            Names of the ensured indexes
+        """
+        index_names = []
+        try:
+            with self.connection.cursor() as cursor:
+                for collection in collections:
+                    if not COLLECTION_NAME.match(collection):
+                        logger.warning(f"Skipping per-collection index for invalid name '{collection}'")
+                        continue
+                    if self.uses_quantized_search:
+                        index_name = self.quantized_index_name().replace("_idx", f"_{collection}_idx")
+                        indexed = f"({self._first_pass_expression('embedding')}) {self._first_pass_opclass()}"
+                    else:
+                        index_name = f"documents_embedding_{collection}_idx"
+                        indexed = "embedding vector_cosine_ops"
+                    cursor.execute(
+                        f"""
+                        CREATE INDEX IF NOT EXISTS {index_name}
+                        ON documents USING hnsw ({indexed})
+                        WHERE metadata->>'type' = '{collection}'
+                        """
+                    )
+                    index_names.append(index_name)
+                self.connection.commit()
+                logger.info(f"Ensured per-collection indexes: {', '.join(index_names)}")
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f"Failed to create per-collection indexes: {e}")
+            raise
+
+        return index_names
+
+    def add_documents(
+        self,
+        documents: List[Document],
+        parents: Optional[List[Dict[str, Any]]] = None
+    ) -> List[int]:
         """
         Insert multiple documents with embeddings into the database
 
         Args:
             documents: List of Document objects with embeddings
+            parents: Parent sections of the documents (small-to-big "section" mode)
 
         Returns:
             List of inserted document IDs
@@ -62,6 +423,8 @@ class PgVectorStore:
                         (doc.content, Json(doc.metadata), doc.embedding)
                     )
                     inserted_ids.append(cursor.fetchone()[0])
+                if parents:
+                    self._insert_parents(cursor, parents)
 
                 self.connection.commit()
                 logger.info(f"Inserted {len(inserted_ids)} documents into database")
@@ -73,31 +436,215 @@ class PgVectorStore:
 
         return inserted_ids
 
+    def replace_source_documents(
+        self,
+        source: str,
+        documents: List[Document],
+        parents: Optional[List[Dict[str, Any]]] = None
+    ) -> List[int]:
+        """
+        Atomically replace all chunks (and parent sections) of one source document
+
+        Args:
+            source: Source name (metadata->>'source')
+            documents: New chunks with embeddings
+            parents: New parent sections (small-to-big "section" mode)
+
+        Returns:
+            List of inserted document IDs
+        """
+        insert_query = """
+            INSERT INTO documents (content, metadata, embedding)
+            VALUES (%s, %s, %s)
+            RETURNING id
+        """
+
+        inserted_ids = []
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("DELETE FROM documents WHERE metadata->>'source' = %s", (source,))
+                deleted = cursor.rowcount
+                cursor.execute("DELETE FROM document_parents WHERE source = %s", (source,))
+                for doc in documents:
+                    cursor.execute(
+                        insert_query,
+                        (doc.content, Json(doc.metadata), doc.embedding)
+                    )
+                    inserted_ids.append(cursor.fetchone()[0])
+                if parents:
+                    self._insert_parents(cursor, parents)
+
+                self.connection.commit()
+                logger.info(f"Replaced {deleted} chunks of {source} with {len(inserted_ids)} chunks")
+
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f"Failed to replace chunks of {source}: {e}")
+            raise
+
+        return inserted_ids
+
+    def delete_source(self, source: str) -> int:
+        """Delete all chunks of one source document; returns the number deleted"""
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("DELETE FROM documents WHERE metadata->>'source' = %s", (source,))
+                deleted = cursor.rowcount
+                cursor.execute("DELETE FROM document_parents WHERE source = %s", (source,))
+                self.connection.commit()
+                logger.info(f"Deleted {deleted} chunks of {source}")
+                return deleted
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f"Failed to delete chunks of {source}: {e}")
+            raise
+
+    @staticmethod
+    def _insert_parents(cursor, parents: List[Dict[str, Any]]):
+        """Write parent sections on the caller's cursor (same transaction as the chunks)"""
+        execute_batch(
+            cursor,
+            INSERT_PARENT_QUERY,
+            [
+                (parent["source"], parent["parent_index"], parent["content"], Json(parent["metadata"]))
+                for parent in parents
+            ]
+        )
+
+    def get_parent_sections(self, chunk_ids: List[int]) -> Dict[int, Tuple[Tuple[str, int], str]]:
+        """
+        Look up the parent section of each chunk in one query
+
+        Args:
+            chunk_ids: documents.id of the hits
+
+        Returns:
+            Dict of chunk id -> ((source, parent_index), parent text)
+        """
+        if not chunk_ids:
+            return {}
+
+        query = """
+            SELECT d.id, p.source, p.parent_index, p.content
+            FROM documents d
+            JOIN document_parents p
+                ON p.source = d.metadata->>'source'
+                AND p.parent_index = (d.metadata->>'parent_index')::int
+            WHERE d.id = ANY(%s)
+        """
+
+        try:
+            with self.pooled_connection() as connection, connection.cursor() as cursor:
+                cursor.execute(query, (list(chunk_ids),))
+                return {row[0]: ((row[1], row[2]), row[3]) for row in cursor.fetchall()}
+        except Exception as e:
+            logger.error(f"Failed to load parent sections: {e}")
+            return {}
+
+    def get_chunk_windows(self, windows: List[Tuple[int, str, int, int]]) -> Dict[int, str]:
+        """
+        Concatenate neighbouring chunks around each hit in one query
+
+        Args:
+            windows: (hit chunk id, source, first chunk_index, last chunk_index)
+
+        Returns:
+            Dict of hit chunk id -> window text in chunk order
+        """
+        if not windows:
+            return {}
+
+        query = """
+            SELECT w.id, string_agg(d.content, E'\\n\\n' ORDER BY (d.metadata->>'chunk_index')::int)
+            FROM unnest(%s::int[], %s::text[], %s::int[], %s::int[]) AS w(id, source, first_index, last_index)
+            JOIN documents d
+                ON d.metadata->>'source' = w.source
+                AND (d.metadata->>'chunk_index')::int BETWEEN w.first_index AND w.last_index
+            GROUP BY w.id
+        """
+        ids, sources, firsts, lasts = (list(column) for column in zip(*windows))
+
+        try:
+            with self.pooled_connection() as connection, connection.cursor() as cursor:
+                cursor.execute(query, (ids, sources, firsts, lasts))
+                return dict(cursor.fetchall())
+        except Exception as e:
+            logger.error(f"Failed to load chunk windows: {e}")
+            return {}
+
+    def score_chunks(self, query_embedding: List[float], chunk_ids: List[int]) -> Dict[int, float]:
+        """
+        Exact cosine similarity of given chunks to a query vector
+
+        Args:
+            query_embedding: Query vector embedding
+            chunk_ids: documents.id of the chunks to score
+
+        Returns:
+            Dict of chunk id -> similarity (chunks deleted since retrieval are missing)
+        """
+        if not chunk_ids:
+            return {}
+
+        query = "SELECT id, 1 - (embedding <=> %s::vector) FROM documents WHERE id = ANY(%s)"
+
+        try:
+            with self.pooled_connection() as connection, connection.cursor() as cursor:
+                cursor.execute(query, (query_embedding, list(chunk_ids)))
+                return {row[0]: float(row[1]) for row in cursor.fetchall()}
+        except Exception as e:
+            logger.error(f"Failed to score chunks: {e}")
+            raise
+
     def similarity_search(
         self,
         query_embedding: List[float],
         top_k: int = 5,
         similarity_threshold: float = 0.2,
-        metadata_filter: Optional[Dict[str, Any]] = None
-    ) -> List[Document]:
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        connection=None
+    ) -> List[RetrievedChunk]:
         """
-        Search for similar documents using cosine similarity
+        Search for similar chunks using cosine similarity
+
+        With feedback boosts enabled, top_k * feedback_boost_candidates
+        nearest chunks are re-ordered by similarity + boost in the same query.
 
         Args:
             query_embedding: Query vector embedding
             top_k: Number of results to return
             similarity_threshold: Minimum similarity score (0-1)
             metadata_filter: Optional metadata filters
+            connection: Connection to run on (defaults to a pooled read connection)
 
         Returns:
-            List of similar Documents with similarity scores in metadata
+            List of RetrievedChunks, best first
         """
+        if connection is None:
+            with self.pooled_connection() as connection:
+                return self.similarity_search(
+                    query_embedding,
+                    top_k,
+                    similarity_threshold,
+                    metadata_filter,
+                    connection
+                )
+
+        if self.uses_quantized_search:
+            return self._quantized_similarity_search(
+                query_embedding,
+                top_k,
+                similarity_threshold,
+                metadata_filter,
+                connection
+            )
+
+        fetch_k = top_k * self.boost_multiplier if self.boosts_enabled else top_k
+
         # Base query
-        query = """
+        query = f"""
             SELECT
-                id,
-                content,
-                metadata,
+                {SEARCH_COLUMNS},
                 1 - (embedding <=> %s::vector) as similarity
             FROM documents
             WHERE 1 - (embedding <=> %s::vector) > %s
@@ -112,34 +659,311 @@ class PgVectorStore:
                 params.append(str(value))
 
         query += " ORDER BY embedding <=> %s::vector LIMIT %s"
-        params.extend([query_embedding, top_k])
+        params.extend([query_embedding, fetch_k])
+
+        if self.boosts_enabled:
+            query = self._boosted(query)
+            params.append(top_k)
 
         try:
-            with self.connection.cursor() as cursor:
+            with connection.cursor() as cursor:
                 cursor.execute(query, params)
-                results = cursor.fetchall()
+                chunks = self._rows_to_chunks(cursor.fetchall())
 
-                documents = []
-                for row in results:
-                    doc_id, content, metadata, similarity = row
-                    metadata['similarity'] = float(similarity)
-                    metadata['document_id'] = doc_id
+                logger.info(f"Found {len(chunks)} similar documents")
+                return chunks
 
-                    documents.append(
-                        Document(
-                            id=doc_id,
-                            content=content,
-                            metadata=metadata
-                        )
-                    )
+        except Exception as e:
+            logger.error(f"Similarity search failed: {e}")
+            raise
 
-                logger.info(f"Found {len(documents)} similar documents")
-                return documents
+    def _quantized_similarity_search(
+        self,
+        query_embedding: List[float],
+        top_k: int,
+        similarity_threshold: float,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        connection=None
+    ) -> List[RetrievedChunk]:
+        """
+        Two-phase search: reduced-precision candidates, exact re-ranking
+
+        The first pass walks the quantized/truncated HNSW index for
+        top_k * rerank_multiplier candidates; the second pass re-scores only
+        those candidates with full-precision cosine distance.
+
+        Args:
+            query_embedding: Query vector embedding
+            top_k: Number of results to return
+            similarity_threshold: Minimum full-precision similarity score
+            metadata_filter: Optional metadata filters
+            connection: Connection to run on
+
+        Returns:
+            List of RetrievedChunks, best first
+        """
+        fetch_k = top_k * self.boost_multiplier if self.boosts_enabled else top_k
+        candidate_limit = max(top_k * self.rerank_multiplier, fetch_k)
+
+        filters = ""
+        filter_params = []
+        if metadata_filter:
+            for key, value in metadata_filter.items():
+                filters += f" AND metadata->>'{key}' = %s"
+                filter_params.append(str(value))
+
+        query = f"""
+            WITH candidates AS (
+                SELECT id, content, metadata, embedding
+                FROM documents
+                WHERE TRUE{filters}
+                ORDER BY {self._first_pass_expression("embedding")}
+                    {self._first_pass_operator()} {self._first_pass_expression("%s::vector")}
+                LIMIT %s
+            )
+            SELECT
+                {SEARCH_COLUMNS},
+                1 - (embedding <=> %s::vector) as similarity
+            FROM candidates
+            WHERE 1 - (embedding <=> %s::vector) > %s
+            ORDER BY embedding <=> %s::vector
+            LIMIT %s
+        """
+
+        params = filter_params + [
+            query_embedding,
+            candidate_limit,
+            query_embedding,
+            query_embedding,
+            similarity_threshold,
+            query_embedding,
+            fetch_k
+        ]
+
+        if self.boosts_enabled:
+            query = self._boosted(query)
+            params.append(top_k)
+
+        try:
+            with connection.cursor() as cursor:
+                # The HNSW scan returns at most ef_search rows
+                cursor.execute(
+                    "SELECT set_config('hnsw.ef_search', %s, true)",
+                    (str(min(MAX_EF_SEARCH, max(40, candidate_limit))),)
+                )
+                cursor.execute(query, params)
+                chunks = self._rows_to_chunks(cursor.fetchall())
+
+                logger.info(
+                    f"Found {len(chunks)} similar documents "
+                    f"({self.quantization} first pass, {candidate_limit} candidates)"
+                )
+                return chunks
 
         except Exception as e:
-            logger.error(f"Similarity search failed: {e}")
+            logger.error(f"Quantized similarity search failed: {e}")
             raise
 
+    def fanout_similarity_search(
+        self,
+        query_embedding: List[float],
+        collections: List[str],
+        top_k: int,
+        similarity_threshold: float,
+        deadline_ms: float
+    ) -> Dict[str, List[RetrievedChunk]]:
+        """
+        Search each collection concurrently on pooled connections
+
+        Every collection gets its own top_k from its partial index. Searches
+        still running at the deadline are dropped from the result; the
+        server-side statement_timeout (set to the same deadline) aborts them
+        so their connections return to the pool promptly.
+
+        Args:
+            query_embedding: Query vector embedding
+            collections: Document types to search
+            top_k: Results per collection
+            similarity_threshold: Minimum similarity score (0-1)
+            deadline_ms: Time to wait for the slowest collection
+
+        Returns:
+            Dict of collection -> RetrievedChunks for the collections that finished
+        """
+        if self._search_executor is None:
+            raise RuntimeError("Fan-out search requires RETRIEVAL_FANOUT_ENABLED")
+
+        start = time.perf_counter()
+        futures = {
+            self._search_executor.submit(
+                self._collection_search,
+                collection,
+                query_embedding,
+                top_k,
+                similarity_threshold,
+                deadline_ms
+            ): collection
+            for collection in collections
+        }
+        done, not_done = wait(futures, timeout=deadline_ms / 1000)
+
+        results = {}
+        for future in done:
+            collection = futures[future]
+            try:
+                results[collection] = future.result()
+            except Exception as e:
+                metrics.increment(f"retrieval.fanout.{collection}.errors")
+                logger.warning(f"Search of collection {collection} failed: {e}")
+        for future in not_done:
+            future.cancel()
+            metrics.increment(f"retrieval.fanout.{futures[future]}.dropped")
+        if not_done:
+            logger.warning(
+                f"Dropped collections past the {deadline_ms:.0f}ms deadline: "
+                f"{', '.join(futures[future] for future in not_done)}"
+            )
+
+        metrics.observe("retrieval.fanout_ms", (time.perf_counter() - start) * 1000)
+        return results
+
+    def _collection_search(
+        self,
+        collection: str,
+        query_embedding: List[float],
+        top_k: int,
+        similarity_threshold: float,
+        deadline_ms: float
+    ) -> List[RetrievedChunk]:
+        """Search one collection on a pooled connection (runs on the fan-out executor)"""
+        start = time.perf_counter()
+        connection = self._search_pool.getconn()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT set_config('statement_timeout', %s, true)", (str(int(deadline_ms)),))
+            return self.similarity_search(
+                query_embedding,
+                top_k=top_k,
+                similarity_threshold=similarity_threshold,
+                metadata_filter={"type": collection},
+                connection=connection
+            )
+        finally:
+            try:
+                connection.rollback()
+            except Exception:
+                connection.close()
+            self._search_pool.putconn(connection, close=bool(connection.closed))
+            metrics.observe(f"retrieval.fanout.{collection}_ms", (time.perf_counter() - start) * 1000)
+
+    @staticmethod
+    def _rows_to_chunks(rows) -> List[RetrievedChunk]:
+        """Convert (SEARCH_COLUMNS..., similarity[, boost]) rows into RetrievedChunks"""
+        return [
+            RetrievedChunk(
+                row[0],
+                row[1],
+                row[2],
+                row[3],
+                row[4],
+                float(row[5]),
+                float(row[6]) if len(row) > 6 and row[6] else 0.0
+            )
+            for row in rows
+        ]
+
+    def keyword_search(self, text: str, limit: int = 3) -> List[Dict[str, Any]]:
+        """
+        Find source documents matching any query term via the full-text index
+
+        Uses the same to_tsvector('english', content) expression as
+        documents_content_idx; terms are OR-ed so partial matches still rank.
+
+        Args:
+            text: Free-text query
+            limit: Maximum number of source documents
+
+        Returns:
+            List of dicts with 'source', 'type' and 'relevance' (ts_rank)
+        """
+        query = """
+            SELECT
+                metadata->>'source' as source,
+                metadata->>'type' as doc_type,
+                MAX(ts_rank(to_tsvector('english', content), q)) as rank
+            FROM documents,
+                 replace(plainto_tsquery('english', %s)::text, '&', '|')::tsquery q
+            WHERE to_tsvector('english', content) @@ q
+            GROUP BY metadata->>'source', metadata->>'type'
+            ORDER BY rank DESC
+            LIMIT %s
+        """
+
+        try:
+            with self.pooled_connection() as connection, connection.cursor() as cursor:
+                cursor.execute(query, (text, limit))
+                return [
+                    {
+                        "source": source or "Unknown",
+                        "type": doc_type or "Unknown",
+                        "relevance": f"{rank:.2f}"
+                    }
+                    for source, doc_type, rank in cursor.fetchall()
+                ]
+        except Exception as e:
+            logger.error(f"Keyword search failed: {e}")
+            return []
+
+    def find_precomputed_answer(
+        self,
+        query_embedding: List[float],
+        min_similarity: float
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Nearest fresh precomputed answer to a query (HNSW on the cluster centroids)
+
+        Args:
+            query_embedding: Query embedding vector
+            min_similarity: Minimum cosine similarity to the cluster centroid
+
+        Returns:
+            Dict with id, question, answer, sources, similarity and
+            age_seconds, or None when no fresh answer is close enough
+        """
+        query = """
+            SELECT
+                id,
+                question,
+                answer,
+                sources,
+                1 - (embedding <=> %s::vector) as similarity,
+                EXTRACT(EPOCH FROM NOW() - generated_at)
+            FROM precomputed_answers
+            WHERE stale_since IS NULL AND answer IS NOT NULL
+            ORDER BY embedding <=> %s::vector
+            LIMIT 1
+        """
+
+        try:
+            with self.pooled_connection() as connection, connection.cursor() as cursor:
+                cursor.execute(query, (query_embedding, query_embedding))
+                row = cursor.fetchone()
+        except Exception as e:
+            logger.error(f"Precomputed answer lookup failed: {e}")
+            return None
+
+        if row is None or row[4] < min_similarity:
+            return None
+        answer_id, question, answer, sources, similarity, age_seconds = row
+        return {
+            "id": answer_id,
+            "question": question,
+            "answer": answer,
+            "sources": sources or [],
+            "similarity": similarity,
+            "age_seconds": float(age_seconds or 0)
+        }
+
     def get_chunks_by_source(self, source_name: str) -> List[Document]:
         """
         Get all chunks from a specific source document
@@ -193,48 +1017,39 @@ class PgVectorStore:
             return 0
 
     def get_stats(self) -> Dict[str, Any]:
-        """Get database statistics including unique source documents"""
+        """
+        Get database statistics including unique source documents
+
+        Reads the per-source counters in source_stats (kept current by
+        triggers on documents) in one query, so the cost depends on the
+        number of source files, not on the number of chunks.
+        """
         try:
             with self.connection.cursor() as cursor:
-                # Total chunks
-                cursor.execute("SELECT COUNT(*) FROM documents")
-                total_chunks = cursor.fetchone()[0]
-
-                # Unique source documents
-                cursor.execute("""
-                    SELECT COUNT(DISTINCT metadata->>'source')
-                    FROM documents
-                    WHERE metadata->>'source' IS NOT NULL
-                """)
-                unique_sources = cursor.fetchone()[0]
-
-                # Document types breakdown with both doc count and chunk count
                 cursor.execute("""
-                    SELECT
-                        metadata->>'type' as doc_type,
-                        COUNT(DISTINCT metadata->>'source') as doc_count,
-                        COUNT(*) as chunk_count
-                    FROM documents
-                    WHERE metadata->>'type' IS NOT NULL
-                    GROUP BY metadata->>'type'
+                    SELECT doc_type, COUNT(*) as doc_count, SUM(chunks) as chunk_count
+                    FROM source_stats
+                    GROUP BY doc_type
                     ORDER BY chunk_count DESC
                 """)
-                doc_types_raw = cursor.fetchall()
+                rows = cursor.fetchall()
+                self.connection.commit()
 
-                # Format as dict with both counts
-                doc_types = {}
-                for doc_type, doc_count, chunk_count in doc_types_raw:
+            doc_types = {}
+            for doc_type, doc_count, chunk_count in rows:
+                if doc_type is not None:
                     doc_types[doc_type] = {
                         "documents": doc_count,
-                        "chunks": chunk_count
+                        "chunks": int(chunk_count)
                     }
 
-                return {
-                    "total_chunks": total_chunks,
-                    "unique_documents": unique_sources,
-                    "document_types": doc_types
-                }
+            return {
+                "total_chunks": sum(int(row[2]) for row in rows),
+                "unique_documents": sum(row[1] for row in rows),
+                "document_types": doc_types
+            }
         except Exception as e:
+            self.connection.rollback()
             logger.error(f"Failed to get stats: {e}")
             return {
                 "total_chunks": 0,
@@ -248,6 +1063,7 @@ class PgVectorStore:
         try:
             with self.connection.cursor() as cursor:
                 cursor.execute(query)
+                cursor.execute("DELETE FROM document_parents")
                 self.connection.commit()
                 logger.warning("All documents deleted from database")
         except Exception as e:
@@ -255,8 +1071,92 @@ class PgVectorStore:
             logger.error(f"Failed to clear documents: {e}")
             raise
 
+    def acquire_lock(self, key: int, wait: bool = True) -> bool:
+        """
+        Take a session-level Postgres advisory lock
+
+        Args:
+            key: Advisory lock key
+            wait: Block until the lock is free (otherwise try once)
+
+        Returns:
+            True if the lock is held by this connection
+        """
+        function = "pg_advisory_lock" if wait else "pg_try_advisory_lock"
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"SELECT {function}(%s)", (key,))
+            acquired = cursor.fetchone()[0] is not False
+            self.connection.commit()
+            return acquired
+
+    def release_lock(self, key: int):
+        """Release a session-level advisory lock"""
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (key,))
+            self.connection.commit()
+
+    def last_ingestion_fingerprint(self) -> Optional[str]:
+        """Fingerprint of the most recent completed ingestion run"""
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("SELECT fingerprint FROM ingestion_runs ORDER BY id DESC LIMIT 1")
+                row = cursor.fetchone()
+                self.connection.commit()
+                return row[0] if row else None
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f"Failed to read ingestion runs: {e}")
+            return None
+
+    def record_ingestion_run(self, fingerprint: str, documents: int, chunks: int):
+        """Record a completed ingestion run"""
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    "INSERT INTO ingestion_runs (fingerprint, documents, chunks) VALUES (%s, %s, %s)",
+                    (fingerprint, documents, chunks)
+                )
+                self.connection.commit()
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f"Failed to record ingestion run: {e}")
+
+    def prewarm(self) -> Dict[str, int]:
+        """
+        Load the documents table and its vector indexes into shared_buffers
+
+        Returns:
+            Dict of relation name -> blocks loaded
+        """
+        query = """
+            SELECT indexname
+            FROM pg_indexes
+            WHERE tablename = 'documents' AND indexname LIKE 'documents_embedding%'
+        """
+
+        loaded = {}
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(query)
+                relations = [row[0] for row in cursor.fetchall()] + ["documents"]
+                for relation in relations:
+                    cursor.execute("SELECT pg_prewarm(%s::regclass)", (relation,))
+                    loaded[relation] = cursor.fetchone()[0]
+                self.connection.commit()
+                logger.info(f"Prewarmed {', '.join(f'{k} ({v} blocks)' for k, v in loaded.items())}")
+        except Exception as e:
+            self.connection.rollback()
+            logger.warning(f"pg_prewarm failed (is the extension installed?): {e}")
+
+        return loaded
+
     def close(self):
         """Close database connection"""
+        if self._search_executor:
+            self._search_executor.shutdown(wait=False)
+        if self._search_pool:
+            self._search_pool.closeall()
+        self._read_pool.closeall()
         if self.connection:
             self.connection.close()
             logger.info("Database connection closed")
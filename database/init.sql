@@ -1,11 +1,19 @@
 -- ============================================
 -- Skyro Knowledge Assistant Database Schema
 -- PostgreSQL + pgvector
+--
+-- Runs on first start of a fresh volume, and can be re-applied to upgrade an
+-- existing one (every statement is idempotent):
+--   docker-compose exec -T postgres psql -v ON_ERROR_STOP=1 \
+--       -U skyro -d skyro_knowledge < database/init.sql
 -- ============================================
 
 -- Enable pgvector extension
 CREATE EXTENSION IF NOT EXISTS vector;
 
+-- Used to load the HNSW index into shared_buffers before serving traffic
+CREATE EXTENSION IF NOT EXISTS pg_prewarm;
+
 -- ============================================
 -- Documents table with embeddings
 -- ============================================
@@ -23,6 +31,13 @@ CREATE TABLE IF NOT EXISTS documents (
 CREATE INDEX IF NOT EXISTS documents_embedding_idx
 ON documents USING hnsw (embedding vector_cosine_ops);
 
+-- Reduced-precision first-pass indexes (halfvec / binary quantization,
+-- optional Matryoshka truncation) are expression indexes created by
+-- PgVectorStore.ensure_quantized_index() when VECTOR_QUANTIZATION is set.
+-- Per-collection partial HNSW indexes (WHERE metadata->>'type' = ...) are
+-- created by PgVectorStore.ensure_collection_indexes() when
+-- RETRIEVAL_FANOUT_ENABLED is set.
+
 -- Create GIN index for JSONB metadata queries
 CREATE INDEX IF NOT EXISTS documents_metadata_idx
 ON documents USING gin (metadata);
@@ -31,18 +46,64 @@ ON documents USING gin (metadata);
 CREATE INDEX IF NOT EXISTS documents_content_idx
 ON documents USING gin (to_tsvector('english', content));
 
+-- Neighbouring-chunk lookups (small-to-big window expansion, per-source deletes)
+CREATE INDEX IF NOT EXISTS documents_source_chunk_idx
+ON documents ((metadata->>'source'), ((metadata->>'chunk_index')::int));
+
+-- ============================================
+-- Parent sections for small-to-big retrieval
+-- Child chunks in documents are searched; their parent section text is stored
+-- here once (children carry metadata->>'parent_index') instead of being
+-- repeated as overlap in every chunk
+-- ============================================
+CREATE TABLE IF NOT EXISTS document_parents (
+    source TEXT NOT NULL,
+    parent_index INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    metadata JSONB DEFAULT '{}',
+    PRIMARY KEY (source, parent_index)
+);
+
+-- ============================================
+-- Upgrade: log tables from before monthly partitioning are renamed to
+-- <table>_legacy here and copied into the partitioned tables further down
+-- ============================================
+DO $$
+DECLARE
+    log_table TEXT;
+BEGIN
+    FOREACH log_table IN ARRAY ARRAY['feedback', 'query_logs'] LOOP
+        IF EXISTS (
+            SELECT 1 FROM pg_class
+            WHERE relname = log_table AND relkind = 'r' AND relnamespace = 'public'::regnamespace
+        ) THEN
+            EXECUTE format('ALTER TABLE %I RENAME TO %I', log_table, log_table || '_legacy');
+            EXECUTE format('ALTER SEQUENCE IF EXISTS %I RENAME TO %I', log_table || '_id_seq', log_table || '_legacy_id_seq');
+            EXECUTE format('ALTER INDEX IF EXISTS %I RENAME TO %I', log_table || '_pkey', log_table || '_legacy_pkey');
+            EXECUTE format('ALTER INDEX IF EXISTS %I RENAME TO %I', log_table || '_created_at_idx', log_table || '_legacy_created_at_idx');
+            EXECUTE format('ALTER INDEX IF EXISTS %I RENAME TO %I', log_table || '_helpful_idx', log_table || '_legacy_helpful_idx');
+        END IF;
+    END LOOP;
+END;
+$$;
+
 -- ============================================
 -- Feedback table for user ratings
+-- Partitioned by month on created_at; old partitions are dropped for retention.
+-- created_at holds naive UTC, like query_logs.created_at
 -- ============================================
 CREATE TABLE IF NOT EXISTS feedback (
-    id SERIAL PRIMARY KEY,
+    id BIGSERIAL,
     query TEXT NOT NULL,
     answer TEXT NOT NULL,
     helpful BOOLEAN,
     comment TEXT,
+    sources JSONB DEFAULT '[]',  -- [{source, chunk_index, type}] shown with the answer
     user_id VARCHAR(255),
-    created_at TIMESTAMP DEFAULT NOW()
-);
+    created_at TIMESTAMP NOT NULL DEFAULT (NOW() AT TIME ZONE 'UTC'),
+    boosted_at TIMESTAMP,  -- set once folded into retrieval_boosts
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
 
 -- Index for analytics queries
 CREATE INDEX IF NOT EXISTS feedback_created_at_idx
@@ -51,22 +112,212 @@ ON feedback (created_at DESC);
 CREATE INDEX IF NOT EXISTS feedback_helpful_idx
 ON feedback (helpful);
 
+-- Ratings not yet folded into retrieval_boosts
+CREATE INDEX IF NOT EXISTS feedback_unboosted_idx
+ON feedback (id) WHERE boosted_at IS NULL AND helpful IS NOT NULL;
+
 -- ============================================
 -- Query logs table (for analytics)
 -- ============================================
 CREATE TABLE IF NOT EXISTS query_logs (
-    id SERIAL PRIMARY KEY,
+    id BIGSERIAL,
     query TEXT NOT NULL,
     retrieved_docs INTEGER,
     response_time_ms INTEGER,
     llm_tokens_used INTEGER,
+    doc_types TEXT[] DEFAULT '{}',  -- document types of the retrieved sources
     user_id VARCHAR(255),
-    created_at TIMESTAMP DEFAULT NOW()
-);
+    created_at TIMESTAMP NOT NULL DEFAULT (NOW() AT TIME ZONE 'UTC'),
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
 
 CREATE INDEX IF NOT EXISTS query_logs_created_at_idx
 ON query_logs (created_at DESC);
 
+-- Create monthly partitions of a log table from the current month onwards
+-- (called again by the analytics maintenance job)
+CREATE OR REPLACE FUNCTION ensure_monthly_partitions(parent TEXT, months_ahead INT DEFAULT 1)
+RETURNS void AS $$
+DECLARE
+    month_start DATE;
+BEGIN
+    FOR i IN 0..months_ahead LOOP
+        month_start := (date_trunc('month', NOW() AT TIME ZONE 'UTC') + make_interval(months => i))::date;
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+            parent || '_p' || to_char(month_start, 'YYYYMM'),
+            parent,
+            month_start,
+            (month_start + INTERVAL '1 month')::date
+        );
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT ensure_monthly_partitions('feedback');
+SELECT ensure_monthly_partitions('query_logs');
+
+-- Safety net if the maintenance job has not created a month's partition in time
+CREATE TABLE IF NOT EXISTS feedback_default PARTITION OF feedback DEFAULT;
+CREATE TABLE IF NOT EXISTS query_logs_default PARTITION OF query_logs DEFAULT;
+
+-- Upgrade: move rows of renamed pre-partitioning tables into monthly
+-- partitions (the columns both versions have), then drop the old tables
+DO $$
+DECLARE
+    log_table TEXT;
+    column_list TEXT;
+    month_start DATE;
+BEGIN
+    FOREACH log_table IN ARRAY ARRAY['feedback', 'query_logs'] LOOP
+        CONTINUE WHEN to_regclass(log_table || '_legacy') IS NULL;
+
+        FOR month_start IN EXECUTE format(
+            'SELECT DISTINCT date_trunc(''month'', created_at)::date FROM %I WHERE created_at IS NOT NULL',
+            log_table || '_legacy'
+        ) LOOP
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                log_table || '_p' || to_char(month_start, 'YYYYMM'),
+                log_table,
+                month_start,
+                (month_start + INTERVAL '1 month')::date
+            );
+        END LOOP;
+
+        SELECT string_agg(quote_ident(column_name), ', ') INTO column_list
+        FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = log_table || '_legacy'
+          AND column_name <> 'created_at'
+          AND column_name IN (
+              SELECT column_name FROM information_schema.columns
+              WHERE table_schema = 'public' AND table_name = log_table
+          );
+        EXECUTE format(
+            'INSERT INTO %I (%s, created_at) SELECT %s, COALESCE(created_at, NOW() AT TIME ZONE ''UTC'') FROM %I',
+            log_table, column_list, column_list, log_table || '_legacy'
+        );
+        EXECUTE format(
+            'SELECT setval(pg_get_serial_sequence(%L, ''id''), GREATEST((SELECT MAX(id) FROM %I), 1))',
+            log_table, log_table
+        );
+        EXECUTE format('DROP TABLE %I', log_table || '_legacy');
+        RAISE NOTICE 'Moved % into monthly partitions', log_table;
+    END LOOP;
+END;
+$$;
+
+-- ============================================
+-- Hourly analytics rollups (analytics.rollups), one row per hour and
+-- document type; doc_type 'all' covers every query
+-- ============================================
+CREATE TABLE IF NOT EXISTS query_rollups_hourly (
+    bucket TIMESTAMP NOT NULL,
+    doc_type VARCHAR(64) NOT NULL,
+    queries INTEGER NOT NULL,
+    retrieval_hits INTEGER NOT NULL,  -- queries that retrieved at least one chunk
+    latency_p50_ms REAL,
+    latency_p95_ms REAL,
+    latency_p99_ms REAL,
+    tokens BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket, doc_type)
+);
+
+CREATE TABLE IF NOT EXISTS feedback_rollups_hourly (
+    bucket TIMESTAMP NOT NULL,
+    doc_type VARCHAR(64) NOT NULL,
+    helpful INTEGER NOT NULL,
+    unhelpful INTEGER NOT NULL,
+    PRIMARY KEY (bucket, doc_type)
+);
+
+-- ============================================
+-- Conversation sessions (multi-turn chat state)
+-- ============================================
+CREATE TABLE IF NOT EXISTS conversation_sessions (
+    session_id UUID PRIMARY KEY,
+    turns JSONB NOT NULL DEFAULT '[]',
+    last_retrieval JSONB,  -- previous turn's query embedding and chunks
+    created_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS conversation_sessions_updated_at_idx
+ON conversation_sessions (updated_at DESC);
+
+-- ============================================
+-- Ingestion runs (coordinates startup ingestion across workers)
+-- ============================================
+CREATE TABLE IF NOT EXISTS ingestion_runs (
+    id SERIAL PRIMARY KEY,
+    fingerprint VARCHAR(64) NOT NULL,  -- documents + chunking settings
+    documents INTEGER,
+    chunks INTEGER,
+    finished_at TIMESTAMP DEFAULT NOW()
+);
+
+-- ============================================
+-- Shared cache (embeddings, answers) for all workers
+-- ============================================
+CREATE TABLE IF NOT EXISTS shared_cache (
+    namespace VARCHAR(64) NOT NULL,
+    key VARCHAR(64) NOT NULL,
+    value JSONB NOT NULL,
+    expires_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+
+CREATE INDEX IF NOT EXISTS shared_cache_expires_at_idx
+ON shared_cache (expires_at);
+
+-- ============================================
+-- Feedback-driven retrieval boosts (analytics.feedback_boosts)
+-- ============================================
+CREATE TABLE IF NOT EXISTS retrieval_boosts (
+    source VARCHAR(255) NOT NULL,
+    chunk_index INTEGER NOT NULL,  -- -1 for the source as a whole
+    helpful INTEGER NOT NULL DEFAULT 0,
+    unhelpful INTEGER NOT NULL DEFAULT 0,
+    boost REAL NOT NULL DEFAULT 0,  -- added to similarity when ranking
+    updated_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (source, chunk_index)
+);
+
+-- ============================================
+-- Precomputed answers for frequent question clusters (analytics.answer_index)
+-- Served by ANN lookup on the query embedding ahead of retrieval; marked
+-- stale by the documents triggers below when a source chunk changes
+-- ============================================
+CREATE TABLE IF NOT EXISTS precomputed_answers (
+    id SERIAL PRIMARY KEY,
+    question_key VARCHAR(64) NOT NULL UNIQUE,  -- hash of the normalized representative question
+    question TEXT NOT NULL,  -- most frequent phrasing in the cluster
+    embedding vector(1536) NOT NULL,  -- cluster centroid
+    support INTEGER NOT NULL DEFAULT 0,  -- logged queries and feedback in the cluster
+    answer TEXT,  -- NULL until generated
+    sources JSONB DEFAULT '[]',
+    source_chunk_ids INTEGER[] NOT NULL DEFAULT '{}',  -- documents.id used for the answer
+    generated_at TIMESTAMP,
+    stale_since TIMESTAMP,  -- set when a source chunk is replaced or deleted
+    regenerations INTEGER NOT NULL DEFAULT 0,
+    mined_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS precomputed_answers_embedding_idx
+ON precomputed_answers USING hnsw (embedding vector_cosine_ops);
+
+CREATE INDEX IF NOT EXISTS precomputed_answers_chunks_idx
+ON precomputed_answers USING gin (source_chunk_ids);
+
+-- ============================================
+-- Token buckets for rate limiting shared by all workers
+-- ============================================
+CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+    client VARCHAR(128) PRIMARY KEY,  -- hashed API key or remote address
+    tokens REAL NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
 -- ============================================
 -- Helper function to update updated_at timestamp
 -- ============================================
@@ -78,11 +329,97 @@ BEGIN
 END;
 $$ language 'plpgsql';
 
-CREATE TRIGGER update_documents_updated_at
+CREATE OR REPLACE TRIGGER update_documents_updated_at
 BEFORE UPDATE ON documents
 FOR EACH ROW
 EXECUTE FUNCTION update_updated_at_column();
 
+-- ============================================
+-- Per-source chunk counters for /health, maintained by statement-level
+-- triggers so the stats never scan the documents table
+-- ============================================
+CREATE TABLE IF NOT EXISTS source_stats (
+    source VARCHAR(512) PRIMARY KEY,
+    doc_type VARCHAR(64),
+    chunks INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE OR REPLACE FUNCTION source_stats_on_insert()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO source_stats (source, doc_type, chunks)
+    SELECT metadata->>'source', MAX(metadata->>'type'), COUNT(*)
+    FROM new_rows
+    WHERE metadata->>'source' IS NOT NULL
+    GROUP BY metadata->>'source'
+    ON CONFLICT (source) DO UPDATE
+    SET chunks = source_stats.chunks + EXCLUDED.chunks,
+        doc_type = EXCLUDED.doc_type;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION source_stats_on_delete()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE source_stats s
+    SET chunks = s.chunks - d.chunks
+    FROM (
+        SELECT metadata->>'source' as source, COUNT(*) as chunks
+        FROM old_rows
+        WHERE metadata->>'source' IS NOT NULL
+        GROUP BY metadata->>'source'
+    ) d
+    WHERE s.source = d.source;
+    DELETE FROM source_stats WHERE chunks <= 0;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE TRIGGER documents_source_stats_insert
+AFTER INSERT ON documents
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION source_stats_on_insert();
+
+CREATE OR REPLACE TRIGGER documents_source_stats_delete
+AFTER DELETE ON documents
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION source_stats_on_delete();
+
+-- Upgrade: count the chunks indexed before the triggers existed
+INSERT INTO source_stats (source, doc_type, chunks)
+SELECT metadata->>'source', MAX(metadata->>'type'), COUNT(*)
+FROM documents
+WHERE metadata->>'source' IS NOT NULL AND NOT EXISTS (SELECT 1 FROM source_stats)
+GROUP BY metadata->>'source';
+
+-- Precomputed answers built on changed chunks go stale (re-ingestion
+-- deletes and re-inserts a source's chunks)
+CREATE OR REPLACE FUNCTION precomputed_answers_on_chunk_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE precomputed_answers
+    SET stale_since = NOW()
+    WHERE stale_since IS NULL
+      AND source_chunk_ids && ARRAY(SELECT id FROM old_rows);
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE TRIGGER documents_precomputed_answers_delete
+AFTER DELETE ON documents
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION precomputed_answers_on_chunk_change();
+
+CREATE OR REPLACE TRIGGER documents_precomputed_answers_update
+AFTER UPDATE ON documents
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION precomputed_answers_on_chunk_change();
+
 -- ============================================
 -- Helper function for similarity search
 -- ============================================
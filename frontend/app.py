@@ -1,9 +1,16 @@
 """
 Streamlit UI for Skyro Knowledge Assistant
 """
+import itertools
+import os
+import time
 import streamlit as st
 from utils.api_client import APIClient
-import time
+
+# Sidebar status is re-read at most this often instead of on every rerun
+HEALTH_TTL_SECONDS = int(os.getenv("HEALTH_TTL_SECONDS", "30"))
+# After a failed session creation, questions are sent without a session until this passes
+SESSION_RETRY_SECONDS = int(os.getenv("SESSION_RETRY_SECONDS", "30"))
 
 
 st.set_page_config(
@@ -19,6 +26,31 @@ def get_api_client():
 
 api_client = get_api_client()
 
+
+@st.cache_data(ttl=HEALTH_TTL_SECONDS, show_spinner=False)
+def get_health():
+    return api_client.health_check()
+
+
+def start_session():
+    """Create a conversation session, backing off after a failure instead of retrying every rerun"""
+    st.session_state.session_id = api_client.create_session()
+    st.session_state.session_retry_at = (
+        None if st.session_state.session_id else time.monotonic() + SESSION_RETRY_SECONDS
+    )
+
+
+def render_sources(sources):
+    with st.expander("📚 View Sources"):
+        for i, source in enumerate(sources, 1):
+            st.markdown(f"""
+            <div class="source-box">
+                <strong>Source {i}:</strong> {source['source']}<br>
+                <strong>Type:</strong> {source['type']}<br>
+                <strong>Relevance:</strong> {source['relevance']}
+            </div>
+            """, unsafe_allow_html=True)
+
 st.markdown("""
 <style>
     .main-header {
@@ -55,7 +87,10 @@ def main():
     with st.sidebar:
         st.header("System Status")
 
-        health = api_client.health_check()
+        health = get_health()
+        if health.get("status") != "healthy":
+            # Do not keep an outage on screen for the whole TTL
+            get_health.clear()
         if health.get("status") == "healthy":
             st.success("✅ System Online")
 
@@ -108,25 +143,29 @@ def main():
             if st.button(question, key=f"example_{question[:20]}", use_container_width=True):
                 st.session_state.example_question = question
 
+        st.divider()
+
+        if st.button("🔄 New conversation", use_container_width=True):
+            st.session_state.messages = []
+            st.session_state.last_response = None
+            start_session()
+            st.rerun()
+
     if "messages" not in st.session_state:
         st.session_state.messages = []
     if "last_response" not in st.session_state:
         st.session_state.last_response = None
+    if not st.session_state.get("session_id"):
+        retry_at = st.session_state.get("session_retry_at")
+        if retry_at is None or time.monotonic() >= retry_at:
+            start_session()
 
     for message in st.session_state.messages:
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
 
             if "sources" in message and message["sources"]:
-                with st.expander("📚 View Sources"):
-                    for i, source in enumerate(message["sources"], 1):
-                        st.markdown(f"""
-                        <div class="source-box">
-                            <strong>Source {i}:</strong> {source['source']}<br>
-                            <strong>Type:</strong> {source['type']}<br>
-                            <strong>Relevance:</strong> {source['relevance']}
-                        </div>
-                        """, unsafe_allow_html=True)
+                render_sources(message["sources"])
 
     if "example_question" in st.session_state:
         user_input = st.session_state.example_question
@@ -141,24 +180,25 @@ def main():
             st.markdown(user_input)
 
         with st.chat_message("assistant"):
+            sources = []
+
+            def answer_tokens():
+                # Render the answer as it is generated; sources arrive before the first token
+                for event in api_client.query_stream(user_input, session_id=st.session_state.session_id):
+                    if event["type"] == "sources":
+                        sources.extend(event["sources"])
+                    elif event["type"] == "token":
+                        yield event["content"]
+                    elif event["type"] == "error":
+                        yield event["message"]
+
+            tokens = answer_tokens()
             with st.spinner("Searching knowledge base..."):
-                response = api_client.query(user_input)
-
-            answer = response.get("answer", "No answer generated")
-            sources = response.get("sources", [])
-
-            st.markdown(answer)
+                first_token = next(tokens, "")
+            answer = st.write_stream(itertools.chain([first_token], tokens)) or "No answer generated"
 
             if sources:
-                with st.expander("📚 View Sources"):
-                    for i, source in enumerate(sources, 1):
-                        st.markdown(f"""
-                        <div class="source-box">
-                            <strong>Source {i}:</strong> {source['source']}<br>
-                            <strong>Type:</strong> {source['type']}<br>
-                            <strong>Relevance:</strong> {source['relevance']}
-                        </div>
-                        """, unsafe_allow_html=True)
+                render_sources(sources)
 
         st.session_state.messages.append({
             "role": "assistant",
@@ -168,11 +208,15 @@ def main():
 
         st.session_state.last_response = {
             "query": user_input,
-            "answer": answer
+            "answer": answer,
+            "sources": sources
         }
 
         st.rerun()
 
+    if st.session_state.pop("feedback_sent", False):
+        st.toast("Thank you for your feedback!")
+
     if st.session_state.last_response and len(st.session_state.messages) > 0:
         if st.session_state.messages[-1]["role"] == "assistant":
             st.divider()
@@ -181,28 +225,21 @@ def main():
             col1, col2, col3 = st.columns([1, 1, 4])
 
             with col1:
-                if st.button("👍 Yes", key="helpful_yes"):
-                    api_client.submit_feedback(
-                        query=st.session_state.last_response["query"],
-                        answer=st.session_state.last_response["answer"],
-                        helpful=True
-                    )
-                    st.success("Thank you for your feedback!")
-                    time.sleep(1)
-                    st.session_state.last_response = None
-                    st.rerun()
-
+                helpful_yes = st.button("👍 Yes", key="helpful_yes")
             with col2:
-                if st.button("👎 No", key="helpful_no"):
-                    api_client.submit_feedback(
-                        query=st.session_state.last_response["query"],
-                        answer=st.session_state.last_response["answer"],
-                        helpful=False
-                    )
-                    st.success("Thank you for your feedback!")
-                    time.sleep(1)
-                    st.session_state.last_response = None
-                    st.rerun()
+                helpful_no = st.button("👎 No", key="helpful_no")
+
+            if helpful_yes or helpful_no:
+                # Posted in the background; the page does not wait for the backend
+                api_client.submit_feedback_in_background(
+                    query=st.session_state.last_response["query"],
+                    answer=st.session_state.last_response["answer"],
+                    helpful=helpful_yes,
+                    sources=st.session_state.last_response.get("sources")
+                )
+                st.session_state.last_response = None
+                st.session_state.feedback_sent = True
+                st.rerun()
 
     st.divider()
     st.markdown(
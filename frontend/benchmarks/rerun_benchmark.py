@@ -0,0 +1,50 @@
+"""
+Measure Streamlit page rerun latency with cold and warm client caches
+
+Runs app.py headlessly (streamlit.testing AppTest) against a live backend.
+"cold" clears st.cache_data and st.cache_resource before every rerun, so
+each rerun builds a new HTTP client and re-reads /health, as every rerun
+did before the pooled client and health TTL cache. "warm" reruns with the
+caches in place.
+
+Usage (from frontend/, with the backend running):
+    BACKEND_URL=http://localhost:8000 python -m benchmarks.rerun_benchmark --runs 50
+"""
+import argparse
+import time
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct * len(ordered)))]
+
+
+def measure(runs: int, cold: bool) -> list:
+    app = AppTest.from_file("app.py", default_timeout=30)
+    app.run()  # first run creates the conversation session
+    timings = []
+    for _ in range(runs):
+        if cold:
+            st.cache_data.clear()
+            st.cache_resource.clear()
+        start = time.perf_counter()
+        app.run()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+
+    print(f"\n{'mode':<6} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for name, cold in (("cold", True), ("warm", False)):
+        timings = measure(args.runs, cold)
+        print(f"{name:<6} {percentile(timings, 0.5):>8.1f} {percentile(timings, 0.95):>8.1f} {max(timings):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
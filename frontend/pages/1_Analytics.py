@@ -0,0 +1,93 @@
+"""
+Streamlit analytics dashboard: latency, tokens, retrieval hits and helpfulness over time
+"""
+import pandas as pd
+import streamlit as st
+from utils.api_client import APIClient
+
+
+st.set_page_config(
+    page_title="Analytics · Skyro Knowledge Assistant",
+    page_icon="📊",
+    layout="wide"
+)
+
+@st.cache_resource
+def get_api_client():
+    return APIClient()
+
+api_client = get_api_client()
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_analytics(hours: int, doc_type: str = "all"):
+    # Rollups change hourly; switching filters back and forth is served from the cache
+    return api_client.get_analytics(hours=hours, doc_type=doc_type)
+
+
+def main():
+    """Analytics dashboard served from the backend's hourly rollups"""
+    st.title("📊 Assistant Analytics")
+
+    col1, col2 = st.columns([1, 1])
+    with col1:
+        window = st.selectbox("Time window", ["24 hours", "7 days", "30 days"])
+    hours = {"24 hours": 24, "7 days": 24 * 7, "30 days": 24 * 30}[window]
+
+    overview = get_analytics(hours)
+    if "error" in overview:
+        get_analytics.clear()
+        st.error(f"Could not load analytics: {overview['error']}")
+        return
+
+    with col2:
+        doc_type = st.selectbox("Document type", overview.get("doc_types") or ["all"])
+
+    data = overview if doc_type == "all" else get_analytics(hours, doc_type)
+    if "error" in data:
+        get_analytics.clear()
+        st.error(f"Could not load analytics: {data['error']}")
+        return
+
+    summary = data["summary"]
+    m1, m2, m3, m4, m5 = st.columns(5)
+    m1.metric("Queries", summary["queries"])
+    m2.metric("Tokens", f"{summary['tokens']:,}")
+    m3.metric(
+        "Retrieval hit rate",
+        f"{summary['retrieval_hit_rate']:.0%}" if summary["retrieval_hit_rate"] is not None else "–"
+    )
+    m4.metric(
+        "Helpful rate",
+        f"{summary['helpful_rate']:.0%}" if summary["helpful_rate"] is not None else "–"
+    )
+    m5.metric(
+        "Worst hourly p95",
+        f"{summary['worst_hour_p95_ms']:.0f} ms" if summary["worst_hour_p95_ms"] is not None else "–"
+    )
+
+    if not data["buckets"]:
+        st.info("No rolled-up data for this window yet.")
+        return
+
+    df = pd.DataFrame(data["buckets"])
+    df["bucket"] = pd.to_datetime(df["bucket"])
+    df = df.set_index("bucket")
+
+    st.subheader("Latency (ms)")
+    st.line_chart(df[["latency_p50_ms", "latency_p95_ms", "latency_p99_ms"]])
+
+    left, right = st.columns(2)
+    with left:
+        st.subheader("Queries and retrieval hits")
+        st.bar_chart(df[["queries", "retrieval_hits"]])
+    with right:
+        st.subheader("Tokens")
+        st.bar_chart(df[["tokens"]])
+
+    st.subheader("Feedback")
+    st.bar_chart(df[["helpful", "unhelpful"]])
+
+
+if __name__ == "__main__":
+    main()
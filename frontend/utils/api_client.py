@@ -1,42 +1,102 @@
 """
 API client for backend communication
 """
+import json
 import requests
 import os
-from typing import Dict, Any, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, Iterator, List, Optional
 
 
 class APIClient:
-    """Client for Skyro Knowledge Assistant API"""
+    """
+    Client for Skyro Knowledge Assistant API
+
+    One instance is shared by all Streamlit sessions (st.cache_resource), so
+    every call goes through one requests.Session with a keep-alive pool
+    instead of opening a new connection per request.
+    """
 
     def __init__(self):
         self.base_url = os.getenv("BACKEND_URL", "http://backend:8000")
+        pool_size = int(os.getenv("BACKEND_POOL_SIZE", "10"))
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # Feedback is posted off the script thread so a click never waits on the backend
+        self.background = ThreadPoolExecutor(max_workers=2, thread_name_prefix="api-background")
 
     def health_check(self) -> Dict[str, Any]:
         """Check API health"""
         try:
-            response = requests.get(f"{self.base_url}/health", timeout=5)
+            response = self.session.get(f"{self.base_url}/health", timeout=5)
             response.raise_for_status()
             return response.json()
         except Exception as e:
             return {"status": "error", "message": str(e)}
 
-    def query(self, question: str) -> Dict[str, Any]:
+    def get_analytics(self, hours: int = 24, doc_type: str = "all") -> Dict[str, Any]:
+        """
+        Get hourly analytics rollups
+
+        Args:
+            hours: Window size in hours
+            doc_type: Document type, or 'all'
+
+        Returns:
+            Analytics response, or a dict with 'error'
+        """
+        try:
+            response = self.session.get(
+                f"{self.base_url}/api/v1/analytics",
+                params={"hours": hours, "doc_type": doc_type},
+                timeout=10
+            )
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            return {"error": str(e)}
+
+    def create_session(self) -> Optional[str]:
+        """
+        Start a conversation session on the backend
+
+        Returns:
+            Session ID, or None if the backend is unavailable
+        """
+        try:
+            response = self.session.post(f"{self.base_url}/api/v1/sessions", timeout=10)
+            response.raise_for_status()
+            return response.json()["session_id"]
+        except Exception:
+            return None
+
+    def query(self, question: str, session_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Query the knowledge base
 
         Args:
             question: User's question
+            session_id: Optional conversation session for follow-up questions
 
         Returns:
             API response with answer and sources
         """
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/api/v1/query",
-                json={"question": question},
+                json={"question": question, "session_id": session_id},
                 timeout=60
             )
+            if response.status_code in (429, 503):
+                retry_after = response.headers.get("Retry-After", "a few")
+                return {
+                    "question": question,
+                    "answer": f"The assistant is busy. Please try again in {retry_after} seconds.",
+                    "sources": []
+                }
             response.raise_for_status()
             return response.json()
         except requests.exceptions.Timeout:
@@ -52,12 +112,48 @@ class APIClient:
                 "sources": []
             }
 
+    def query_stream(self, question: str, session_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Query the knowledge base and yield the streamed NDJSON events
+
+        Args:
+            question: User's question
+            session_id: Optional conversation session for follow-up questions
+
+        Returns:
+            Iterator over events: 'sources', 'token' deltas and 'done' from the
+            backend, or a single 'error' event with a message to show
+        """
+        try:
+            with self.session.post(
+                f"{self.base_url}/api/v1/query/stream",
+                json={"question": question, "session_id": session_id},
+                stream=True,
+                timeout=(5, 60)
+            ) as response:
+                if response.status_code in (429, 503):
+                    retry_after = response.headers.get("Retry-After", "a few")
+                    yield {
+                        "type": "error",
+                        "message": f"The assistant is busy. Please try again in {retry_after} seconds."
+                    }
+                    return
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if line:
+                        yield json.loads(line)
+        except requests.exceptions.Timeout:
+            yield {"type": "error", "message": "Request timed out. Please try again."}
+        except Exception as e:
+            yield {"type": "error", "message": f"Error: {str(e)}"}
+
     def submit_feedback(
         self,
         query: str,
         answer: str,
         helpful: bool,
-        comment: Optional[str] = None
+        comment: Optional[str] = None,
+        sources: Optional[List[Dict[str, Any]]] = None
     ) -> bool:
         """
         Submit feedback for an answer
@@ -67,18 +163,20 @@ class APIClient:
             answer: Generated answer
             helpful: Was the answer helpful?
             comment: Optional comment
+            sources: Sources shown with the answer (used for retrieval boosts)
 
         Returns:
             Success status
         """
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/api/v1/feedback",
                 json={
                     "query": query,
                     "answer": answer,
                     "helpful": helpful,
-                    "comment": comment
+                    "comment": comment,
+                    "sources": sources or []
                 },
                 timeout=10
             )
@@ -86,3 +184,15 @@ class APIClient:
             return True
         except Exception:
             return False
+
+    def submit_feedback_in_background(self, **feedback: Any) -> Future:
+        """
+        Submit feedback without waiting for the backend
+
+        Args:
+            **feedback: Arguments of submit_feedback
+
+        Returns:
+            Future resolving to the success status
+        """
+        return self.background.submit(self.submit_feedback, **feedback)